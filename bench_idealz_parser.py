@@ -0,0 +1,86 @@
+# bench_idealz_parser.py - Compare the single-pass IdealZ parser with the old lookahead scan
+#
+# Usage: python bench_idealz_parser.py [repeats]
+
+import re
+import sys
+import time
+from scraper.idealz_scraper import parse_idealz_text, categorize_product
+from scraper.utils import parse_price
+
+
+def legacy_parse(page_text):
+    """
+    The previous line-by-line parser with a 3-line regex lookahead.
+    A product whose prices were on its own line took the prices of the
+    next line instead (and kept them in its name); parse_idealz_text
+    gives it its own.
+    """
+    products = []
+    lines = page_text.split('\n')
+
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line or line in ['Price List', 'Apple Care', 'Genext', 'Company',
+                                'Apple Devices', 'Android Devices', 'Accessories',
+                                'iPhone', 'Mac & iPad', 'Watch & Accessories']:
+            continue
+
+        if any(keyword in line for keyword in ['iPhone', 'iPad', 'MacBook', 'AirPods', 'Watch', 'Galaxy', 'Samsung']):
+            product_name = line
+            standard_price = None
+            cash_price = None
+
+            for j in range(1, 4):
+                if i + j < len(lines):
+                    prices = re.findall(r'Rs\.\s*([\d,]+)', lines[i + j].strip())
+                    if len(prices) >= 2:
+                        standard_price = parse_price(prices[0])
+                        cash_price = parse_price(prices[1])
+                        break
+                    elif len(prices) == 1:
+                        standard_price = parse_price(prices[0])
+                        cash_price = standard_price
+                        break
+
+            if not standard_price:
+                prices = re.findall(r'Rs\.\s*([\d,]+)', line)
+                if prices:
+                    product_name = re.sub(r'Rs\.\s*[\d,]+', '', line).strip()
+                    standard_price = parse_price(prices[0])
+                    cash_price = parse_price(prices[1]) if len(prices) > 1 else standard_price
+
+            if standard_price:
+                products.append({
+                    "site": "IdealZ (Your Shop)",
+                    "category": categorize_product(product_name),
+                    "product": product_name,
+                    "price_LKR": standard_price,
+                    "cash_price_LKR": cash_price or standard_price,
+                    "is_own_shop": True
+                })
+
+    return products
+
+
+def bench(name, parser, text, rounds=5):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        products = parser(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:>12}: {best * 1000:8.2f} ms  ({len(products)} products)")
+    return best
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    with open("fixtures/idealz_page_text.txt", encoding="utf-8") as f:
+        text = f.read() * repeats
+
+    print(f"Parsing {len(text.splitlines()):,} lines ({repeats} x recorded page text)")
+    legacy = bench("lookahead", legacy_parse, text)
+    single = bench("single-pass", parse_idealz_text, text)
+    print(f"Speed-up: {legacy / single:.1f}x")
@@ -1,5 +1,7 @@
 # config.py - Central configuration for all scraping targets
 
+import os
+
 SCRAPING_URLS = {
     # IdealZ (Your Shop)
     "IdealZ All Products": "https://idealzpricelist.netlify.app/",
@@ -59,12 +61,93 @@ SCRAPING_URLS = {
     "XMobile Watch": "https://xmobile.lk/product-category/apple-products/apple-watch/",
 }
 
+# Sitemap discovery: one "<site> All Products" job per shop enumerates every
+# product (and its lastmod date) from the shop's Yoast/WooCommerce sitemap and
+# only fetches the product pages that are new or updated since the last run.
+# A sitemap index URL works too; its product sitemaps are followed.
+SITEMAP_URLS = {
+    "PresentSolution": "https://presentsolution.lk/product-sitemap.xml",
+    "DoctorMobile": "https://doctormobile.lk/product-sitemap.xml",
+    "GeniusMobile": "https://www.geniusmobile.lk/product-sitemap.xml",
+    "LifeMobile": "https://lifemobile.lk/product-sitemap.xml",
+    "GQMobiles": "https://gqmobiles.lk/product-sitemap.xml",
+    "XMobile": "https://xmobile.lk/product-sitemap.xml",
+}
+SITEMAP_BATCH_SIZE = 50  # Product URLs per checkpointed batch
+SITEMAP_MAX_FETCHES = 300  # Product pages fetched per shop and run; the rest wait for the next run
+SITEMAP_REFRESH_DAYS = 7  # Re-fetch a page after this long even if its lastmod is unchanged
+
+# Pagination for WooCommerce categories
+MAX_CATEGORY_PAGES = None  # Optional cap on pages per category (None = all discovered pages)
+MAX_CONCURRENT_REQUESTS_PER_HOST = 2  # Pages of one site fetched in parallel
+
+# Politeness budget per domain: requests per second and burst size.
+# Sites answering 429/403 are slowed down automatically.
+RATE_LIMITS = {
+    "default": {"rate": 1.0, "burst": 2},
+    "idealzpricelist.netlify.app": {"rate": 2.0, "burst": 4},
+}
+
+# Engine selection for WooCommerce sites: plain HTTP first, Selenium only when
+# the static HTML comes back empty or short compared with the usual count
+STATIC_MIN_YIELD = 0.5  # Share of the usual product count static HTML must reach
+SELENIUM_RECHECK_DAYS = 7  # Retry static HTML for Selenium sites after this long
+
+# Process-pool mode for the Selenium engines (main_scraper.py --selenium-workers)
+SELENIUM_WORKER_MEMORY_MB = 600  # Memory budgeted per browser when sizing the pool
+SELENIUM_WORKER_RSS_LIMIT_MB = 1500  # Restart a worker's browser past this RSS
+
+# Job scheduling (main_scraper.py --deadline): categories are ranked by the
+# price changes they are expected to reveal on products you also sell
+CHANGE_RATE_DAYS = 14  # History window for each category's price-change rate
+CHANGE_RATE_PRIOR = 0.05  # Added to every rate so quiet categories still rank
+DEFAULT_JOB_SECONDS = 60  # Duration assumed for a category never timed before
+DEADLINE_RESERVE_SECONDS = 120  # Kept free before the deadline to publish results
+
+# Scrape frequency: each category is re-scraped once FREQUENCY_TARGET_CHANGE
+# of its products are expected to have changed price (learned from history);
+# skipped categories keep their last scraped rows in the snapshot
+FREQUENCY_TARGET_CHANGE = 0.1  # Expected share of changed prices that makes a category due
+FREQUENCY_MAX_AGE_HOURS = 72  # Every category is refreshed at least this often
+FREQUENCY_SLACK_HOURS = 3  # Runs don't start on the minute; due this much early
+FREQUENCY_WINDOW_DAYS = 30  # History used to learn each category's change rate
+
+# Persistent Chrome profiles so warm runs reuse cached JS/CSS/fonts (opt-in:
+# set CHROME_PROFILE_DIR, e.g. to a directory restored from the CI cache)
+CHROME_PROFILE_DIR = os.environ.get("CHROME_PROFILE_DIR")
+CHROME_DISK_CACHE_MB = 200  # Per profile; Chrome evicts beyond this
+
+# Raw HTML of every fetched page, kept so extraction can be re-run offline
+ARCHIVE_PAGES = True
+ARCHIVE_DIR = "data/archive"
+ARCHIVE_RETENTION_DAYS = 30  # Runs older than this are dropped with their unshared pages
+
 # Your shop's prices (auto-updated by scraper, or manually maintain as backup)
 MY_PRICES = {
     # These will be auto-populated from scraping your website
     # Manually add as backup if IdealZ scraper fails
 }
 
-# Email alert settings (optional - for future use)
-ALERT_EMAIL = "your-email@gmail.com"
-PRICE_THRESHOLD_PERCENT = 5  # Alert if competitor is 5% cheaper
\ No newline at end of file
+# Email alert settings
+ALERT_EMAIL = "your-email@gmail.com"  # One address or a list; each gets one digest per run
+PRICE_THRESHOLD_PERCENT = 5  # Alert if competitor is 5% cheaper
+ALERT_COOLDOWN_HOURS = 24  # Don't repeat an alert within this window unless the price drops further
+ALERT_SENDER = os.environ.get("ALERT_SENDER") or "price-monitor@localhost"
+
+# SMTP server for alert digests (no host = alerts are only logged to data/alerts.jsonl).
+# The workflow passes unset secrets as empty strings, so "" means "not set".
+SMTP_HOST = os.environ.get("SMTP_HOST") or None
+SMTP_PORT = int(os.environ.get("SMTP_PORT") or 587)
+SMTP_USER = os.environ.get("SMTP_USER") or None
+SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD") or None
+SMTP_STARTTLS = (os.environ.get("SMTP_STARTTLS") or "1") == "1"
+
+# Daemon mode (main_scraper.py --daemon): scrape on a cron schedule with warm
+# browsers and HTTP sessions; /health and /metrics are served while it runs
+DAEMON_SCHEDULE = os.environ.get("SCRAPER_SCHEDULE") or "0 */6 * * *"  # minute hour day month weekday
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8766
+
+# Local JSON API (python scraper/api.py) for POS and pricing spreadsheets
+API_HOST = "127.0.0.1"
+API_PORT = 8765
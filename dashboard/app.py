@@ -4,15 +4,21 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime
+from datetime import datetime, timedelta
 import sys
 import os
-import json
-import re
 
 # Add parent directory to path for config import
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from scraper.aggregates import combine_stats
+from scraper.alerts import price_wars
+from scraper.matching import extract_model_number, extract_storage, compare_products
+from scraper.history import read_history
+from scraper.analytics import ANALYTICS_DIR, CATEGORY_DAILY_FILE, MODEL_DAILY_FILE, rolling_stats
+from dashboard.downsample import downsample
+from dashboard.tables import search_frame, sort_frame, page_slice, export_bytes, PARQUET_AVAILABLE
+
 st.set_page_config(
     page_title="IdealZ Competitor Price Monitor",
     page_icon="📊",
@@ -50,180 +56,198 @@ def load_data():
     return pd.DataFrame()
 
 @st.cache_data(ttl=3600)
-def load_my_prices():
-    """Load your shop's prices from JSON"""
-    try:
-        urls = [
-            'data/my_prices.json',  # Local first
-            'https://raw.githubusercontent.com/shaAhame/price_war/main/data/my_prices.json',  # GitHub
-        ]
-        
-        for url in urls:
-            try:
-                if url.startswith('http'):
-                    import requests
-                    response = requests.get(url)
-                    return response.json()
-                else:
-                    with open(url, 'r') as f:
-                        return json.load(f)
-            except:
-                continue
-    except:
-        pass
-    
-    return {}
-
-def extract_model_number(product_name):
-    """Extract model number with variant (e.g., '17 pro max', '15', '16 plus')"""
-    product_lower = product_name.lower()
-    
-    # iPhone patterns
-    iphone_pattern = r'iphone\s+(\d+(?:\s*(?:pro\s*max|pro|plus|mini|e))?)'
-    match = re.search(iphone_pattern, product_lower)
-    if match:
-        model = match.group(1).strip()
-        # Normalize spacing
-        model = re.sub(r'\s+', ' ', model)
-        return model
-    
-    # iPad patterns
-    if 'ipad' in product_lower:
-        ipad_pattern = r'ipad\s+(\w+(?:\s+\w+)*)'
-        match = re.search(ipad_pattern, product_lower)
-        if match:
-            return match.group(1).strip()
-    
-    # MacBook patterns
-    if 'macbook' in product_lower:
-        mac_pattern = r'macbook\s+(\w+(?:\s+\w+)*)'
-        match = re.search(mac_pattern, product_lower)
-        if match:
-            return match.group(1).strip()
-    
-    # AirPods patterns
-    if 'airpod' in product_lower:
-        airpod_pattern = r'airpods?\s+(\w+(?:\s+\w+)*)'
-        match = re.search(airpod_pattern, product_lower)
-        if match:
-            return match.group(1).strip()
+def load_category_stats():
+    """Load the per-(site, category, day) statistics written by the scraper"""
+    csv_urls = [
+        'data/category_stats.csv',  # Local first
+        'https://raw.githubusercontent.com/shaAhame/price_war/main/data/category_stats.csv',  # GitHub
+    ]
     
-    # Watch patterns
-    if 'watch' in product_lower:
-        watch_pattern = r'watch\s+(\w+(?:\s+\w+)*)'
-        match = re.search(watch_pattern, product_lower)
-        if match:
-            return match.group(1).strip()
+    for url in csv_urls:
+        try:
+            stats = pd.read_csv(url)
+            stats['is_own_shop'] = stats['is_own_shop'].astype(bool)
+            return stats
+        except Exception as e:
+            continue
     
-    return None
+    return pd.DataFrame()
 
-def extract_storage(product_name):
-    """Extract storage capacity (e.g., '128GB', '256GB', '1TB')"""
-    # Look for storage patterns
-    storage_pattern = r'(\d+\s*(?:GB|TB))'
-    match = re.search(storage_pattern, product_name, re.IGNORECASE)
+@st.cache_data(ttl=3600)
+def category_summary(day, sites, categories):
+    """Competitor statistics per category for the selected sites, from the aggregates"""
+    stats = load_category_stats()
+    stats = stats[
+        (stats['day'] == day) &
+        (stats['is_own_shop'] == False) &
+        (stats['site'].isin(sites)) &
+        (stats['category'].isin(categories))
+    ]
+    return combine_stats(stats, ['category'])
+
+HISTORY_CHART_POINTS = 600  # Points per series, about one per pixel of a wide chart
+
+@st.cache_data(ttl=3600, max_entries=64)
+def load_history_partition(path):
+    """Load one month of price history - tries local, then GitHub"""
+    csv_urls = [
+        path,  # Local first
+        f'https://raw.githubusercontent.com/shaAhame/price_war/main/{path}',  # GitHub
+    ]
     
-    if match:
-        storage = match.group(1).upper().replace(' ', '')
-        return storage
+    for url in csv_urls:
+        try:
+            return pd.read_csv(url)
+        except Exception as e:
+            continue
     
     return None
 
-def normalize_storage(storage):
-    """Normalize storage format (e.g., '1TB' -> '1024GB' for comparison)"""
-    if not storage:
-        return None
+@st.cache_data(ttl=3600, max_entries=32)
+def price_history(series_keys, start, end, method):
+    """
+    Downsampled price history of the selected (site, product) series.
+    Returns the chart data and the number of observations it stands for.
+    """
+    history = read_history(start, end, read=load_history_partition)
+    if history.empty:
+        return history, 0
     
-    storage_upper = storage.upper()
+    keys = pd.MultiIndex.from_tuples(series_keys, names=['site', 'product'])
+    history = history[pd.MultiIndex.from_frame(history[['site', 'product']]).isin(keys)]
     
-    if 'TB' in storage_upper:
-        # Convert TB to GB
-        tb_value = int(re.findall(r'\d+', storage_upper)[0])
-        return f"{tb_value * 1024}GB"
+    charts = []
+    for (site, product), series in history.groupby(['site', 'product']):
+        series = downsample(series.sort_values('scraped_at'), HISTORY_CHART_POINTS, method)
+        charts.append(series.assign(series=f"{site} — {product}"))
     
-    return storage_upper
+    chart_data = pd.concat(charts, ignore_index=True) if charts else history
+    return chart_data, len(history)
 
-def models_match(model1, model2):
-    """Check if two model numbers match exactly"""
-    if not model1 or not model2:
-        return False
-    
-    # Normalize
-    m1 = model1.lower().strip()
-    m2 = model2.lower().strip()
-    
-    # Remove extra spaces
-    m1 = re.sub(r'\s+', ' ', m1)
-    m2 = re.sub(r'\s+', ' ', m2)
-    
-    # Exact match
-    if m1 == m2:
-        return True
+@st.cache_data(ttl=3600)
+def load_analytics(name):
+    """Load a daily price index table - tries local, then GitHub"""
+    path = f'{ANALYTICS_DIR}/{name}'
+    csv_urls = [
+        path,  # Local first
+        f'https://raw.githubusercontent.com/shaAhame/price_war/main/{path}',  # GitHub
+    ]
     
-    # Remove all spaces for comparison
-    m1_nospace = m1.replace(' ', '')
-    m2_nospace = m2.replace(' ', '')
+    for url in csv_urls:
+        try:
+            return pd.read_csv(url, parse_dates=['day'])
+        except Exception as e:
+            continue
     
-    return m1_nospace == m2_nospace
+    return pd.DataFrame()
 
-def find_price_wars(df, my_prices=None, threshold=5):
-    """Find products where competitors are significantly cheaper - with simplistic matching"""
-    alerts = []
-    
-    your_products = df[df['is_own_shop'] == True].copy()
-    competitor_products = df[df['is_own_shop'] == False].copy()
-    
-    # Filter out zero prices
-    your_products = your_products[your_products['price_LKR'] > 0]
-    competitor_products = competitor_products[competitor_products['price_LKR'] > 0]
-    
-    if your_products.empty:
-        return pd.DataFrame()
+@st.cache_data(ttl=3600)
+def index_with_rolling(name, key):
+    """Daily index table with its 7/30-day rolling statistics"""
+    table = load_analytics(name)
+    return rolling_stats(table, key) if not table.empty else table
+
+@st.cache_data(ttl=3600)
+def load_comparisons():
+    """Exact competitor matches of your products, built once per snapshot"""
+    df = load_data()
+    return compare_products(df) if not df.empty else {}
+
+TABLE_PAGE_SIZES = [25, 50, 100, 250]
+NO_FILTERS = (None, None, None)  # Sidebar filters of views that ignore them
+
+def table_view(view, sites, categories, price_range, search, sort_by, ascending):
+    """Filtered and sorted rows of a table (only the competitors view uses the sidebar filters)"""
+    df = load_data()
+    if df.empty:
+        return df
+    
+    df = df[df['price_LKR'] > 0]
+    
+    if view == "competitors":
+        df = df[
+            (df['is_own_shop'] == False) &
+            (df['site'].isin(sites)) &
+            (df['category'].isin(categories)) &
+            (df['price_LKR'] >= price_range[0]) &
+            (df['price_LKR'] <= price_range[1])
+        ]
     
-    for _, your_product in your_products.iterrows():
-        my_name = your_product['product']
-        my_price = your_product['price_LKR']
-        
-        # Extract details
-        my_model = extract_model_number(my_name)
-        my_storage = extract_storage(my_name)
-        
-        if not my_model:
-            continue
-        
-        # Find partial matches
-        for _, competitor in competitor_products.iterrows():
-            comp_name = competitor['product']
-            comp_price = competitor['price_LKR']
-            
-            # Simple containment check
-            # e.g. if "iPhone 13" is in competitor name
-            if my_model.lower() in comp_name.lower():
-                
-                # If I have storage defined, competitor must match it if they have it
-                comp_storage = extract_storage(comp_name)
-                if my_storage and comp_storage:
-                     if normalize_storage(my_storage) != normalize_storage(comp_storage):
-                        continue
-                
-                # Calculate price difference
-                price_diff = ((my_price - comp_price) / my_price) * 100
-                
-                # Only show significant and realistic differences
-                if threshold < price_diff < 95:
-                    alerts.append({
-                        'my_product': my_name,
-                        'my_price': my_price,
-                        'competitor': competitor['site'],
-                        'competitor_product': comp_name,
-                        'competitor_price': comp_price,
-                        'savings_percent': round(price_diff, 1),
-                        'savings_amount': my_price - comp_price,
-                        'model': my_model,
-                        'storage': my_storage
-                    })
+    return sort_frame(search_frame(df, search), sort_by, ascending)
+
+@st.cache_data(ttl=3600, max_entries=64)
+def table_page(view, sites, categories, price_range, search, sort_by, ascending, page, page_size):
+    """
+    One page of a table: (rows, page count, total rows). Only the page is
+    cached, so a rerun copies page_size rows out of the cache, not the table.
+    """
+    view_df = table_view(view, sites, categories, price_range, search, sort_by, ascending)
+    rows, page_count = page_slice(view_df, page, page_size)
+    return rows, page_count, len(view_df)
+
+@st.cache_data(ttl=3600, max_entries=16)
+def export_table(view, sites, categories, price_range, search, sort_by, ascending, fmt):
+    """Export file for one filter state, built only when asked for"""
+    return export_bytes(table_view(view, sites, categories, price_range, search, sort_by, ascending), fmt)
+
+def paginated_table(view, filters, columns, file_prefix, default_sort='site', column_config=None):
+    """Render a searchable, sortable table one page at a time with lazy CSV/Parquet export"""
+    col_search, col_sort, col_order, col_size = st.columns([3, 2, 1, 1])
+    search = col_search.text_input("Search", key=f"{view}_search", placeholder="Site, category or product")
+    sort_by = col_sort.selectbox(
+        "Sort by", list(columns), index=list(columns).index(default_sort),
+        format_func=lambda c: columns[c], key=f"{view}_sort"
+    )
+    ascending = col_order.checkbox("Ascending", value=True, key=f"{view}_ascending")
+    page_size = col_size.selectbox("Rows per page", TABLE_PAGE_SIZES, key=f"{view}_page_size")
+    
+    # Views that ignore the sidebar aren't cached once per filter state
+    if view != "competitors":
+        filters = NO_FILTERS
+    state = (view, *filters, search, sort_by, ascending)
+    
+    # Keep the page in range when a narrower filter leaves fewer pages
+    page_key = f"{view}_page"
+    rows, page_count, total_rows = table_page(*state, st.session_state.get(page_key, 1), page_size)
+    if st.session_state.get(page_key, 1) > page_count:
+        st.session_state[page_key] = page_count
+    page = st.number_input("Page", min_value=1, max_value=page_count, step=1, key=page_key)
+    rows, page_count, total_rows = table_page(*state, page, page_size)
+    st.dataframe(
+        rows[list(columns)].rename(columns=columns),
+        hide_index=True,
+        use_container_width=True,
+        column_config=column_config
+    )
     
-    return pd.DataFrame(alerts).drop_duplicates() if alerts else pd.DataFrame()
+    first_row = (page - 1) * page_size + 1 if total_rows else 0
+    st.caption(f"Rows {first_row:,}-{first_row + len(rows) - 1 if len(rows) else 0:,} "
+               f"of {total_rows:,} · page {page} of {page_count}")
+    
+    # Export files are generated on request and cached per filter state
+    export_key = f"{view}_export"
+    col_csv, col_parquet, col_download = st.columns([1, 1, 2])
+    if col_csv.button("Prepare CSV", key=f"{view}_csv"):
+        st.session_state[export_key] = ("csv", state)
+    if PARQUET_AVAILABLE and col_parquet.button("Prepare Parquet", key=f"{view}_parquet"):
+        st.session_state[export_key] = ("parquet", state)
+    
+    export = st.session_state.get(export_key)
+    if export and export[1] == state:
+        fmt = export[0]
+        with col_download:
+            st.download_button(
+                f"⬇️ Download {fmt.upper()}",
+                export_table(*state, fmt),
+                f"{file_prefix}_{datetime.now().strftime('%Y%m%d')}.{fmt}",
+                "text/csv" if fmt == "csv" else "application/octet-stream",
+                key=f"{view}_download"
+            )
+
+def find_price_wars(threshold=5):
+    """Find products where competitors are significantly cheaper - the same exact matches the alert emails use"""
+    alerts = price_wars(load_comparisons(), threshold)
+    return pd.DataFrame(alerts) if alerts else pd.DataFrame()
 
 # Main app
 st.title("📊 IdealZ Competitor Price Monitor")
@@ -232,7 +256,6 @@ st.markdown("---")
 
 # Load data
 df = load_data()
-my_prices_json = load_my_prices()
 
 if df.empty:
     st.error("⚠️ No data available. Please run the scraper first!")
@@ -263,13 +286,20 @@ categories = st.sidebar.multiselect(
     default=all_categories
 )
 
+# Statistics of the snapshot's day, pre-aggregated by the scraper
+snapshot_day = str(df['scraped_at'].iloc[0])[:10] if 'scraped_at' in df.columns else None
+category_stats = load_category_stats()
+day_stats = category_stats[
+    (category_stats['day'] == snapshot_day) & (category_stats['is_own_shop'] == False)
+] if not category_stats.empty else pd.DataFrame()
+
 if not competitor_products_df.empty:
-    min_price = int(competitor_products_df['price_LKR'].min())
-    max_price = int(competitor_products_df['price_LKR'].max())
-    
-    # Set reasonable default range (exclude outliers)
-    q1 = competitor_products_df['price_LKR'].quantile(0.25)
-    q3 = competitor_products_df['price_LKR'].quantile(0.75)
+    if not day_stats.empty:
+        min_price = int(day_stats['min'].min())
+        max_price = int(day_stats['max'].max())
+    else:
+        min_price = int(competitor_products_df['price_LKR'].min())
+        max_price = int(competitor_products_df['price_LKR'].max())
     
     price_range = st.sidebar.slider(
         "Price Range (LKR)", 
@@ -288,6 +318,9 @@ filtered_competitor_df = competitor_products_df[
     (competitor_products_df['price_LKR'] <= price_range[1])
 ] if not competitor_products_df.empty else pd.DataFrame()
 
+# Hashable filter state used to cache table views and exports
+table_filters = (tuple(sites), tuple(categories), tuple(price_range))
+
 # Metrics
 col1, col2, col3, col4 = st.columns(4)
 with col1:
@@ -307,7 +340,7 @@ with col4:
 st.markdown("---")
 st.header("🚨 Price War Alerts")
 
-alerts_df = find_price_wars(df, my_prices_json, threshold=5)
+alerts_df = find_price_wars(threshold=5)
 
 if not alerts_df.empty:
     # Sort by savings percent
@@ -339,16 +372,16 @@ else:
 st.markdown("---")
 st.header("📈 Price Analysis")
 
-tab1, tab2, tab3, tab4 = st.tabs(["🏪 Your vs Competitors", "📊 By Category", "🔍 Product Finder", "📝 Raw Data"])
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["🏪 Your vs Competitors", "📊 By Category", "🔍 Product Finder", "📝 Raw Data", "📈 Price History", "📉 Price Index"])
 
 with tab4:
     st.subheader("📝 Raw Data Inspector")
     st.markdown("Use this to check if prices are being parsed correctly.")
     
     if not df.empty:
-        st.dataframe(
-            df.sort_values(by=['site', 'product']), 
-            use_container_width=True,
+        raw_columns = {c: c for c in df.columns}
+        paginated_table(
+            "raw", table_filters, raw_columns, "all_products",
             column_config={
                 "price_LKR": st.column_config.NumberColumn(
                     "Price (LKR)",
@@ -365,47 +398,23 @@ with tab1:
     if not your_products_df.empty and not competitor_products_df.empty:
         comparison_data = []
         
-        for _, your_prod in your_products_df.iterrows():
-            my_model = extract_model_number(your_prod['product'])
-            my_storage = extract_storage(your_prod['product'])
-            
-            if not my_model:
+        for comparison in load_comparisons().values():
+            if not comparison['matches']:
                 continue
             
-            # Find cheapest exact match
-            min_price = None
-            min_site = None
-            
-            for _, comp in competitor_products_df.iterrows():
-                comp_model = extract_model_number(comp['product'])
-                comp_storage = extract_storage(comp['product'])
-                
-                if not models_match(my_model, comp_model):
-                    continue
-                
-                # Storage must match
-                if my_storage and comp_storage:
-                    if normalize_storage(my_storage) != normalize_storage(comp_storage):
-                        continue
-                elif my_storage or comp_storage:
-                    continue
-                
-                if min_price is None or comp['price_LKR'] < min_price:
-                    min_price = comp['price_LKR']
-                    min_site = comp['site']
+            # Cheapest exact match
+            best = comparison['matches'][0]
+            product_label = f"{comparison['model'].upper()}"
+            if comparison['storage']:
+                product_label += f" {comparison['storage']}"
             
-            if min_price:
-                product_label = f"{my_model.upper()}"
-                if my_storage:
-                    product_label += f" {my_storage}"
-                
-                comparison_data.append({
-                    'Product': product_label,
-                    'Your Price': your_prod['price_LKR'],
-                    'Best Competitor': min_price,
-                    'Site': min_site,
-                    'Difference': your_prod['price_LKR'] - min_price
-                })
+            comparison_data.append({
+                'Product': product_label,
+                'Your Price': comparison['price_LKR'],
+                'Best Competitor': best['price_LKR'],
+                'Site': best['site'],
+                'Difference': comparison['price_LKR'] - best['price_LKR']
+            })
         
         if comparison_data:
             comp_df = pd.DataFrame(comparison_data)
@@ -458,8 +467,14 @@ with tab2:
     st.subheader("Average Prices by Category")
     
     if not filtered_competitor_df.empty:
-        cat_avg = filtered_competitor_df.groupby('category')['price_LKR'].agg(['mean', 'count']).reset_index()
-        cat_avg.columns = ['Category', 'Avg Price', 'Count']
+        # The aggregates cover whole categories, so they only apply without a price filter
+        if not day_stats.empty and price_range == (min_price, max_price):
+            cat_avg = category_summary(snapshot_day, tuple(sites), tuple(categories))
+        else:
+            cat_avg = filtered_competitor_df.groupby('category')['price_LKR'].agg(
+                ['count', 'mean', 'median', 'min', 'max']
+            ).reset_index()
+        cat_avg.columns = ['Category', 'Count', 'Avg Price', 'Median Price', 'Min Price', 'Max Price']
         
         fig = px.bar(
             cat_avg, 
@@ -497,21 +512,10 @@ with tab3:
             
             st.info(f"**Model:** {my_model.upper() if my_model else 'Unknown'} | **Storage:** {my_storage if my_storage else 'N/A'} | **Your Price:** LKR {your_price:,.0f}")
             
-            # Find exact matches
+            # Exact matches, precomputed for the snapshot
             matches = []
-            for _, comp in competitor_products_df.iterrows():
-                comp_model = extract_model_number(comp['product'])
-                comp_storage = extract_storage(comp['product'])
-                
-                if not models_match(my_model, comp_model):
-                    continue
-                
-                if my_storage and comp_storage:
-                    if normalize_storage(my_storage) != normalize_storage(comp_storage):
-                        continue
-                elif my_storage or comp_storage:
-                    continue
-                
+            comparison = load_comparisons().get(selected, {'matches': []})
+            for comp in comparison['matches']:
                 matches.append({
                     'Site': comp['site'],
                     'Product': comp['product'],
@@ -548,18 +552,10 @@ with col1:
 with col2:
     st.subheader("Competitor Products")
     if not filtered_competitor_df.empty:
-        display_df = filtered_competitor_df[['site', 'product', 'price_LKR']].sort_values('price_LKR')
-        display_df.columns = ['Site', 'Product', 'Price (LKR)']
-        
-        st.dataframe(display_df, hide_index=True, use_container_width=True, height=400)
-        
-        # Download
-        csv = filtered_competitor_df.to_csv(index=False)
-        st.download_button(
-            "⬇️ Download CSV",
-            csv,
-            f"competitors_{datetime.now().strftime('%Y%m%d')}.csv",
-            "text/csv"
+        paginated_table(
+            "competitors", table_filters,
+            {'site': 'Site', 'product': 'Product', 'price_LKR': 'Price (LKR)'},
+            "competitors", default_sort='price_LKR'
         )
     else:
         st.info("No competitor data")
@@ -567,4 +563,109 @@ with col2:
 # Footer
 st.markdown("---")
 if 'scraped_at' in df.columns and not df.empty:
-    st.caption(f"📅 Last updated: {df['scraped_at'].iloc[0]}")
\ No newline at end of file
+    st.caption(f"📅 Last updated: {df['scraped_at'].iloc[0]}")
+
+with tab5:
+    st.subheader("📈 Price History")
+    
+    series_options = sorted(zip(df['site'], df['product']))
+    selected_series = st.multiselect(
+        "Products",
+        series_options,
+        format_func=lambda key: f"{key[0]} — {key[1]}",
+        max_selections=10
+    )
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        history_range = st.date_input(
+            "Period",
+            (datetime.now().date() - timedelta(days=90), datetime.now().date())
+        )
+    with col2:
+        method = st.radio(
+            "Downsampling",
+            ["minmax", "lttb"],
+            format_func=lambda m: "Min/Max (keeps every spike)" if m == "minmax" else "LTTB (keeps the shape)",
+            horizontal=True
+        )
+    
+    if selected_series and len(history_range) == 2:
+        chart_data, observations = price_history(
+            tuple(selected_series), history_range[0], history_range[1], method
+        )
+        
+        if not chart_data.empty:
+            fig = px.line(
+                chart_data,
+                x='scraped_at',
+                y='price_LKR',
+                color='series',
+                line_shape='hv',
+                labels={'scraped_at': 'Date', 'price_LKR': 'Price (LKR)', 'series': 'Product'}
+            )
+            fig.update_layout(height=500, legend=dict(orientation='h', y=-0.2))
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption(f"Showing {len(chart_data):,} of {observations:,} observations")
+        else:
+            st.info("No price history recorded for these products in this period")
+    else:
+        st.info("Select products and a period to see their price history")
+
+with tab6:
+    st.subheader("📉 Competitor Price Index")
+    st.caption("Chained daily index of competitor prices (100 on the first recorded day)")
+    
+    categories_index = index_with_rolling(CATEGORY_DAILY_FILE, 'family')
+    models_index = index_with_rolling(MODEL_DAILY_FILE, 'model')
+    
+    if categories_index.empty:
+        st.info("No price index yet - it is built from the price history after each scrape")
+    else:
+        families = sorted(categories_index['family'].unique())
+        selected_families = st.multiselect("Product families", families, default=families)
+        smoothing = st.radio(
+            "Line",
+            ["index", "index_7d", "index_30d"],
+            format_func=lambda c: {"index": "Daily", "index_7d": "7-day average", "index_30d": "30-day average"}[c],
+            horizontal=True
+        )
+        
+        chart_data = categories_index[categories_index['family'].isin(selected_families)]
+        fig = px.line(
+            chart_data,
+            x='day',
+            y=smoothing,
+            color='family',
+            labels={'day': 'Date', smoothing: 'Index', 'family': 'Family'}
+        )
+        fig.update_layout(height=450, legend=dict(orientation='h', y=-0.2))
+        st.plotly_chart(fig, use_container_width=True)
+        
+        latest = pd.DataFrame()
+        if not models_index.empty:
+            latest = models_index[
+                (models_index['day'] == models_index['day'].max()) &
+                (models_index['family'].isin(selected_families))
+            ]
+        
+        if latest.empty:
+            st.info("No model prices for the selected families on the latest day")
+        else:
+            latest = latest.assign(vs_min=latest['vs_min'] * 100, vs_median=latest['vs_median'] * 100)
+            st.markdown(f"**Your position on {latest['day'].max():%Y-%m-%d}**")
+            st.dataframe(
+                latest[['family', 'model', 'offers', 'market_min', 'market_median', 'own_price',
+                        'vs_min', 'vs_median', 'index', 'volatility_30d']].sort_values(['family', 'model']),
+                column_config={
+                    'market_min': st.column_config.NumberColumn("Market min", format="LKR %d"),
+                    'market_median': st.column_config.NumberColumn("Market median", format="LKR %d"),
+                    'own_price': st.column_config.NumberColumn("Your price", format="LKR %d"),
+                    'vs_min': st.column_config.NumberColumn("vs min", format="%+.1f%%"),
+                    'vs_median': st.column_config.NumberColumn("vs median", format="%+.1f%%"),
+                    'index': st.column_config.NumberColumn("Index", format="%.1f"),
+                    'volatility_30d': st.column_config.NumberColumn("30-day volatility", format="%.3f"),
+                },
+                hide_index=True,
+                use_container_width=True
+            )
@@ -0,0 +1,73 @@
+# dashboard/downsample.py - Reduce long price series to a fixed number of points before plotting
+
+import numpy as np
+
+
+def minmax_indices(y, points):
+    """
+    Indices of the first, last, lowest and highest value of each bucket.
+    Every price spike and drop survives, whatever the length of the series.
+    """
+    n = len(y)
+    if n <= points:
+        return np.arange(n)
+
+    buckets = max(1, points // 2)
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    keep = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        window = y[start:end]
+        keep.append(start + int(np.argmin(window)))
+        keep.append(start + int(np.argmax(window)))
+    return np.unique(keep)
+
+
+def lttb_indices(x, y, points):
+    """
+    Largest-Triangle-Three-Buckets: keep, per bucket, the point that forms
+    the largest triangle with the previously kept point and the next
+    bucket's average. Preserves the visual shape of the series.
+    """
+    n = len(y)
+    if n <= points or points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, points - 1).astype(int)
+    keep = [0]
+
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean() if next_end > end else y[-1]
+
+        a = keep[-1]
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        keep.append(start + int(np.argmax(area)) if len(area) else start)
+
+    keep.append(n - 1)
+    return np.unique(keep)
+
+
+def downsample(series, points, method="minmax", x="scraped_at", y="price_LKR"):
+    """
+    Downsample one series (a DataFrame sorted by `x`) to about `points` rows.
+    Rendering cost then depends on the chart, not on how much history exists.
+    """
+    if len(series) <= points:
+        return series
+
+    values = series[y].to_numpy(dtype=float)
+    if method == "lttb":
+        positions = series[x].to_numpy(dtype="datetime64[ns]").astype("int64")
+        indices = lttb_indices(positions, values, points)
+    else:
+        indices = minmax_indices(values, points)
+    return series.iloc[indices]
@@ -0,0 +1,60 @@
+# dashboard/tables.py - Server-side filtering, sorting, paging and export for dashboard tables
+
+import io
+import math
+from pandas.io.parquet import get_engine
+
+# Parquet export needs pyarrow or fastparquet, which are optional
+try:
+    get_engine("auto")
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+def search_frame(df, text, columns=("site", "category", "product")):
+    """Keep rows where any of the given columns contains the search text (case-insensitive)"""
+    if not text:
+        return df
+
+    mask = None
+    for column in columns:
+        if column not in df.columns:
+            continue
+        hit = df[column].astype(str).str.contains(text, case=False, regex=False, na=False)
+        mask = hit if mask is None else mask | hit
+
+    return df if mask is None else df[mask]
+
+
+def sort_frame(df, column, ascending=True):
+    """
+    Sort by one column, with the product name as tie-breaker.
+    Unknown columns leave the order unchanged.
+    """
+    if not column or column not in df.columns:
+        return df
+    by = [column]
+    if column != "product" and "product" in df.columns:
+        by.append("product")
+    return df.sort_values(by, ascending=ascending, kind="mergesort")
+
+
+def page_slice(df, page, page_size):
+    """
+    Rows of one page (1-based) and the total number of pages.
+    Out-of-range pages are clamped so a shrinking filter never shows an empty page.
+    """
+    page_count = max(1, math.ceil(len(df) / page_size))
+    page = min(max(1, page), page_count)
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size], page_count
+
+
+def export_bytes(df, fmt):
+    """Serialize a table for download as CSV or Parquet"""
+    if fmt == "parquet":
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    return df.to_csv(index=False).encode("utf-8")
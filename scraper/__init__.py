@@ -1,15 +1,36 @@
 # scraper/__init__.py
 # Makes the scraper directory a Python package
+# The engines are imported on first access, so tools that only need one
+# module (lookup CLI, API, pool workers) don't load Selenium and friends.
 
-from .idealz_scraper import scrape_idealz, save_idealz_prices_to_config
-from .luxuryx_scraper import scrape_luxuryx
-from .francium_scraper import scrape_francium
-from .woocommerce_scraper import scrape_woocommerce_site
+import importlib
+
+_LAZY = {
+    'scrape_idealz': 'scraper.idealz_scraper',
+    'save_idealz_prices_to_config': 'scraper.idealz_scraper',
+    'scrape_luxuryx': 'scraper.luxuryx_scraper',
+    'scrape_francium': 'scraper.francium_scraper',
+    'scrape_woocommerce_site': 'scraper.woocommerce_scraper',
+    'scrape_sitemap': 'scraper.sitemap_scraper',
+}
 
 __all__ = [
     'scrape_idealz',
     'save_idealz_prices_to_config',
     'scrape_luxuryx',
     'scrape_francium',
-    'scrape_woocommerce_site'
-]
\ No newline at end of file
+    'scrape_woocommerce_site',
+    'scrape_sitemap'
+]
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module 'scraper' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,103 @@
+# scraper/aggregates.py - Per-(site, category, day) price statistics materialized at scrape time
+
+import os
+import pandas as pd
+from scraper.sink import write_csv_atomic
+
+STATS_FILE = "data/category_stats.csv"
+
+KEY_COLUMNS = ["site", "category", "day"]
+STAT_COLUMNS = ["is_own_shop", "count", "total", "mean", "median", "min", "max"]
+
+
+def snapshot_day(df):
+    """Day (YYYY-MM-DD) of every row, taken from its scraped_at timestamp"""
+    if "scraped_at" in df.columns:
+        return df["scraped_at"].astype(str).str[:10]
+    return pd.Series(pd.Timestamp.now().strftime("%Y-%m-%d"), index=df.index)
+
+
+def compute_stats(df):
+    """
+    Aggregate a snapshot into one row per (site, category, day).
+    `total` is kept next to `mean` so averages can be combined across
+    sites or categories without going back to the raw rows.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=KEY_COLUMNS + STAT_COLUMNS)
+
+    df = df[pd.to_numeric(df["price_LKR"], errors="coerce") > 0].copy()
+    df["price_LKR"] = pd.to_numeric(df["price_LKR"])
+    df["day"] = snapshot_day(df)
+    if "is_own_shop" not in df.columns:
+        df["is_own_shop"] = False
+    df["is_own_shop"] = df["is_own_shop"].fillna(False).astype(bool)
+
+    stats = (
+        df.groupby(KEY_COLUMNS)
+        .agg(
+            is_own_shop=("is_own_shop", "any"),
+            count=("price_LKR", "size"),
+            total=("price_LKR", "sum"),
+            mean=("price_LKR", "mean"),
+            median=("price_LKR", "median"),
+            min=("price_LKR", "min"),
+            max=("price_LKR", "max"),
+        )
+        .reset_index()
+    )
+    stats["mean"] = stats["mean"].round(2)
+    return stats
+
+
+def load_stats(path=STATS_FILE):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=KEY_COLUMNS + STAT_COLUMNS)
+    return pd.read_csv(path)
+
+
+def update_stats(df, path=STATS_FILE, by=("site", "day")):
+    """
+    Merge a new snapshot into the stored statistics.
+    Only the (site, day) pairs present in the snapshot are recomputed; a
+    later run on the same day replaces that day's figures for the sites it
+    scraped and every other row is kept as is. With by=KEY_COLUMNS only
+    the snapshot's own categories are replaced (re-extraction, whose
+    snapshots lack the categories carried forward at the time).
+    """
+    new_stats = compute_stats(df)
+    if new_stats.empty:
+        return load_stats(path)
+
+    by = list(by)
+    old_stats = load_stats(path)
+    if not old_stats.empty:
+        replaced = pd.MultiIndex.from_frame(new_stats[by].drop_duplicates())
+        keep = ~pd.MultiIndex.from_frame(old_stats[by].astype(str)).isin(replaced)
+        new_stats = pd.concat([old_stats[keep], new_stats], ignore_index=True)
+
+    new_stats = new_stats.sort_values(KEY_COLUMNS, kind="mergesort").reset_index(drop=True)
+    write_csv_atomic(new_stats, path)
+    return new_stats
+
+
+def combine_stats(stats, by):
+    """
+    Roll (site, category, day) rows up to coarser groups, e.g. by category.
+    Counts, totals, min and max combine exactly; the median of a combined
+    group is the count-weighted median of its parts' medians.
+    """
+    if stats.empty:
+        return pd.DataFrame(columns=by + ["count", "mean", "median", "min", "max"])
+
+    def weighted_median(group):
+        ordered = group.sort_values("median")
+        cumulative = ordered["count"].cumsum()
+        return ordered["median"][cumulative >= ordered["count"].sum() / 2].iloc[0]
+
+    combined = stats.groupby(by).agg(
+        count=("count", "sum"), total=("total", "sum"), min=("min", "min"), max=("max", "max")
+    )
+    combined["mean"] = (combined["total"] / combined["count"]).round(2)
+    combined["median"] = stats.groupby(by)[["count", "median"]].apply(weighted_median)
+    return combined.reset_index()[by + ["count", "mean", "median", "min", "max"]]
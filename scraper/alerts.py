@@ -0,0 +1,246 @@
+# scraper/alerts.py - Price-war alerts evaluated on changed prices and mailed as one digest per recipient
+
+import json
+import os
+import smtplib
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from scraper.matching import competitor_index, compare_product, extract_model_number, model_key
+from config import (
+    ALERT_EMAIL, PRICE_THRESHOLD_PERCENT, ALERT_COOLDOWN_HOURS, ALERT_SENDER,
+    SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_STARTTLS,
+)
+
+ALERT_LOG = "data/alerts.jsonl"
+ALERT_STATE_FILE = "data/alert_state.json"
+ALERT_PENDING_FILE = "data/alerts_pending.json"  # Alerts whose digest could not be sent yet
+MAX_REALISTIC_PERCENT = 95  # Bigger gaps are mismatches, not price wars
+
+
+def price_key(product):
+    return f"{product['site']}|{product['product']}"
+
+
+def changed_products(previous, current):
+    """Rows of the current snapshot that are new or whose price changed"""
+    old_prices = {}
+    if previous is not None and not previous.empty:
+        old_prices = dict(zip(previous["site"] + "|" + previous["product"], previous["price_LKR"]))
+
+    return [
+        product for product in current.to_dict("records")
+        if product["price_LKR"] > 0 and old_prices.get(price_key(product)) != product["price_LKR"]
+    ]
+
+
+def price_war_alert(my_product, competitor, threshold):
+    """Alert dict when the competitor is more than `threshold`% cheaper, else None"""
+    my_price = my_product["price_LKR"]
+    difference = (my_price - competitor["price_LKR"]) / my_price * 100
+    if not threshold < difference < MAX_REALISTIC_PERCENT:
+        return None
+    return {
+        "my_product": my_product["product"],
+        "my_price": my_price,
+        "competitor": competitor["site"],
+        "competitor_product": competitor["product"],
+        "competitor_price": competitor["price_LKR"],
+        "savings_percent": round(difference, 1),
+        "savings_amount": my_price - competitor["price_LKR"],
+    }
+
+
+def price_wars(comparisons, threshold=PRICE_THRESHOLD_PERCENT, moved=None):
+    """
+    Price-war alerts among the exact matches of compare_products(), the
+    same pairs the dashboard shows. With `moved` (a set of price_key()s),
+    only pairs where at least one of the two prices is in it.
+    """
+    alerts = {}
+    for mine in comparisons.values():
+        mine_moved = moved is None or price_key(mine) in moved
+        for competitor in mine["matches"]:
+            if not mine_moved and price_key(competitor) not in moved:
+                continue
+            alert = price_war_alert(mine, competitor, threshold)
+            if alert:
+                alerts[alert_key(alert)] = {**alert, "model": mine["model"], "storage": mine["storage"]}
+    return list(alerts.values())
+
+
+def evaluate_changes(changed, current, threshold=PRICE_THRESHOLD_PERCENT):
+    """
+    Price-war alerts caused by this run's price changes: pairs of your
+    product and an exact competitor match where either price is new or
+    moved. The competitor index is built once, and only your products
+    that changed or share a model with a changed competitor are compared
+    (the same matching compare_products() does for the dashboard).
+    """
+    moved = {price_key(p) for p in changed}
+    moved_models = {
+        model_key(extract_model_number(p["product"])) for p in changed if p["is_own_shop"] != True
+    } - {None}
+
+    own = current[(current["price_LKR"] > 0) & (current["is_own_shop"] == True)]
+    candidates = [
+        product for product in own[["site", "product", "price_LKR"]].to_dict("records")
+        if price_key(product) in moved or model_key(extract_model_number(product["product"])) in moved_models
+    ]
+    if not candidates:
+        return []
+
+    index = competitor_index(current)
+    comparisons = {}
+    for product in candidates:
+        comparison = compare_product(product, index)
+        if comparison:
+            comparisons[product["product"]] = comparison
+    return price_wars(comparisons, threshold, moved)
+
+
+def alert_key(alert):
+    return f"{alert['my_product']}|{alert['competitor']}|{alert['competitor_product']}"
+
+
+def load_alert_state(path=ALERT_STATE_FILE):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_alert_state(state, path=ALERT_STATE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def apply_cooldown(alerts, state, now, cooldown_hours=ALERT_COOLDOWN_HOURS):
+    """
+    Drop alerts already sent within the cooldown, unless the competitor's
+    price fell further since. Updates `state` with the alerts that pass and
+    forgets entries whose cooldown has expired.
+    """
+    cutoff = now - timedelta(hours=cooldown_hours)
+    for key in [k for k, sent in state.items() if datetime.fromisoformat(sent["sent_at"]) < cutoff]:
+        del state[key]
+
+    fresh = []
+    for alert in alerts:
+        sent = state.get(alert_key(alert))
+        if sent and alert["competitor_price"] >= sent["competitor_price"]:
+            continue
+        state[alert_key(alert)] = {
+            "sent_at": now.isoformat(timespec="seconds"),
+            "competitor_price": alert["competitor_price"],
+        }
+        fresh.append(alert)
+    return fresh
+
+
+def format_digest(alerts, now):
+    """Subject and plain-text body of one run's digest"""
+    subject = f"Price alert: {len(alerts)} competitor price{'s' if len(alerts) != 1 else ''} below yours"
+    lines = [f"Price monitor run of {now:%Y-%m-%d %H:%M}", ""]
+    for alert in sorted(alerts, key=lambda a: -a["savings_percent"]):
+        lines.append(
+            f"- {alert['my_product']}: {alert['competitor']} sells "
+            f"'{alert['competitor_product']}' for LKR {alert['competitor_price']:,.0f} "
+            f"(yours LKR {alert['my_price']:,.0f}, {alert['savings_percent']}% cheaper)"
+        )
+    return subject, "\n".join(lines) + "\n"
+
+
+def recipients_of(setting):
+    if not setting:
+        return []
+    return [setting] if isinstance(setting, str) else list(setting)
+
+
+def send_digests(alerts, recipients, now, host=SMTP_HOST, port=SMTP_PORT,
+                 user=SMTP_USER, password=SMTP_PASSWORD, starttls=SMTP_STARTTLS, sender=ALERT_SENDER):
+    """Send one digest per recipient over a single SMTP connection"""
+    subject, body = format_digest(alerts, now)
+
+    with smtplib.SMTP(host, port, timeout=30) as smtp:
+        if starttls:
+            smtp.starttls()
+        if user:
+            smtp.login(user, password)
+        for recipient in recipients:
+            message = EmailMessage()
+            message["From"] = sender
+            message["To"] = recipient
+            message["Subject"] = subject
+            message.set_content(body)
+            smtp.send_message(message)
+
+
+def log_alerts(alerts, now, path=ALERT_LOG):
+    """Append the run's alerts to the alert log (read by the dashboard and API)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for alert in alerts:
+            f.write(json.dumps({"at": now.isoformat(timespec="seconds"), **alert}, ensure_ascii=False) + "\n")
+
+
+def load_pending_alerts(path=ALERT_PENDING_FILE):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def save_pending_alerts(alerts, path=ALERT_PENDING_FILE):
+    """Keep alerts whose digest failed for the next run (an empty list clears them)"""
+    if not alerts:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    save_alert_state(alerts, path)
+
+
+def dispatch_alerts(previous, current, recipients=ALERT_EMAIL, now=None,
+                    state_path=ALERT_STATE_FILE, log_path=ALERT_LOG,
+                    pending_path=ALERT_PENDING_FILE, **smtp):
+    """
+    Run after each scrape: evaluate the changed prices, drop alerts still
+    in their cooldown, log the rest and mail them as one digest per
+    recipient. Without an SMTP host the alerts are only logged.
+
+    The next run diffs against this run's snapshot, so a digest that
+    could not be sent is never evaluated again: its alerts are kept in
+    `pending_path` and sent with the next run's digest.
+    Returns the alerts that were dispatched.
+    """
+    now = now or datetime.now()
+    state = load_alert_state(state_path)
+    changed = changed_products(previous, current)
+    alerts = apply_cooldown(evaluate_changes(changed, current), state, now) if changed else []
+    if alerts:
+        log_alerts(alerts, now, log_path)
+
+    recipients = recipients_of(recipients)
+    if recipients and smtp.get("host", SMTP_HOST):
+        # Fresher alerts replace a pending one for the same pair
+        unsent = {alert_key(a): a for a in load_pending_alerts(pending_path) + alerts}
+        alerts = list(unsent.values())
+        if alerts:
+            try:
+                send_digests(alerts, recipients, now, **smtp)
+                print(f"✓ Sent {len(alerts)} price alerts to {len(recipients)} recipient(s)")
+                save_pending_alerts([], pending_path)
+            except (smtplib.SMTPException, OSError) as e:
+                print(f"⚠ Could not send the price alert digest ({e}), retrying with the next run")
+                save_pending_alerts(alerts, pending_path)
+                alerts = []
+    elif alerts:
+        print(f"✓ Logged {len(alerts)} price alerts to '{log_path}' (no SMTP host configured)")
+
+    if changed:
+        save_alert_state(state, state_path)
+    return alerts
@@ -0,0 +1,267 @@
+# scraper/analytics.py - Daily competitor price index, market position and rolling statistics
+
+import os
+import numpy as np
+import pandas as pd
+from scraper.history import HISTORY_DIR, read_history
+from scraper.matching import extract_model_number, extract_storage, model_key, normalize_storage
+from scraper.sink import write_csv_atomic
+
+ANALYTICS_DIR = "data/analytics"
+MODEL_DAILY_FILE = "model_daily.csv"
+CATEGORY_DAILY_FILE = "category_daily.csv"
+LINK_LOOKBACK_DAYS = 7  # A price is only compared with an observation at most this old
+ROLLING_WINDOWS = (7, 30)
+
+# Product family (the category shared by every site) from the product name
+FAMILIES = [
+    ("iPhone", r"iphone"),
+    ("iPad", r"ipad"),
+    ("MacBook", r"macbook|imac|mac mini|mac studio"),
+    ("AirPods", r"airpods"),
+    ("Watch", r"watch"),
+    ("Samsung", r"samsung|galaxy"),
+]
+
+MODEL_COLUMNS = ["day", "family", "model", "market_min", "market_median", "offers",
+                 "own_price", "vs_min", "vs_median", "index"]
+CATEGORY_COLUMNS = ["day", "family", "market_median", "offers", "vs_median", "index"]
+
+
+def product_family(names):
+    """Family of every product name (vectorized); "Other" when none matches"""
+    lowered = names.str.lower()
+    family = pd.Series("Other", index=names.index)
+    for label, pattern in reversed(FAMILIES):
+        family[lowered.str.contains(pattern, regex=True)] = label
+    return family
+
+
+def model_label(name):
+    """Model and storage of a product name, e.g. "15pro 256GB" (None without a model)"""
+    model = model_key(extract_model_number(name))
+    if not model:
+        return None
+    storage = normalize_storage(extract_storage(name))
+    return f"{model} {storage}" if storage else model
+
+
+def fill_unscraped(df):
+    """
+    Rows for the days a listing's category was not scraped (not due yet,
+    or skipped by the deadline) at its last price from at most
+    LINK_LOOKBACK_DAYS earlier - the market as the snapshot showed it.
+    A listing missing on a day its category was scraped has gone.
+    """
+    days = pd.DataFrame({"day": np.sort(df["day"].unique())})
+    listings = df.groupby(["site", "product"], sort=False)["day"].min().rename("first").reset_index()
+    grid = listings.merge(days, how="cross")
+    grid = grid[grid["day"] > grid["first"]].drop(columns=["first"])
+
+    keys = ["day", "site", "product"]
+    grid = grid[~pd.MultiIndex.from_frame(grid[keys]).isin(pd.MultiIndex.from_frame(df[keys]))]
+    if grid.empty:
+        return df.iloc[:0]
+
+    last = pd.merge_asof(
+        grid.sort_values("day"), df.sort_values("day"), on="day", by=["site", "product"],
+        tolerance=pd.Timedelta(days=LINK_LOOKBACK_DAYS), allow_exact_matches=False,
+    ).dropna(subset=["price_LKR"])
+    scraped = pd.MultiIndex.from_frame(df[["day", "category"]].drop_duplicates())
+    return last[~pd.MultiIndex.from_frame(last[["day", "category"]]).isin(scraped)]
+
+
+def daily_prices(history):
+    """
+    The last price of every (site, product) on each day, as compact typed
+    columns: categorical names, float32 prices and a day timestamp.
+    Listings of categories not scraped that day keep their recent price
+    (`observed` is False on those rows). Model labels are computed once
+    per distinct product name.
+    """
+    df = history.assign(day=history["scraped_at"].dt.normalize())
+    df = df.sort_values("scraped_at").drop_duplicates(["day", "site", "product"], keep="last")
+    df = df[["day", "site", "product", "category", "price_LKR", "is_own_shop"]]
+    filled = fill_unscraped(df)
+    df = pd.concat([df.assign(observed=True), filled.assign(observed=False)], ignore_index=True)
+
+    names = pd.Series(df["product"].unique())
+    labels = dict(zip(names, names.map(model_label)))
+    families = dict(zip(names, product_family(names)))
+
+    return pd.DataFrame({
+        "day": df["day"].to_numpy(),
+        "site": pd.Categorical(df["site"]),
+        "product": pd.Categorical(df["product"]),
+        "family": pd.Categorical(df["product"].map(families)),
+        "model": pd.Categorical(df["product"].map(labels)),
+        "price": df["price_LKR"].to_numpy(dtype=np.float32),
+        "own": df["is_own_shop"].fillna(False).astype(bool).to_numpy(),
+        "observed": df["observed"].to_numpy(dtype=bool),
+    })
+
+
+def log_links(prices, level):
+    """
+    Mean log price relative of the competitor listings of each (day, key),
+    against each listing's previous observation (at most
+    LINK_LOOKBACK_DAYS earlier). exp() of it is the Jevons index link.
+    Only prices actually seen count, not ones filled in for unscraped days.
+    """
+    competitors = prices[~prices["own"] & prices["observed"]].sort_values(["site", "product", "day"])
+    by_listing = competitors.groupby(["site", "product"], observed=True)
+    previous_price = by_listing["price"].shift()
+    previous_day = by_listing["day"].shift()
+
+    recent = (competitors["day"] - previous_day) <= pd.Timedelta(days=LINK_LOOKBACK_DAYS)
+    ratio = np.log(competitors["price"].to_numpy() / previous_price.to_numpy())
+    links = competitors.assign(link=np.where(recent, ratio, np.nan)).dropna(subset=["link", level])
+    return links.groupby(["day", level], observed=True)["link"].mean()
+
+
+def chain_index(table, links, key, base=None):
+    """
+    Add the chained price index (100 on a key's first day) to a daily table.
+    `base` holds each key's index before the table's first day, so an
+    incremental update continues the stored series.
+    """
+    table = table.sort_values([key, "day"], ignore_index=True)
+    # Joined on plain strings: the two sides' categoricals have different categories
+    links = links.rename("link").reset_index().astype({key: str})
+    link = table[["day", key]].astype({key: str}).merge(links, on=["day", key], how="left")["link"]
+    link = link.fillna(0.0).to_numpy()
+    log_index = pd.Series(link).groupby(table[key].to_numpy()).cumsum().to_numpy()
+
+    start = np.full(len(table), 100.0)
+    if base is not None and not base.empty:
+        start = table[key].map(base).astype(float).fillna(100.0).to_numpy()
+    table["index"] = (start * np.exp(log_index)).astype(np.float32)
+    return table
+
+
+def model_daily(prices, since=None, base=None):
+    """Market min/median, offers and your position per (day, model) from `since` on"""
+    priced = prices[prices["model"].notna()]
+    competitors = priced[~priced["own"]]
+    market = competitors.groupby(["day", "family", "model"], observed=True)["price"].agg(
+        market_min="min", market_median="median", offers="size"
+    ).reset_index()
+    own = priced[priced["own"]].groupby(["day", "model"], observed=True)["price"].min().rename("own_price")
+
+    table = market.merge(own.reset_index(), on=["day", "model"], how="left")
+    table["vs_min"] = (table["own_price"] / table["market_min"] - 1).astype(np.float32)
+    table["vs_median"] = (table["own_price"] / table["market_median"] - 1).astype(np.float32)
+    table["offers"] = table["offers"].astype(np.int32)
+    if since is not None:
+        table = table[table["day"] >= since]
+    return chain_index(table, log_links(priced, "model"), "model", base)[MODEL_COLUMNS]
+
+
+def category_daily(prices, models, since=None, base=None):
+    """Market median, offers, your median position and the index per (day, family) from `since` on"""
+    competitors = prices[~prices["own"]]
+    table = competitors.groupby(["day", "family"], observed=True)["price"].agg(
+        market_median="median", offers="size"
+    ).reset_index()
+    position = models.groupby(["day", "family"], observed=True)["vs_median"].median()
+    table = table.merge(position.reset_index(), on=["day", "family"], how="left")
+    table["offers"] = table["offers"].astype(np.int32)
+    if since is not None:
+        table = table[table["day"] >= since]
+    return chain_index(table, log_links(prices, "family"), "family", base)[CATEGORY_COLUMNS]
+
+
+def load_daily(path):
+    """A stored daily table with its day and label columns typed, or None"""
+    try:
+        table = pd.read_csv(path, parse_dates=["day"])
+    except (OSError, ValueError):
+        return None
+    for column in ("family", "model"):
+        if column in table.columns:
+            table[column] = table[column].astype("category")
+    return table
+
+
+def first_history_day(history_dir=HISTORY_DIR):
+    """First day of the oldest history partition"""
+    if not os.path.isdir(history_dir):
+        return None
+    months = sorted(name[:7] for name in os.listdir(history_dir) if name.endswith(".csv"))
+    return pd.Timestamp(f"{months[0]}-01").date() if months else None
+
+
+def update_analytics(history_dir=HISTORY_DIR, analytics_dir=ANALYTICS_DIR, today=None, since=None):
+    """
+    Bring the daily model and category tables up to date.
+    Only days from the last stored day on are recomputed (the last day
+    may have gained a later run), reading just the history partitions
+    they need plus LINK_LOOKBACK_DAYS for the index links; each index
+    continues from its stored value. `since` recomputes from that day on
+    instead, after past history was rewritten (reextract --apply); a day
+    before the stored tables rebuilds them. Returns the number of days computed.
+    """
+    today = today or pd.Timestamp.now().date()
+    model_path = os.path.join(analytics_dir, MODEL_DAILY_FILE)
+    category_path = os.path.join(analytics_dir, CATEGORY_DAILY_FILE)
+    models, categories = load_daily(model_path), load_daily(category_path)
+
+    start = None
+    if models is not None and categories is not None and not models.empty:
+        start = models["day"].max()
+        if since is not None:
+            start = min(start, pd.Timestamp(since).normalize())
+        if start <= models["day"].min():
+            start = None  # Nothing stored before it to continue from
+    if start is None:
+        first = first_history_day(history_dir)
+        if first is None:
+            return 0
+        start, models, categories = pd.Timestamp(first), None, None
+
+    history = read_history((start - pd.Timedelta(days=LINK_LOOKBACK_DAYS)).date(), today, history_dir)
+    if history.empty:
+        return 0
+    prices = daily_prices(history)
+
+    def kept_and_base(table, key):
+        if table is None:
+            return None, None
+        kept = table[table["day"] < start]
+        return kept, kept.sort_values("day").groupby(key, observed=True)["index"].last()
+
+    kept_models, model_base = kept_and_base(models, "model")
+    kept_categories, category_base = kept_and_base(categories, "family")
+
+    # Earlier prices are only read to link the first recomputed day
+    new_models = model_daily(prices, start, model_base)
+    new_categories = category_daily(prices, new_models, start, category_base)
+
+    for kept, new, path in ((kept_models, new_models, model_path), (kept_categories, new_categories, category_path)):
+        table = new if kept is None else pd.concat([kept, new], ignore_index=True)
+        write_csv_atomic(table.sort_values(["day", table.columns[1]]).round(4), path)
+
+    return new_categories["day"].nunique()
+
+
+def rolling_stats(table, key, windows=ROLLING_WINDOWS):
+    """
+    Rolling statistics per key over calendar-day windows:
+    `index_<n>d` and `market_median_<n>d` (means), `market_min_<n>d` (for
+    model tables) and `volatility_<n>d`, the standard deviation of the
+    daily log change of the index.
+    """
+    table = table.sort_values([key, "day"], ignore_index=True)
+    table["log_change"] = np.log(table["index"].astype(float)).groupby(table[key], observed=True).diff()
+    grouped = table.set_index("day").groupby(key, observed=True, sort=False)
+
+    for n in windows:
+        window = f"{n}D"
+        means = grouped[["index", "market_median"]].rolling(window).mean()
+        table[f"index_{n}d"] = means["index"].to_numpy(dtype=np.float32)
+        table[f"market_median_{n}d"] = means["market_median"].to_numpy(dtype=np.float32)
+        if "market_min" in table.columns:
+            table[f"market_min_{n}d"] = grouped["market_min"].rolling(window).min().to_numpy(dtype=np.float32)
+        table[f"volatility_{n}d"] = grouped["log_change"].rolling(window, min_periods=2).std().to_numpy(dtype=np.float32)
+
+    return table.drop(columns=["log_change"])
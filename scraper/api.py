@@ -0,0 +1,234 @@
+# scraper/api.py - Small JSON API over the precomputed competitor comparisons
+
+import sys
+import os
+import argparse
+import bisect
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from scraper.alerts import ALERT_LOG
+from scraper.dedup import name_hash
+from scraper.matching import compare_products
+from config import API_HOST, API_PORT
+
+RELOAD_INTERVAL = 5.0  # Seconds between checks for a new snapshot or alerts
+
+
+def json_bytes(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def etag_of(body):
+    return f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+
+class ComparisonData:
+    """
+    Everything the API serves, precomputed per snapshot.
+
+    Every product of your shop is reachable by its name (in any
+    spelling that normalizes the same) or its product_id. The responses
+    for /best and /matches are serialized up front together with their
+    ETags, so a request is two dict lookups. The alert log is kept as a
+    time-sorted list that /alerts bisects.
+    """
+
+    def __init__(self, snapshot_path="data/all_products.csv", alerts_path=ALERT_LOG):
+        self.snapshot_path = snapshot_path
+        self.alerts_path = alerts_path
+        self.lock = threading.Lock()
+        self.snapshot_version = None
+        self.alerts_version = None
+        self.checked_at = 0.0
+        self.responses = {}
+        self.alert_times = []
+        self.alerts = []
+        self.alert_responses = {}
+        self.scraped_at = None
+        self.refresh(force=True)
+
+    @staticmethod
+    def file_version(path):
+        try:
+            stat = os.stat(path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def refresh(self, force=False):
+        """Rebuild whatever changed on disk (checked at most every RELOAD_INTERVAL)"""
+        now = time.monotonic()
+        if not force and now - self.checked_at < RELOAD_INTERVAL:
+            return
+        with self.lock:
+            if not force and now - self.checked_at < RELOAD_INTERVAL:
+                return
+            self.checked_at = now
+
+            version = self.file_version(self.snapshot_path)
+            if version != self.snapshot_version:
+                self.load_snapshot()
+                self.snapshot_version = version
+
+            version = self.file_version(self.alerts_path)
+            if version != self.alerts_version:
+                self.load_alerts()
+                self.alerts_version = version
+
+    def load_snapshot(self):
+        try:
+            df = pd.read_csv(self.snapshot_path)
+        except Exception:
+            df = pd.DataFrame()
+        if df.empty:
+            self.responses, self.scraped_at = {}, None
+            return
+
+        df["price_LKR"] = pd.to_numeric(df["price_LKR"], errors="coerce")
+        df["is_own_shop"] = df["is_own_shop"].fillna(False) if "is_own_shop" in df else False
+        self.scraped_at = str(df["scraped_at"].iloc[0]) if "scraped_at" in df.columns else None
+        ids = dict(zip(df["product"], df["product_id"])) if "product_id" in df.columns else {}
+
+        responses = {}
+        for name, comparison in compare_products(df).items():
+            matches = [
+                {"site": m["site"], "product": m["product"], "price_LKR": m["price_LKR"]}
+                for m in comparison["matches"]
+            ]
+            product = {
+                "product": name,
+                "product_id": ids.get(name, name_hash(name)),
+                "price_LKR": comparison["price_LKR"],
+                "model": comparison["model"],
+                "storage": comparison["storage"],
+                "scraped_at": self.scraped_at,
+            }
+            best = matches[0] if matches else None
+            best_body = json_bytes({
+                **product,
+                "best": best,
+                "difference_LKR": product["price_LKR"] - best["price_LKR"] if best else None,
+            })
+            matches_body = json_bytes({**product, "matches": matches})
+            entry = {
+                "best": (best_body, etag_of(best_body)),
+                "matches": (matches_body, etag_of(matches_body)),
+            }
+            responses[name_hash(name)] = entry
+            responses[product["product_id"]] = entry
+
+        self.responses = responses
+
+    def load_alerts(self):
+        alerts = []
+        try:
+            with open(self.alerts_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        alerts.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+        alerts.sort(key=lambda a: a.get("at", ""))
+        self.alerts = alerts
+        self.alert_times = [a.get("at", "") for a in alerts]
+        self.alert_responses = {}
+
+    def product(self, sku, view):
+        """(body, etag) of /best or /matches for a product name or id, or None"""
+        entry = self.responses.get(sku) or self.responses.get(name_hash(sku))
+        return entry[view] if entry else None
+
+    def alerts_since(self, since):
+        """(body, etag) of the alerts logged at or after an ISO timestamp or date"""
+        # Keyed by the requested value: the body echoes it back
+        cached = self.alert_responses.get(since)
+        if cached is None:
+            start = bisect.bisect_left(self.alert_times, since)
+            body = json_bytes({"since": since, "alerts": self.alerts[start:]})
+            cached = (body, etag_of(body))
+            if len(self.alert_responses) < 1024:
+                self.alert_responses[since] = cached
+        return cached
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive: clients reuse one connection
+    disable_nagle_algorithm = True  # Headers and body are separate writes
+    data = None
+
+    def do_GET(self):
+        self.data.refresh()
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path == "/health":
+            return self.send_json(200, json_bytes({"status": "ok", "scraped_at": self.data.scraped_at}))
+
+        if url.path in ("/best", "/matches"):
+            sku = params.get("sku")
+            if not sku:
+                return self.send_json(400, json_bytes({"error": "missing ?sku= (product name or product_id)"}))
+            found = self.data.product(sku, url.path[1:])
+            if not found:
+                return self.send_json(404, json_bytes({"error": f"unknown product: {sku}"}))
+            return self.send_json(200, *found)
+
+        if url.path == "/alerts":
+            return self.send_json(200, *self.data.alerts_since(params.get("since", "")))
+
+        self.send_json(404, json_bytes({"error": "not found"}))
+
+    def send_json(self, status, body, etag=None):
+        if etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")  # Revalidate with If-None-Match
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # One line per request would cost more than the request itself
+
+
+def create_server(host=API_HOST, port=API_PORT, data=None):
+    handler = type("Handler", (ApiHandler,), {"data": data or ComparisonData()})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve competitor comparisons as JSON")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args(argv)
+
+    server = create_server(args.host, args.port)
+    print(f"✓ Serving /best, /matches, /alerts and /health on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
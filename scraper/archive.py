@@ -0,0 +1,194 @@
+# scraper/archive.py - Content-addressed, compressed archive of every fetched page
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from config import ARCHIVE_DIR, ARCHIVE_PAGES, ARCHIVE_RETENTION_DAYS
+
+try:
+    import zstandard
+except ImportError:  # Optional: gzip is used when zstandard isn't installed
+    zstandard = None
+
+
+def compress(data):
+    """(compressed bytes, file extension) with the best available codec"""
+    if zstandard:
+        return zstandard.ZstdCompressor(level=10).compress(data), ".zst"
+    return gzip.compress(data, compresslevel=6), ".gz"
+
+
+def decompress(data, extension):
+    if extension == ".zst":
+        if zstandard is None:
+            raise RuntimeError("zstandard is needed to read .zst blobs")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class PageArchive:
+    """
+    Raw pages keyed by the SHA-256 of their content.
+
+    Blobs live in blobs/<aa>/<sha256>.zst|.gz and are written once: a page
+    that did not change between runs costs one manifest line, not another
+    copy. Every run appends to manifests/<run_id>.jsonl, one line per
+    fetched page with its run, site, category, page, URL, engine and blob
+    hash, so a run's pages can be reprocessed without network access.
+    """
+
+    def __init__(self, root=ARCHIVE_DIR, run_id=None):
+        self.root = root
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.blobs_dir = os.path.join(root, "blobs")
+        self.manifests_dir = os.path.join(root, "manifests")
+        self.lock = threading.Lock()
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+
+    def blob_path(self, digest, extension):
+        return os.path.join(self.blobs_dir, digest[:2], digest + extension)
+
+    def find_blob(self, digest):
+        for extension in (".zst", ".gz"):
+            path = self.blob_path(digest, extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def store(self, content, site, category, page, url=None, engine=None):
+        """Archive one page and record it in this run's manifest; returns its hash"""
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        digest = hashlib.sha256(data).hexdigest()
+
+        if not self.find_blob(digest):
+            blob, extension = compress(data)
+            path = self.blob_path(digest, extension)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Unique temp name: workers in other processes may store the same page
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+
+        entry = {
+            "run": self.run_id, "site": site, "category": category, "page": page,
+            "url": url, "engine": engine, "blob": digest, "bytes": len(data),
+            "at": datetime.now().isoformat(timespec="seconds"),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self.lock:
+            # One O_APPEND write per line keeps lines whole across processes
+            fd = os.open(self.manifest_path(self.run_id), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line.encode("utf-8"))
+            finally:
+                os.close(fd)
+        return digest
+
+    def mark_published(self, scraped_at):
+        """Record the scraped_at stamp of the snapshot this run published"""
+        entry = {"run": self.run_id, "published_at": scraped_at}
+        with self.lock:
+            with open(self.manifest_path(self.run_id), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def published_at(self, run_id):
+        """scraped_at of the run's published snapshot, or None if it never published"""
+        published = None
+        for entry in self._read_manifest(run_id):
+            published = entry.get("published_at", published)
+        return published
+
+    def load(self, digest):
+        """Decompressed content of a blob, as text"""
+        path = self.find_blob(digest)
+        if not path:
+            raise KeyError(digest)
+        with open(path, "rb") as f:
+            return decompress(f.read(), os.path.splitext(path)[1]).decode("utf-8", errors="replace")
+
+    def manifest_path(self, run_id):
+        return os.path.join(self.manifests_dir, f"{run_id}.jsonl")
+
+    def runs(self):
+        """Archived run ids, oldest first"""
+        return sorted(
+            name[:-len(".jsonl")] for name in os.listdir(self.manifests_dir) if name.endswith(".jsonl")
+        )
+
+    def _read_manifest(self, run_id):
+        if not run_id or not os.path.exists(self.manifest_path(run_id)):
+            return []
+        lines = []
+        with open(self.manifest_path(run_id), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    lines.append(json.loads(line))
+                except ValueError:
+                    continue  # Torn last line from a crash
+        return lines
+
+    def entries(self, run_id=None):
+        """Page entries of one run's manifest (default: the latest archived run)"""
+        run_id = run_id or (self.runs() or [None])[-1]
+        return [entry for entry in self._read_manifest(run_id) if "blob" in entry]
+
+    def prune(self, retention_days=ARCHIVE_RETENTION_DAYS):
+        """
+        Drop manifests older than the retention window, then every blob
+        no remaining manifest refers to. Returns (runs, blobs) removed.
+        """
+        cutoff = time.time() - retention_days * 86400
+        removed_runs = 0
+        for run_id in self.runs():
+            path = self.manifest_path(run_id)
+            if run_id != self.run_id and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed_runs += 1
+
+        referenced = {entry["blob"] for run_id in self.runs() for entry in self.entries(run_id)}
+        removed_blobs = 0
+        for directory, _, files in os.walk(self.blobs_dir):
+            for name in files:
+                digest = name.split(".")[0]
+                if name.endswith(".tmp") or digest in referenced:
+                    continue
+                os.remove(os.path.join(directory, name))
+                removed_blobs += 1
+        return removed_runs, removed_blobs
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_archive():
+    """
+    The archive for the current run, or None when ARCHIVE_PAGES is off or
+    no run is in progress. The run id comes from SCRAPER_RUN_ID, which the
+    orchestrator sets so that worker processes write to the same run's
+    manifest; engines called on their own don't archive.
+    """
+    global _archive
+    run_id = os.environ.get("SCRAPER_RUN_ID")
+    if not ARCHIVE_PAGES or not run_id:
+        return None
+    with _archive_lock:
+        if _archive is None or _archive.run_id != run_id:
+            _archive = PageArchive(ARCHIVE_DIR, run_id)
+        return _archive
+
+
+def archive_page(content, site, category, page, url=None, engine=None):
+    """Store a fetched page if archiving is enabled; never fails the scrape"""
+    try:
+        archive = get_archive()
+        if archive and content:
+            archive.store(content, site, category, page, url, engine)
+    except Exception as e:
+        print(f"    ⚠ Could not archive {url or site}: {e}")
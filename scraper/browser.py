@@ -0,0 +1,175 @@
+# scraper/browser.py - Shared Chrome setup and memory accounting for Selenium workers
+
+import glob
+import os
+import re
+from config import CHROME_PROFILE_DIR, CHROME_DISK_CACHE_MB
+
+try:
+    import fcntl
+except ImportError:  # Windows: run without persistent profiles
+    fcntl = None
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+MAX_PROFILE_SLOTS = 8  # Concurrent browsers that can each hold a copy of one profile
+
+
+def chrome_options():
+    """Headless Chrome options that work for every engine"""
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument(f"user-agent={USER_AGENT}")
+    # IdealZ reads the app's data back from the network log
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+class ProfileSlot:
+    """
+    One copy of a persistent profile, locked for the life of a browser.
+    Chrome refuses to share a user-data-dir, so concurrent workers each
+    take their own slot; the lock is dropped automatically if the
+    process dies.
+    """
+
+    def __init__(self, path, lock_file):
+        self.path = path
+        self.lock_file = lock_file
+
+    def release(self):
+        if not self.lock_file.closed:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+            self.lock_file.close()
+
+
+def profile_name(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "default"
+
+
+def acquire_profile(name, root=None, slots=MAX_PROFILE_SLOTS):
+    """
+    Lock a free slot of the named profile under `root` (CHROME_PROFILE_DIR).
+    Returns None when profiles are disabled or every slot is in use, in
+    which case the browser simply starts with a blank profile.
+    """
+    root = root or CHROME_PROFILE_DIR
+    if not root or fcntl is None:
+        return None
+
+    for slot in range(slots):
+        path = os.path.join(root, profile_name(name), f"slot-{slot}")
+        os.makedirs(path, exist_ok=True)
+        lock_file = open(f"{path}.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            continue
+
+        # Left behind by a browser that was killed; we hold the slot now
+        for stale in glob.glob(os.path.join(path, "Singleton*")):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+        return ProfileSlot(path, lock_file)
+
+    print(f"    All {slots} '{name}' profile slots are busy, using a blank profile")
+    return None
+
+
+def use_profile(options, slot, cache_mb=CHROME_DISK_CACHE_MB):
+    """Point Chrome at a profile slot with a bounded disk cache"""
+    options.add_argument(f"--user-data-dir={os.path.abspath(slot.path)}")
+    options.add_argument(f"--disk-cache-dir={os.path.abspath(os.path.join(slot.path, 'cache'))}")
+    options.add_argument(f"--disk-cache-size={cache_mb * 1024 * 1024}")
+    return options
+
+
+def create_driver(options=None, profile=None):
+    """
+    Start a Chrome instance that can be reused across engines and jobs.
+    With CHROME_PROFILE_DIR set, a `profile` name (usually the site) gives
+    it a persistent profile so cached front-end assets survive between
+    runs. Stop it with quit_driver() so the profile slot is released.
+    """
+    from selenium import webdriver
+
+    options = options or chrome_options()
+    slot = acquire_profile(profile) if profile else None
+    if slot:
+        use_profile(options, slot)
+
+    try:
+        driver = webdriver.Chrome(options=options)
+    except Exception:
+        if slot:
+            slot.release()
+        raise
+
+    driver.profile_slot = slot
+    return driver
+
+
+def quit_driver(driver):
+    """Quit a browser and release its profile slot"""
+    try:
+        driver.quit()
+    finally:
+        slot = getattr(driver, "profile_slot", None)
+        if slot:
+            slot.release()
+
+
+def available_memory_mb():
+    """MemAvailable from /proc/meminfo (falls back to total physical memory)"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return 2048
+
+
+def process_tree_rss_mb(pid=None):
+    """
+    Resident memory of a process and all of its descendants, in MB.
+    A worker's browser (chromedriver + Chrome renderers) are its children.
+    """
+    pid = pid or os.getpid()
+    children = {}
+    rss_pages = {}
+
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Process names may contain spaces: fields resume after the last ')'
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{entry}/statm") as f:
+                rss_pages[int(entry)] = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        total += rss_pages.get(current, 0)
+        stack.extend(children.get(current, []))
+
+    return total * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
@@ -0,0 +1,217 @@
+# scraper/daemon.py - Long-running scrape service: cron-like schedule, health and metrics endpoints
+
+import json
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import DAEMON_HOST, DAEMON_PORT, DAEMON_SCHEDULE
+
+# (lowest, highest) value of each field: minute, hour, day of month, month,
+# day of week (0 and 7 are both Sunday)
+CRON_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+def parse_field(field, lowest, highest):
+    """Values of one cron field: *, */n, a, a-b, a-b/n and comma-separated lists"""
+    values = set()
+    for part in field.split(","):
+        spec, _, step = part.partition("/")
+        if spec == "*":
+            start, end = lowest, highest
+        elif "-" in spec:
+            start, end = (int(v) for v in spec.split("-"))
+        else:
+            start = end = int(spec)
+        if not lowest <= start <= end <= highest:
+            raise ValueError(f"Invalid cron field '{field}'")
+        values.update(range(start, end + 1, int(step or 1)))
+    return values
+
+
+def parse_cron(expression):
+    """Five-field cron expression -> list of allowed value sets"""
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ValueError(f"Cron expression needs 5 fields, got '{expression}'")
+    parsed = [parse_field(field, *bounds) for field, bounds in zip(fields, CRON_FIELDS)]
+    parsed[4] = {day % 7 for day in parsed[4]}
+    return parsed
+
+
+def next_run(expression, after):
+    """First minute strictly after `after` that matches the cron expression"""
+    minutes, hours, days, months, weekdays = parse_cron(expression)
+    fields = expression.split()
+    # As in cron, a restricted day of month and day of week match either one
+    either_day = fields[2] != "*" and fields[4] != "*"
+
+    start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    for offset in range(366 * 5):
+        day = start.date() + timedelta(days=offset)
+        by_month_day = day.day in days
+        by_weekday = (day.weekday() + 1) % 7 in weekdays  # cron counts from Sunday
+        if day.month not in months:
+            continue
+        if not ((by_month_day or by_weekday) if either_day else (by_month_day and by_weekday)):
+            continue
+        for hour in sorted(hours):
+            for minute in sorted(minutes):
+                candidate = datetime(day.year, day.month, day.day, hour, minute)
+                if candidate >= start:
+                    return candidate
+    raise ValueError(f"Cron expression '{expression}' never matches")
+
+
+class DaemonState:
+    """What /health and /metrics report, updated by the scheduling loop"""
+
+    def __init__(self, schedule):
+        self.schedule = schedule
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.running = False
+        self.next_run = None
+        self.runs = 0
+        self.failures = 0
+        self.last_status = None
+        self.last_error = None
+        self.last_started = None
+        self.last_finished = None
+        self.last_success = None
+        self.last_duration = None
+        self.last_products = 0
+
+    def run_started(self):
+        with self.lock:
+            self.running = True
+            self.last_started = time.time()
+
+    def run_finished(self, products=0, error=None):
+        with self.lock:
+            self.running = False
+            self.runs += 1
+            self.last_finished = time.time()
+            self.last_duration = self.last_finished - self.last_started
+            if error is None:
+                self.last_status, self.last_error = "ok", None
+                self.last_success = self.last_finished
+                self.last_products = products
+            else:
+                self.failures += 1
+                self.last_status, self.last_error = "failed", str(error)
+
+    def health(self):
+        with self.lock:
+            return {
+                "status": "degraded" if self.last_status == "failed" else "ok",
+                "schedule": self.schedule,
+                "running": self.running,
+                "next_run": self.next_run.isoformat(timespec="seconds") if self.next_run else None,
+                "last_run": self.last_status,
+                "last_error": self.last_error,
+                "last_success": _isoformat(self.last_success),
+                "products": self.last_products,
+            }
+
+    def metrics(self):
+        """Prometheus text exposition format"""
+        with self.lock:
+            values = [
+                ("scraper_up", "gauge", "Daemon is running", 1),
+                ("scraper_uptime_seconds", "gauge", "Seconds since the daemon started", time.time() - self.started_at),
+                ("scraper_running", "gauge", "A scrape is in progress", int(self.running)),
+                ("scraper_runs_total", "counter", "Scrapes finished", self.runs),
+                ("scraper_run_failures_total", "counter", "Scrapes that raised", self.failures),
+                ("scraper_last_run_duration_seconds", "gauge", "Duration of the last scrape", self.last_duration or 0),
+                ("scraper_last_success_timestamp_seconds", "gauge", "When the last snapshot was published", self.last_success or 0),
+                ("scraper_last_products", "gauge", "Products in the last snapshot", self.last_products),
+                ("scraper_next_run_timestamp_seconds", "gauge", "When the next scrape starts",
+                 self.next_run.timestamp() if self.next_run else 0),
+            ]
+        lines = []
+        for name, kind, description, value in values:
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}", f"{name} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+
+def _isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds") if timestamp else None
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    state = None
+
+    def do_GET(self):
+        if self.path == "/health":
+            health = self.state.health()
+            status = 503 if health["status"] != "ok" else 200
+            return self.send_body(status, json.dumps(health).encode("utf-8"), "application/json")
+        if self.path == "/metrics":
+            return self.send_body(200, self.state.metrics().encode("utf-8"), "text/plain; version=0.0.4")
+        self.send_body(404, b'{"error": "not found"}', "application/json")
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scraped every few seconds by monitoring
+
+
+def serve_status(state, host=DAEMON_HOST, port=DAEMON_PORT):
+    """Start the /health and /metrics server in a background thread"""
+    handler = type("Handler", (DaemonHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_daemon(scrape, schedule=DAEMON_SCHEDULE, host=DAEMON_HOST, port=DAEMON_PORT, stop=None, run_now=False):
+    """
+    Call `scrape()` (which publishes a snapshot and returns it) at every
+    time the cron schedule matches, until SIGTERM/SIGINT or `stop` is set.
+    A scrape in progress is always finished before returning; slots that
+    pass while a scrape is still running are skipped, not queued.
+    """
+    parse_cron(schedule)  # Fail at startup, not at the first run
+    stop = stop or threading.Event()
+    state = DaemonState(schedule)
+    server = serve_status(state, host, port)
+
+    def request_stop(signum, frame):
+        print(f"\n⏹ Received signal {signum}, stopping after the current run")
+        stop.set()
+
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, request_stop)
+
+    print(f"✓ Daemon running on schedule '{schedule}', health and metrics on http://{host}:{server.server_port}")
+    try:
+        while not stop.is_set():
+            if not run_now:
+                state.next_run = next_run(schedule, datetime.now())
+                print(f"⏰ Next run at {state.next_run:%Y-%m-%d %H:%M}")
+                if stop.wait(max(0.0, (state.next_run - datetime.now()).total_seconds())):
+                    break
+            run_now = False
+
+            state.run_started()
+            try:
+                df = scrape()
+            except Exception as e:
+                print(f"✗ Run failed: {e}")
+                state.run_finished(error=e)
+            else:
+                state.run_finished(products=len(df) if df is not None else 0)
+    finally:
+        server.shutdown()
+        server.server_close()
+    print("✓ Daemon stopped")
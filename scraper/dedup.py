@@ -0,0 +1,57 @@
+# scraper/dedup.py - Collapse listings that appear under several categories of the same site
+
+import hashlib
+import re
+import unicodedata
+
+CATEGORY_SEPARATOR = "|"
+
+
+def normalize_name(name):
+    """Lowercase, Unicode-normalized product name with punctuation and spacing collapsed"""
+    name = unicodedata.normalize("NFKC", str(name)).lower()
+    return re.sub(r"[\W_]+", " ", name).strip()
+
+
+def name_hash(name):
+    """Stable short id of a product name, the same however a listing page formats it"""
+    return hashlib.sha1(normalize_name(name).encode("utf-8")).hexdigest()[:16]
+
+
+def _price_rank(product):
+    """Prices seen this run before ones carried from an earlier fetch, then the lowest valid price"""
+    price = product.get("price_LKR")
+    return (
+        bool(product.get("carried_from")),
+        price if isinstance(price, (int, float)) and price > 0 else float("inf"),
+    )
+
+
+def dedupe_products(products):
+    """
+    One row per (site, normalized name).
+    Every category a listing was found under is kept in `categories`
+    (joined with "|"); `category` stays the one of the kept row. When
+    the copies disagree on price the lowest valid price wins, but a price
+    seen this run always beats one carried from an earlier fetch (see
+    scraper/sitemap_scraper.py). Each row gets its `product_id` (the name
+    hash). Order of first appearance is preserved.
+    """
+    unique = {}
+    for product in products:
+        key = (product["site"], name_hash(product["product"]))
+        kept = unique.get(key)
+
+        if kept is None:
+            unique[key] = dict(product, product_id=key[1], categories=[product["category"]])
+            continue
+
+        categories = kept["categories"]
+        if product["category"] not in categories:
+            categories.append(product["category"])
+        if _price_rank(product) < _price_rank(kept):
+            unique[key] = dict(product, product_id=key[1], categories=categories)
+
+    for product in unique.values():
+        product["categories"] = CATEGORY_SEPARATOR.join(product["categories"])
+    return list(unique.values())
@@ -0,0 +1,147 @@
+# scraper/engine_selector.py - Try plain HTTP first, fall back to Selenium only when needed
+
+import json
+import os
+from datetime import datetime, timedelta
+import pandas as pd
+from scraper.dedup import CATEGORY_SEPARATOR
+from scraper.engines import get_engine
+from scraper.sink import BufferedSink
+from config import SELENIUM_RECHECK_DAYS, STATIC_MIN_YIELD
+
+ENGINE_STATE_FILE = "data/engine_state.json"
+
+
+def load_engine_state(path=ENGINE_STATE_FILE):
+    """Remembered engine per site: {site: {"engine", "decided_at", "counts"}}"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_engine_state(state, path=ENGINE_STATE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def snapshot_counts(path="data/all_products.csv"):
+    """Products per category in the last snapshot, used before any history exists"""
+    try:
+        df = pd.read_csv(path)
+    except Exception:
+        return {}
+    # Merged listings count towards every category they were found under
+    if "categories" in df.columns:
+        memberships = df["categories"].fillna(df["category"]).str.split(CATEGORY_SEPARATOR).explode()
+        return memberships.value_counts().to_dict()
+    return df["category"].value_counts().to_dict()
+
+
+class EngineSelector:
+    """
+    Picks the engine for each WooCommerce category.
+
+    The static `requests` engine is tried first. Its yield is compared with
+    the category's usual product count; an empty or short result escalates
+    to Selenium. A site that needed Selenium keeps using it until the
+    decision is SELENIUM_RECHECK_DAYS old, then static is tried again.
+    """
+
+    def __init__(
+        self,
+        state_path=ENGINE_STATE_FILE,
+        snapshot_path="data/all_products.csv",
+        selenium_engine=None,
+        static_engine=None,
+    ):
+        # selenium_engine lets the Selenium fallback run elsewhere (e.g. a worker pool);
+        # by default both engines come from the registry on first use
+        self.selenium_engine = selenium_engine
+        self.static_engine = static_engine
+        self.state_path = state_path
+        self.state = load_engine_state(state_path)
+        self.fallback_counts = snapshot_counts(snapshot_path)
+
+    def site_state(self, site_name):
+        return self.state.setdefault(site_name, {"engine": "static", "counts": {}})
+
+    def expected_count(self, site_name, category):
+        counts = self.site_state(site_name).get("counts", {})
+        return counts.get(category, self.fallback_counts.get(category, 0))
+
+    def needs_selenium(self, site_name):
+        site = self.site_state(site_name)
+        if site.get("engine") != "selenium":
+            return False
+        decided_at = datetime.fromisoformat(site.get("decided_at", "1970-01-01T00:00:00"))
+        return datetime.now() - decided_at < timedelta(days=SELENIUM_RECHECK_DAYS)
+
+    def decide(self, site_name, engine):
+        site = self.site_state(site_name)
+        if site.get("engine") != engine or engine == "selenium":
+            site["decided_at"] = datetime.now().isoformat(timespec="seconds")
+        site["engine"] = engine
+
+    def record(self, site_name, category, count):
+        if count:
+            self.site_state(site_name).setdefault("counts", {})[category] = count
+        save_engine_state(self.state, self.state_path)
+
+    def run_selenium(self, url, category, site_name, sink=None):
+        engine = self.selenium_engine or get_engine("selenium_woocommerce")
+        return engine(url, category, site_name, sink=sink)
+
+    def scrape(self, url, category, site_name, sink=None):
+        """Scrape one category with the cheapest engine that gives a full result"""
+        # Pages checkpointed by an earlier attempt of this run count towards the yield
+        resumed = resumed_count(sink, site_name, category)
+
+        if self.needs_selenium(site_name):
+            print(f"  (using Selenium for {site_name})")
+            products = self.run_selenium(url, category, site_name, sink=sink)
+            self.record(site_name, category, len(products) + resumed)
+            return products
+
+        # Static attempt writes to a buffer so a rejected result is discarded
+        buffer = BufferedSink(sink)
+        static_engine = self.static_engine or get_engine("woocommerce")
+        products = static_engine(url, category, site_name, sink=buffer)
+        count = len(products) + resumed
+        expected = self.expected_count(site_name, category)
+
+        if count > 0 and count >= expected * STATIC_MIN_YIELD:
+            buffer.commit()
+            self.decide(site_name, "static")
+            self.record(site_name, category, count)
+            return products
+
+        print(
+            f"  Static HTML gave {count} products (usually {expected}), "
+            f"escalating {site_name} to Selenium"
+        )
+        # Selenium writes to a buffer too: whichever engine found more is kept
+        selenium_buffer = BufferedSink(sink)
+        selenium_products = self.run_selenium(url, category, site_name, sink=selenium_buffer)
+        # Only remember Selenium if it actually did better (the site may just be down)
+        if len(selenium_products) + resumed <= count:
+            buffer.commit()
+            self.record(site_name, category, count)
+            return products
+
+        selenium_buffer.commit()
+        self.decide(site_name, "selenium")
+        self.record(site_name, category, len(selenium_products) + resumed)
+        return selenium_products
+
+
+def resumed_count(sink, site_name, category):
+    """Products of this category already checkpointed by an earlier attempt"""
+    if sink is None:
+        return 0
+    pages = sink.completed_pages(site_name, category)
+    return sum(entry.get("products", 0) for entry in pages.values())
@@ -0,0 +1,43 @@
+# scraper/engines.py - Registry of scraping engines, each imported only when a job needs it
+
+import importlib
+import threading
+
+# name -> (module, function). Engine modules pull in Selenium, requests or
+# BeautifulSoup, so nothing here is imported until get_engine() asks for it.
+ENGINES = {
+    "idealz": ("scraper.idealz_scraper", "scrape_idealz"),
+    "luxuryx": ("scraper.luxuryx_scraper", "scrape_luxuryx"),
+    "francium": ("scraper.francium_scraper", "scrape_francium"),
+    "woocommerce": ("scraper.woocommerce_scraper", "scrape_woocommerce_site"),
+    "selenium_woocommerce": ("scraper.selenium_woocommerce_scraper", "scrape_with_selenium"),
+    "sitemap": ("scraper.sitemap_scraper", "scrape_sitemap"),
+}
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def register_engine(name, module, function):
+    """Add (or replace) an engine, e.g. from a plugin module"""
+    with _lock:
+        ENGINES[name] = (module, function)
+        _loaded.pop(name, None)
+
+
+def get_engine(name):
+    """The engine's scrape function, importing its module on first use"""
+    engine = _loaded.get(name)
+    if engine is None:
+        try:
+            module, function = ENGINES[name]
+        except KeyError:
+            raise ValueError(f"Unknown engine: {name} (known: {', '.join(sorted(ENGINES))})")
+        engine = getattr(importlib.import_module(module), function)
+        with _lock:
+            _loaded[name] = engine
+    return engine
+
+
+def engine_names():
+    return sorted(ENGINES)
@@ -1,113 +1,140 @@
 # scraper/francium_scraper.py - Scraper for Francium.lk (uses Selenium)
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
 import time
 from scraper.utils import parse_price
+from scraper.rate_limiter import get_rate_limiter
+from scraper.archive import archive_page
+from scraper.browser import create_driver, quit_driver
+from scraper.grid_cache import grid_hash, cached_page
 
 
-def scrape_francium(url, category):
+def scrape_francium(url, category, sink=None, driver=None):
     """Scrape Francium.lk pages"""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    )
-
-    driver = None
+
+    # A driver passed in (e.g. by a pool worker) is reused and left running
+    owns_driver = driver is None
     products = []
+    digest = None
+    error = None
+
+    if sink and sink.completed("Francium", category, 1):
+        print("    Already scraped in this run")
+        return products
 
     try:
-        driver = webdriver.Chrome(options=chrome_options)
+        if owns_driver:
+            driver = create_driver(profile="Francium")
+        get_rate_limiter().acquire(url, category)
         driver.get(url)
         time.sleep(5)  # Wait for JavaScript to load
+        html = driver.page_source
+        archive_page(html, "Francium", category, 1, url, "selenium")
 
-        # Try multiple selectors for product cards
-        product_selectors = [
-            "div.product-card",
-            "div.product",
-            "li.product-item",
-            "div.product-item",
-            "article[data-product-id]",
-            "a.product-link",
-        ]
-
-        product_cards = []
-        for selector in product_selectors:
-            try:
-                product_cards = driver.find_elements(By.CSS_SELECTOR, selector)
-                if product_cards:
-                    print(
-                        f"    Found {len(product_cards)} products using selector: {selector}"
-                    )
-                    break
-            except Exception:
-                continue
-
-        for card in product_cards:
-            try:
-                # Try multiple selectors for product name
-                name = None
-                name_selectors = [
-                    ".product-card__title",
-                    ".product-title",
-                    "h2",
-                    "h3",
-                    "a.product-link",
-                ]
-                for name_sel in name_selectors:
-                    try:
-                        elem = card.find_element(By.CSS_SELECTOR, name_sel)
-                        name = elem.text.strip()
-                        if name and len(name) > 3:
-                            break
-                    except Exception:
-                        continue
-
-                # Try multiple selectors for price
-                price = None
-                price_selectors = [
-                    ".price",
-                    ".product-price",
-                    "span.price",
-                    "span[data-price]",
-                    ".selling-price",
-                    "span.amount",
-                ]
-                price_text = None
-                for price_sel in price_selectors:
-                    try:
-                        elems = card.find_elements(By.CSS_SELECTOR, price_sel)
-                        if elems:
-                            price_text = elems[-1].text  # Get last price element
-                            price = parse_price(price_text)
-                            if price:
-                                break
-                    except Exception:
-                        continue
-
-                if price and name and len(name) > 3:
-                    products.append(
-                        {
-                            "site": "Francium",
-                            "category": category,
-                            "product": name,
-                            "price_LKR": price,
-                            "is_own_shop": False,
-                        }
-                    )
-            except Exception as e:
-                continue
+        # An unchanged grid reuses last run's products without reading the DOM
+        digest = grid_hash(html)
+        cached = cached_page("Francium", category, 1, digest)
+        if cached:
+            products = cached["products"]
+            print(f"    Grid unchanged, reusing {len(products)} products of the last run")
+        else:
+            products = extract_francium(driver, category)
 
     except Exception as e:
         print(f"  ✗ Error scraping {url}: {e}")
+        error = e
     finally:
-        if driver:
-            driver.quit()
+        if driver and owns_driver:
+            quit_driver(driver)
+
+    if sink:
+        if products:
+            sink.write_job("Francium", category, 1, products, grid_hash=digest)
+        else:
+            sink.fail_job("Francium", category, 1, error or "no products found")
+
+    return products
+
+
+def extract_francium(driver, category):
+    """Products from the rendered collection page's product cards"""
+    products = []
+
+    # Try multiple selectors for product cards
+    product_selectors = [
+        "div.product-card",
+        "div.product",
+        "li.product-item",
+        "div.product-item",
+        "article[data-product-id]",
+        "a.product-link",
+    ]
+
+    product_cards = []
+    for selector in product_selectors:
+        try:
+            product_cards = driver.find_elements(By.CSS_SELECTOR, selector)
+            if product_cards:
+                print(
+                    f"    Found {len(product_cards)} products using selector: {selector}"
+                )
+                break
+        except Exception:
+            continue
+
+    for card in product_cards:
+        try:
+            # Try multiple selectors for product name
+            name = None
+            name_selectors = [
+                ".product-card__title",
+                ".product-title",
+                "h2",
+                "h3",
+                "a.product-link",
+            ]
+            for name_sel in name_selectors:
+                try:
+                    elem = card.find_element(By.CSS_SELECTOR, name_sel)
+                    name = elem.text.strip()
+                    if name and len(name) > 3:
+                        break
+                except Exception:
+                    continue
+
+            # Try multiple selectors for price
+            price = None
+            price_selectors = [
+                ".price",
+                ".product-price",
+                "span.price",
+                "span[data-price]",
+                ".selling-price",
+                "span.amount",
+            ]
+            price_text = None
+            for price_sel in price_selectors:
+                try:
+                    elems = card.find_elements(By.CSS_SELECTOR, price_sel)
+                    if elems:
+                        price_text = elems[-1].text  # Get last price element
+                        price = parse_price(price_text)
+                        if price:
+                            break
+                except Exception:
+                    continue
+
+            if price and name and len(name) > 3:
+                products.append(
+                    {
+                        "site": "Francium",
+                        "category": category,
+                        "product": name,
+                        "price_LKR": price,
+                        "is_own_shop": False,
+                    }
+                )
+        except Exception as e:
+            continue
 
     return products
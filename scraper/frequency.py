@@ -0,0 +1,105 @@
+# scraper/frequency.py - Scrape volatile categories every run and stable ones only as often as they change
+
+import math
+from datetime import timedelta
+import pandas as pd
+from scraper.dedup import CATEGORY_SEPARATOR, name_hash
+from scraper.history import HISTORY_DIR, read_history
+from config import FREQUENCY_MAX_AGE_HOURS, FREQUENCY_SLACK_HOURS, FREQUENCY_TARGET_CHANGE, FREQUENCY_WINDOW_DAYS
+
+
+def category_rates(history):
+    """
+    Learned volatility of every category:
+        {category: {"rate": price changes per product per day, "last_scraped": Timestamp}}
+    The rate is the number of changes seen between consecutive observations
+    of the same product divided by the product-days they span; it is None
+    while a category has been observed only once.
+    """
+    if history.empty:
+        return {}
+    history = history.sort_values("scraped_at", ignore_index=True)
+    by_product = history.groupby(["site", "product"])
+    previous_price = by_product["price_LKR"].shift()
+    previous_time = by_product["scraped_at"].shift()
+
+    spans = history.assign(
+        changed=(history["price_LKR"] != previous_price) & previous_price.notna(),
+        days=(history["scraped_at"] - previous_time).dt.total_seconds() / 86400,
+    )
+    totals = spans.groupby("category").agg(
+        changes=("changed", "sum"),
+        days=("days", "sum"),
+        last_scraped=("scraped_at", "max"),
+    )
+    return {
+        category: {
+            "rate": row.changes / row.days if row.days > 0 else None,
+            "last_scraped": row.last_scraped,
+        }
+        for category, row in totals.iterrows()
+    }
+
+
+def scrape_interval(rate):
+    """
+    Hours after which FREQUENCY_TARGET_CHANGE of a category's products are
+    expected to have changed price (changes modelled as a Poisson process),
+    capped at FREQUENCY_MAX_AGE_HOURS so every category is refreshed.
+    """
+    if not rate:
+        return FREQUENCY_MAX_AGE_HOURS
+    hours = -math.log(1 - FREQUENCY_TARGET_CHANGE) / rate * 24
+    return min(hours, FREQUENCY_MAX_AGE_HOURS)
+
+
+def plan_frequency(jobs, history_dir=HISTORY_DIR, now=None):
+    """
+    Split jobs into (due, skipped) for this run.
+    A category is due once its last scrape is older than its interval
+    (less FREQUENCY_SLACK_HOURS, since runs don't start on the minute), or
+    when there is not yet enough history to know how fast it moves.
+    """
+    now = pd.Timestamp(now or pd.Timestamp.now())
+    window_start = (now - timedelta(days=FREQUENCY_WINDOW_DAYS)).date()
+    rates = category_rates(read_history(window_start, now.date(), history_dir))
+
+    due, skipped = [], []
+    for job in jobs:
+        learned = rates.get(job.category)
+        if not learned or learned["rate"] is None:
+            due.append(job)
+            continue
+        age = (now - learned["last_scraped"]).total_seconds() / 3600
+        job.interval = scrape_interval(learned["rate"])
+        (due if age >= job.interval - FREQUENCY_SLACK_HOURS else skipped).append(job)
+    return due, skipped
+
+
+def carry_forward(previous, skipped_categories):
+    """
+    Rows of the previous snapshot to publish again for categories not
+    scraped this run. A listing found under several categories is only
+    carried when none of them was scraped. `carried_from` keeps the time
+    the price was actually seen, so history never records it twice.
+    """
+    skipped_categories = set(skipped_categories)
+    if previous.empty or not skipped_categories:
+        return []
+
+    rows = previous.copy()
+    if "categories" not in rows.columns:
+        rows["categories"] = rows["category"]
+    if "product_id" not in rows.columns:
+        rows["product_id"] = rows["product"].map(name_hash)
+    if "carried_from" not in rows.columns:
+        rows["carried_from"] = None
+    rows["carried_from"] = rows["carried_from"].fillna(rows["scraped_at"])
+
+    members = rows["categories"].fillna(rows["category"]).str.split(CATEGORY_SEPARATOR)
+    carried = members.map(lambda categories: set(categories) <= skipped_categories)
+    rows = rows[carried].drop(columns=["scraped_at"])
+    return [
+        {key: value for key, value in row.items() if not pd.isna(value)}
+        for row in rows.to_dict("records")
+    ]
@@ -0,0 +1,125 @@
+# scraper/grid_cache.py - Reuse last run's products for pages whose product grid has not changed
+
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import date, timedelta
+from scraper.sink import job_key
+
+GRID_HASH_FILE = "data/grid_hashes.json"
+GRID_CACHE_VERSION = 1  # Bump when an engine's extraction changes, so cached pages are parsed again
+GRID_CACHE_MAX_AGE_DAYS = 30  # Entries of pages not seen for this long are dropped
+
+# Where the product grid starts (WooCommerce and most shop themes) and ends
+GRID_START = re.compile(
+    r'<(?:ul|div|section)\b[^>]*class="[^"]*\b(?:products|product-grid|product-list|collection)\b', re.I
+)
+GRID_END = re.compile(r"<footer\b|</main>|id=\"colophon\"", re.I)
+
+NOISE = re.compile(r"<(script|style|noscript|svg)\b.*?</\1\s*>|<!--.*?-->", re.I | re.S)
+HREF = re.compile(r'\shref="([^"?#]*)[^"]*"', re.I)
+TAG = re.compile(r"<[^>]+>")
+SPACE = re.compile(r"\s+")
+
+
+def grid_region(html):
+    """
+    The part of a page that holds the product grid (and its pagination).
+    Falls back to the <body> when no grid container is recognized.
+    """
+    start = GRID_START.search(html)
+    if start is None:
+        start = re.search(r"<body\b", html, re.I)
+    begin = start.start() if start else 0
+    end = GRID_END.search(html, begin)
+    return html[begin:end.start() if end else len(html)]
+
+
+def grid_hash(html):
+    """
+    Hash of what extraction reads from the grid: its visible text and link
+    paths. Scripts, styles, comments, attributes (nonces, lazy-load image
+    URLs, tracking parameters) and whitespace are dropped first, so pages
+    that differ only by ads or timestamps outside the grid hash the same.
+    """
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    region = NOISE.sub(" ", grid_region(html))
+    region = TAG.sub(lambda m: " " + " ".join(HREF.findall(m.group(0))) + " ", region)
+    text = SPACE.sub(" ", region).strip()
+    return hashlib.sha1(f"{GRID_CACHE_VERSION}:{text}".encode("utf-8")).hexdigest()
+
+
+def load_grid_hashes(path=GRID_HASH_FILE):
+    """{job key: {"hash", "products", "page_count", "seen"}} of every cached page"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+_cache = None
+_cache_version = None
+_cache_lock = threading.Lock()
+
+
+def _grid_hashes(path=GRID_HASH_FILE):
+    """The cache file, reloaded when it changes (pool workers outlive a daemon run)"""
+    global _cache, _cache_version
+    try:
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        version = None
+    with _cache_lock:
+        if _cache is None or version != _cache_version:
+            _cache, _cache_version = load_grid_hashes(path), version
+        return _cache
+
+
+def cached_page(site, category, page, digest, path=GRID_HASH_FILE):
+    """
+    Last run's entry for a page whose grid hashes the same, or None.
+    Engines use its "products" (and "page_count") instead of extracting.
+    """
+    entry = _grid_hashes(path).get(job_key(site, category, page))
+    if entry and entry.get("hash") == digest and entry.get("products"):
+        return entry
+    return None
+
+
+def save_grid_hashes(sink, path=GRID_HASH_FILE, today=None):
+    """
+    Record the grid hash and products of every page this run finished.
+    Entries of pages not scraped this run are kept (their category may
+    just not have been due) until GRID_CACHE_MAX_AGE_DAYS old.
+    Returns the number of pages recorded from this run.
+    """
+    today = today or date.today()
+    entries = load_grid_hashes(path)
+    staged = sink.read_staged(by_job=True)
+
+    recorded = 0
+    for key, job in sink.jobs.items():
+        if job["status"] != "done" or not job.get("grid_hash") or not staged.get(key):
+            continue
+        entries[key] = {
+            "hash": job["grid_hash"],
+            "products": staged[key],
+            "page_count": job.get("page_count", 1),
+            "seen": today.isoformat(),
+        }
+        recorded += 1
+
+    cutoff = (today - timedelta(days=GRID_CACHE_MAX_AGE_DAYS)).isoformat()
+    entries = {key: entry for key, entry in entries.items() if entry.get("seen", "") >= cutoff}
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    os.replace(tmp_path, path)
+    return recorded
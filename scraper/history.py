@@ -0,0 +1,117 @@
+# scraper/history.py - Append-only price history, partitioned by month
+
+import os
+from datetime import date
+import pandas as pd
+from scraper.sink import write_csv_atomic
+
+HISTORY_DIR = "data/history"
+HISTORY_COLUMNS = ["site", "category", "product", "price_LKR", "cash_price_LKR", "is_own_shop", "scraped_at"]
+
+
+def partition_path(month, history_dir=HISTORY_DIR):
+    """CSV file holding one month (YYYY-MM) of observations"""
+    return os.path.join(history_dir, f"{month}.csv")
+
+
+def months_between(start, end):
+    """Every YYYY-MM from the month of `start` to the month of `end`, inclusive"""
+    year, month = start.year, start.month
+    months = []
+    while (year, month) <= (end.year, end.month):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def append_history(df, history_dir=HISTORY_DIR):
+    """
+    Append a snapshot to its month's partition.
+    Rows whose (site, product, scraped_at) is already in the partition are
+    skipped: a resumed run publishes again under its first stamp (see
+    ProductSink.published_at), so only the jobs it retried are added. Rows
+    carried forward from an earlier run were recorded when they were seen.
+    Returns the number of rows appended.
+    """
+    if df.empty or "scraped_at" not in df.columns:
+        return 0
+
+    if "carried_from" in df.columns:
+        df = df[df["carried_from"].isna()]
+    df = df.reindex(columns=HISTORY_COLUMNS)
+    df = df[pd.to_numeric(df["price_LKR"], errors="coerce") > 0]
+    os.makedirs(history_dir, exist_ok=True)
+
+    appended = 0
+    for month, rows in df.groupby(df["scraped_at"].astype(str).str[:7]):
+        path = partition_path(month, history_dir)
+        exists = os.path.exists(path)
+        if exists:
+            keys = ["site", "product", "scraped_at"]
+            recorded = pd.MultiIndex.from_frame(pd.read_csv(path, usecols=keys)[keys].astype(str))
+            rows = rows[~pd.MultiIndex.from_frame(rows[keys].astype(str)).isin(recorded)]
+        if rows.empty:
+            continue
+
+        with open(path, "a", encoding="utf-8", newline="") as f:
+            rows.to_csv(f, index=False, header=not exists)
+            f.flush()
+            os.fsync(f.fileno())
+        appended += len(rows)
+
+    return appended
+
+
+def read_partition(path):
+    """One month's observations, or None if nothing was recorded that month"""
+    return pd.read_csv(path) if os.path.exists(path) else None
+
+
+def read_history(start=None, end=None, history_dir=HISTORY_DIR, read=read_partition):
+    """
+    Observations between two dates, reading only the partitions that
+    overlap the range. `read` lets callers load partitions from elsewhere
+    (e.g. the dashboard falling back to GitHub).
+    """
+    end = end or date.today()
+    start = start or date(end.year - 1, end.month, 1)
+
+    frames = []
+    for month in months_between(start, end):
+        frame = read(partition_path(month, history_dir))
+        if frame is not None and not frame.empty:
+            frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+
+    history = pd.concat(frames, ignore_index=True)
+    history["scraped_at"] = pd.to_datetime(history["scraped_at"], errors="coerce")
+    history["price_LKR"] = pd.to_numeric(history["price_LKR"], errors="coerce")
+    in_range = (history["scraped_at"].dt.date >= start) & (history["scraped_at"].dt.date <= end)
+    return history[in_range & history["price_LKR"].notna()]
+
+
+def replace_history(df, history_dir=HISTORY_DIR):
+    """
+    Swap the recorded observations of some snapshots for new ones.
+    Every scraped_at stamp present in `df` is removed from its month's
+    partition and replaced by df's rows; everything else is kept. Used
+    when pages are re-extracted with fixed parsing. Returns rows written.
+    """
+    if df.empty:
+        return 0
+
+    df = df.reindex(columns=HISTORY_COLUMNS)
+    df = df[pd.to_numeric(df["price_LKR"], errors="coerce") > 0]
+    os.makedirs(history_dir, exist_ok=True)
+
+    written = 0
+    for month, rows in df.groupby(df["scraped_at"].astype(str).str[:7]):
+        path = partition_path(month, history_dir)
+        written += len(rows)
+        if os.path.exists(path):
+            recorded = pd.read_csv(path)
+            replaced = recorded["scraped_at"].astype(str).isin(set(rows["scraped_at"].astype(str)))
+            rows = pd.concat([recorded[~replaced], rows], ignore_index=True)
+        write_csv_atomic(rows.sort_values("scraped_at", kind="mergesort"), path)
+    return written
@@ -0,0 +1,218 @@
+# scraper/idealz_payload.py - Read IdealZ prices from the app's data instead of rendered text
+
+import json
+import re
+from urllib.parse import urljoin, urlparse
+from bs4 import BeautifulSoup
+from scraper.utils import parse_price, http_session
+from scraper.rate_limiter import get_rate_limiter
+from scraper.archive import archive_page
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+}
+
+SITE = "IdealZ (Your Shop)"
+CATEGORY = "IdealZ All Products"
+NAME_KEYS = ("name", "product", "productName", "model", "title")
+MAX_ASSETS = 12
+
+# Flat object literals inside a JS bundle, and their key: value pairs
+OBJECT_LITERAL = re.compile(r'\{[^{}]{0,600}\}')
+LITERAL_PAIR = re.compile(
+    r'["\']?([A-Za-z_$][\w$]*)["\']?\s*:\s*("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|-?\d+(?:\.\d+)?)'
+)
+JSON_PARSE_CALL = re.compile(r'JSON\.parse\(\s*\'((?:[^\'\\]|\\.)*)\'\s*\)')
+
+
+def product_from_record(record):
+    """Turn one data record into (name, standard_price, cash_price), or None"""
+    name = next(
+        (record[k].strip() for k in NAME_KEYS if isinstance(record.get(k), str) and record[k].strip()),
+        None,
+    )
+    if not name:
+        return None
+
+    standard_price = None
+    cash_price = None
+    for key, value in record.items():
+        if "price" not in key.lower() or isinstance(value, (dict, list, bool)) or value is None:
+            continue
+        price = parse_price(str(value))
+        if not price or price <= 100:
+            continue
+        if "cash" in key.lower():
+            cash_price = cash_price or price
+        else:
+            standard_price = standard_price or price
+
+    standard_price = standard_price or cash_price
+    if not standard_price:
+        return None
+    return name, standard_price, cash_price or standard_price
+
+
+def find_records(node):
+    """Walk decoded JSON and yield every (name, standard, cash) record, in order"""
+    if isinstance(node, dict):
+        record = product_from_record(node)
+        if record:
+            yield record
+            return
+        for value in node.values():
+            yield from find_records(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from find_records(item)
+
+
+def records_from_text(text):
+    """Extract product records from a JSON document or a JS bundle"""
+    try:
+        return list(find_records(json.loads(text)))
+    except ValueError:
+        pass
+
+    records = []
+
+    # Bundlers often inline big data sets as JSON.parse('...')
+    for match in JSON_PARSE_CALL.finditer(text):
+        try:
+            raw = match.group(1).encode().decode("unicode_escape")
+            records.extend(find_records(json.loads(raw)))
+        except (ValueError, UnicodeDecodeError):
+            continue
+
+    # Otherwise the price list is a plain array of object literals
+    if not records:
+        for match in OBJECT_LITERAL.finditer(text):
+            fields = {}
+            for key, value in LITERAL_PAIR.findall(match.group(0)):
+                fields[key] = value[1:-1] if value[0] in "\"'" else value
+            record = product_from_record(fields)
+            if record:
+                records.append(record)
+
+    return records
+
+
+def to_products(records, categorize):
+    """Records -> standard product dicts for the sink/CSV"""
+    return [
+        {
+            "site": SITE,
+            "category": categorize(name),
+            "product": name,
+            "price_LKR": standard_price,
+            "cash_price_LKR": cash_price,
+            "is_own_shop": True,
+        }
+        for name, standard_price, cash_price in records
+    ]
+
+
+def asset_urls(html, base_url):
+    """Same-origin scripts and data files referenced by the app shell"""
+    soup = BeautifulSoup(html, "html.parser")
+    host = urlparse(base_url).netloc
+    urls = []
+
+    for tag in soup.select("script[src], link[href]"):
+        ref = tag.get("src") or tag.get("href")
+        if tag.name == "link" and not (
+            ref.endswith((".js", ".json")) or "preload" in " ".join(tag.get("rel", []))
+        ):
+            continue
+        full = urljoin(base_url, ref)
+        if urlparse(full).netloc == host and full not in urls:
+            urls.append(full)
+
+    return urls[:MAX_ASSETS]
+
+
+def fetch_idealz_payload(url, categorize):
+    """
+    Load the IdealZ price list straight from the static data assets.
+    Fetches the app shell and its same-origin JS/JSON bundles with plain
+    requests (no browser) and parses every product of every tab.
+    Returns [] when no product data could be located.
+    """
+    limiter = get_rate_limiter()
+    session = http_session()
+
+    limiter.acquire(url, "IdealZ")
+    response = session.get(url, headers=HEADERS, timeout=20)
+    response.raise_for_status()
+    archive_page(response.text, SITE, CATEGORY, 1, url, "payload")
+
+    records = records_from_text(response.text)
+    pending = asset_urls(response.text, url)
+    seen = set()
+
+    while pending and len(seen) < MAX_ASSETS:
+        asset = pending.pop(0)
+        if asset in seen:
+            continue
+        seen.add(asset)
+
+        limiter.acquire(asset, "IdealZ")
+        asset_response = session.get(asset, headers=HEADERS, timeout=20)
+        if asset_response.status_code != 200:
+            continue
+        archive_page(asset_response.text, SITE, CATEGORY, 1, asset, "payload")
+
+        records.extend(records_from_text(asset_response.text))
+
+        # Lazy-loaded chunks and JSON files referenced from the entry bundle
+        for ref in re.findall(r'["\']((?:/|\./)?[\w./-]+\.(?:json|js))["\']', asset_response.text):
+            full = urljoin(asset, ref)
+            if urlparse(full).netloc == urlparse(url).netloc and full not in seen:
+                pending.append(full)
+
+    return to_products(dedupe_records(records), categorize)
+
+
+def capture_network_payload(driver, categorize):
+    """
+    Parse product data out of the responses the browser received.
+    Needs Chrome started with the "goog:loggingPrefs" performance log enabled.
+    """
+    records = []
+    host = urlparse(driver.current_url).netloc
+
+    for entry in driver.get_log("performance"):
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        if message.get("method") != "Network.responseReceived":
+            continue
+
+        response = message["params"]["response"]
+        mime = response.get("mimeType", "")
+        if urlparse(response.get("url", "")).netloc != host:
+            continue
+        if "json" not in mime and "javascript" not in mime:
+            continue
+
+        try:
+            body = driver.execute_cdp_cmd(
+                "Network.getResponseBody", {"requestId": message["params"]["requestId"]}
+            )
+        except Exception:
+            continue
+        archive_page(body.get("body", ""), SITE, CATEGORY, 1, response.get("url"), "payload")
+        records.extend(records_from_text(body.get("body", "")))
+
+    return to_products(dedupe_records(records), categorize)
+
+
+def dedupe_records(records):
+    seen = set()
+    unique = []
+    for record in records:
+        if record not in seen:
+            seen.add(record)
+            unique.append(record)
+    return unique
@@ -1,162 +1,168 @@
 # scraper/idealz_scraper.py - Custom scraper for IdealZ (React/Vue app)
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
 import time
 import re
+from scraper.rate_limiter import get_rate_limiter
+from scraper.archive import archive_page
+from scraper.idealz_payload import fetch_idealz_payload, capture_network_payload
+from scraper.browser import create_driver, quit_driver
 from scraper.utils import parse_price
 
-def scrape_idealz(url="https://idealzpricelist.netlify.app/"):
+# Rendered text format: product name on one line and "Rs. X    Rs. Y"
+# (standard and cash price) on the same line or within the next 3 lines
+TABS = ("Apple Devices", "Android Devices", "Mac & iPad", "Watch & Accessories")
+HEADER_LINES = frozenset([
+    'Price List', 'Apple Care', 'Genext', 'Company', 'Apple Devices',
+    'Android Devices', 'Accessories', 'iPhone', 'Mac & iPad', 'Watch & Accessories',
+])
+PRICE_PATTERN = re.compile(r'Rs\.\s*([\d,]+)')
+PRODUCT_KEYWORDS = re.compile(r'iPhone|iPad|MacBook|AirPods|Watch|Galaxy|Samsung')
+PRICE_LOOKAHEAD = 3
+
+def scrape_idealz(url="https://idealzpricelist.netlify.app/", sink=None, driver=None):
     """
     Scrape IdealZ price list - Custom for React/Vue app
+    
+    The app's own data (static JSON/JS assets) is read first with plain
+    requests, which covers every tab in about a second. Chrome is only
+    started when that fails; it then captures the data from the browser's
+    network log before falling back to parsing the rendered text.
     """
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
     
-    driver = None
+    # A driver passed in (e.g. by a pool worker) is reused and left running
+    owns_driver = driver is None
     products = []
+    error = None
+    
+    if sink and sink.completed("IdealZ (Your Shop)", "IdealZ All Products", 1):
+        print("  Already scraped in this run")
+        return products
     
     try:
-        driver = webdriver.Chrome(options=chrome_options)
+        products = fetch_idealz_payload(url, categorize_product)
+        if products:
+            print(f"  Loaded {len(products)} products from the app's data assets")
+    except Exception as e:
+        print(f"  Could not read the app's data assets: {e}")
+    
+    if products:
+        if sink:
+            sink.write_job("IdealZ (Your Shop)", "IdealZ All Products", 1, products)
+        return products
+    
+    try:
+        if owns_driver:
+            driver = create_driver(profile="IdealZ")
+        get_rate_limiter().acquire(url, "IdealZ")
         driver.get(url)
         
         # Wait longer for React/Vue to render
         print("  Waiting for page to load...")
         time.sleep(8)
         
-        # Click on iPhone tab to load products
+        # The data the app rendered from is in the network log
+        products = capture_network_payload(driver, categorize_product)
+        if products:
+            print(f"  Captured {len(products)} products from the app's network payload")
+        else:
+            products = scrape_rendered_text(driver)
+                
+    except Exception as e:
+        print(f"  ✗ Error scraping IdealZ: {e}")
+        error = e
+    finally:
+        if driver and owns_driver:
+            quit_driver(driver)
+    
+    if sink:
+        if products:
+            sink.write_job("IdealZ (Your Shop)", "IdealZ All Products", 1, products)
+        else:
+            sink.fail_job(
+                "IdealZ (Your Shop)", "IdealZ All Products", 1, error or "no products found"
+            )
+    
+    return products
+
+def scrape_rendered_text(driver):
+    """
+    Fallback: parse products out of the rendered page text.
+    Every tab is opened in the same browser session and the texts are
+    parsed together in a single pass.
+    """
+    texts = []
+    
+    for tab in TABS:
         try:
-            iphone_button = driver.find_element(By.XPATH, "//button[contains(text(), 'iPhone')]")
-            iphone_button.click()
-            time.sleep(3)
-        except Exception as e:
-            print("  Could not click iPhone button, trying alternative...")
+            button = driver.find_element(By.XPATH, f"//button[contains(text(), '{tab}')]")
+        except Exception:
+            continue
         
-        # Get all text content from the page
-        page_text = driver.find_element(By.TAG_NAME, "body").text
+        before = driver.find_element(By.TAG_NAME, "body").text
+        button.click()
+        # Wait until the tab's content has replaced the previous one
+        try:
+            WebDriverWait(driver, 3).until(
+                lambda d: d.find_element(By.TAG_NAME, "body").text != before
+            )
+        except Exception:
+            pass
+        texts.append(driver.find_element(By.TAG_NAME, "body").text)
+    
+    if not texts:
+        print("  Could not find the category tabs, parsing the current page...")
+        texts.append(driver.find_element(By.TAG_NAME, "body").text)
+    
+    text = "\n".join(texts)
+    archive_page(text, "IdealZ (Your Shop)", "IdealZ All Products", 1, driver.current_url, "rendered-text")
+    return parse_idealz_text(text)
+
+def parse_idealz_text(text):
+    """
+    Single-pass parser for the rendered IdealZ price list.
+    Each line is visited once: product-name lines are held as pending until
+    a price line arrives (at most PRICE_LOOKAHEAD lines later), so the whole
+    text is parsed in O(lines).
+    """
+    products = []
+    pending_name = None
+    pending_at = 0
+    
+    for index, line in enumerate(text.splitlines()):
+        line = line.strip()
+        if not line or line in HEADER_LINES:
+            continue
         
-        # Parse the text to extract products
-        # Format appears to be: "Product Name    Rs. XXX,XXX    Rs. XXX,XXX"
-        lines = page_text.split('\n')
+        prices = PRICE_PATTERN.findall(line) if 'Rs.' in line else None
         
-        for i, line in enumerate(lines):
-            line = line.strip()
-            
-            # Skip empty lines and headers
-            if not line or line in ['Price List', 'Apple Care', 'Genext', 'Company', 
-                                     'Apple Devices', 'Android Devices', 'Accessories',
-                                     'iPhone', 'Mac & iPad', 'Watch & Accessories']:
-                continue
-            
-            # Look for lines with "iPhone", "iPad", "MacBook", "AirPods", "Watch", "Samsung"
-            if any(keyword in line for keyword in ['iPhone', 'iPad', 'MacBook', 'AirPods', 'Watch', 'Galaxy', 'Samsung']):
-                # Check if next lines contain prices
-                try:
-                    # Pattern: Product name on one line, prices on next lines
-                    product_name = line
-                    
-                    # Look ahead for price lines
-                    standard_price = None
-                    cash_price = None
-                    
-                    for j in range(1, 4):  # Check next 3 lines
-                        if i + j < len(lines):
-                            next_line = lines[i + j].strip()
-                            
-                            # Extract prices using regex
-                            prices = re.findall(r'Rs\.\s*([\d,]+)', next_line)
-                            
-                            if len(prices) >= 2:
-                                standard_price = parse_price(prices[0])
-                                cash_price = parse_price(prices[1])
-                                break
-                            elif len(prices) == 1:
-                                standard_price = parse_price(prices[0])
-                                cash_price = standard_price
-                                break
-                    
-                    # If we found prices in the same line
-                    if not standard_price:
-                        prices = re.findall(r'Rs\.\s*([\d,]+)', line)
-                        if len(prices) >= 2:
-                            # Extract product name (remove prices)
-                            product_name = re.sub(r'Rs\.\s*[\d,]+', '', line).strip()
-                            standard_price = parse_price(prices[0])
-                            cash_price = parse_price(prices[1])
-                        elif len(prices) == 1:
-                            product_name = re.sub(r'Rs\.\s*[\d,]+', '', line).strip()
-                            standard_price = parse_price(prices[0])
-                            cash_price = standard_price
-                    
-                    if standard_price:
-                        category = categorize_product(product_name)
-                        
-                        products.append({
-                            "site": "IdealZ (Your Shop)",
-                            "category": category,
-                            "product": product_name,
-                            "price_LKR": standard_price,
-                            "cash_price_LKR": cash_price if cash_price else standard_price,
-                            "is_own_shop": True
-                        })
-                        
-                except Exception:
+        if prices:
+            name = PRICE_PATTERN.sub('', line).strip()
+            if not PRODUCT_KEYWORDS.search(name):
+                # A price line belongs to the pending product name, if close enough
+                if pending_name is None or index - pending_at > PRICE_LOOKAHEAD:
+                    pending_name = None
                     continue
-        
-        # Alternative approach: Try to find product elements by class or structure
-        if len(products) == 0:
-            print("  Trying alternative extraction method...")
+                name = pending_name
             
-            # Look for all div elements that might contain products
-            elements = driver.find_elements(By.XPATH, "//*[contains(text(), 'iPhone') or contains(text(), 'iPad') or contains(text(), 'MacBook')]")
+            standard_price = parse_price(prices[0])
+            cash_price = parse_price(prices[1]) if len(prices) > 1 else standard_price
+            pending_name = None
             
-            for elem in elements:
-                try:
-                    text = elem.text.strip()
-                    if 'Rs.' in text:
-                        # Extract product and prices
-                        prices = re.findall(r'Rs\.\s*([\d,]+)', text)
-                        product_name = re.sub(r'Rs\.\s*[\d,]+', '', text).strip()
-                        
-                        if prices and product_name:
-                            standard_price = parse_price(prices[0])
-                            cash_price = parse_price(prices[1]) if len(prices) > 1 else standard_price
-                            
-                            if standard_price:
-                                category = categorize_product(product_name)
-                                
-                                products.append({
-                                    "site": "IdealZ (Your Shop)",
-                                    "category": category,
-                                    "product": product_name,
-                                    "price_LKR": standard_price,
-                                    "cash_price_LKR": cash_price,
-                                    "is_own_shop": True
-                                })
-                except Exception:
-                    continue
-        
-        # Remove duplicates
-        seen = set()
-        unique_products = []
-        for p in products:
-            key = (p['product'], p['price_LKR'])
-            if key not in seen:
-                seen.add(key)
-                unique_products.append(p)
+            if standard_price:
+                products.append({
+                    "site": "IdealZ (Your Shop)",
+                    "category": categorize_product(name),
+                    "product": name,
+                    "price_LKR": standard_price,
+                    "cash_price_LKR": cash_price or standard_price,
+                    "is_own_shop": True
+                })
         
-        products = unique_products
-                
-    except Exception as e:
-        print(f"  ✗ Error scraping IdealZ: {e}")
-    finally:
-        if driver:
-            driver.quit()
+        elif PRODUCT_KEYWORDS.search(line):
+            pending_name = line
+            pending_at = index
     
     return products
 
@@ -0,0 +1,136 @@
+# scraper/lookup.py - Fast price lookups from the command line, without Streamlit or pandas
+
+import sys
+import os
+import argparse
+import json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper.matching import extract_model_number, extract_storage, normalize_storage, model_key
+from scraper.dedup import normalize_name
+
+LOOKUP_INDEX = "data/lookup_index.json"
+COLUMNS = ["site", "product", "price_LKR", "is_own_shop", "model", "storage"]
+
+
+def build_lookup_index(df, path=LOOKUP_INDEX):
+    """
+    Write the compact index the CLI reads: only the columns a lookup
+    needs, stored as rows, plus a model -> row numbers map. Built by the
+    scraper right after the snapshot is published.
+    """
+    rows, models = [], {}
+    for product in df[df["price_LKR"] > 0].to_dict("records"):
+        model = model_key(extract_model_number(product["product"]))
+        storage = normalize_storage(extract_storage(product["product"]))
+        if model:
+            models.setdefault(model, []).append(len(rows))
+        rows.append([
+            product["site"], product["product"], product["price_LKR"],
+            bool(product["is_own_shop"]), model, storage,
+        ])
+
+    index = {
+        "scraped_at": str(df["scraped_at"].iloc[0]) if "scraped_at" in df.columns else None,
+        "columns": COLUMNS,
+        "rows": rows,
+        "models": models,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+def load_index(path=LOOKUP_INDEX):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def lookup(index, query=None, model=None, storage=None, site=None):
+    """
+    Rows matching a query, cheapest first, as dicts.
+    A query naming a model ("iPhone 15 Pro 256GB") is answered from the
+    model map with exact storage; anything else is a name search.
+    """
+    if query and not model:
+        model = extract_model_number(query)
+        storage = storage or extract_storage(query)
+    storage = normalize_storage(storage) if storage else None
+
+    rows = index["rows"]
+    if model:
+        candidates = [rows[i] for i in index["models"].get(model_key(model), [])]
+        if storage:
+            candidates = [row for row in candidates if row[5] == storage]
+    elif query:
+        words = normalize_name(query).split()
+        candidates = [row for row in rows if all(w in normalize_name(row[1]) for w in words)]
+    else:
+        candidates = []
+
+    if site:
+        candidates = [row for row in candidates if site.lower() in row[0].lower()]
+
+    matches = [dict(zip(index["columns"], row)) for row in candidates]
+    return sorted(matches, key=lambda m: m["price_LKR"])
+
+
+def print_results(matches, scraped_at):
+    """Aligned table with each competitor's difference to your price"""
+    own = next((m["price_LKR"] for m in matches if m["is_own_shop"]), None)
+    print(f"{len(matches)} results (prices of {scraped_at})")
+
+    width = min(max(len(m["product"]) for m in matches), 50)
+    for m in matches:
+        line = f"  {m['site'][:22]:<22} {m['product'][:width]:<{width}}  LKR {m['price_LKR']:>11,.0f}"
+        if own and not m["is_own_shop"]:
+            difference = m["price_LKR"] - own
+            line += f"  {difference:>+10,.0f} ({difference / own * 100:+.1f}%)"
+        elif m["is_own_shop"]:
+            line += "  (yours)"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Look up competitor prices from the index built by the last scrape"
+    )
+    parser.add_argument("query", nargs="*", help="Product name, e.g. iPhone 15 Pro 256GB (quotes optional)")
+    parser.add_argument("--model", help='Model number, e.g. "15 pro max"')
+    parser.add_argument("--storage", help="Storage, e.g. 256GB or 1TB")
+    parser.add_argument("--site", help="Only this site (substring)")
+    parser.add_argument("--cheapest", action="store_true", help="Only the cheapest competitor")
+    parser.add_argument("--json", action="store_true", help="Machine-readable output")
+    parser.add_argument("--index", default=LOOKUP_INDEX)
+    args = parser.parse_args(argv)
+    args.query = " ".join(args.query) or None
+
+    if not args.query and not args.model:
+        parser.error("give a product name or --model")
+
+    try:
+        index = load_index(args.index)
+    except OSError:
+        print(f"✗ No lookup index at '{args.index}' - run the scraper first", file=sys.stderr)
+        return 2
+
+    matches = lookup(index, args.query, args.model, args.storage, args.site)
+    if args.cheapest:
+        matches = [m for m in matches if not m["is_own_shop"]][:1]
+
+    if args.json:
+        print(json.dumps({"scraped_at": index["scraped_at"], "results": matches}, ensure_ascii=False))
+    elif matches:
+        print_results(matches, index["scraped_at"])
+    else:
+        print("No matching products")
+
+    # Scripts can test the exit status
+    return 0 if matches else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,122 +1,152 @@
 # scraper/luxuryx_scraper.py - Fixed to remove zero prices
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
 import time
 from scraper.utils import parse_price
+from scraper.rate_limiter import get_rate_limiter
+from scraper.archive import archive_page
+from scraper.browser import create_driver, quit_driver
+from scraper.grid_cache import grid_hash, cached_page
 
 
-def scrape_luxuryx(url, category):
+def scrape_luxuryx(url, category, sink=None, driver=None):
     """Scrape LuxuryX.lk with proper price extraction"""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-
-    driver = None
+
+    # A driver passed in (e.g. by a pool worker) is reused and left running
+    owns_driver = driver is None
     products = []
+    digest = None
+    error = None
+
+    if sink and sink.completed("LuxuryX", category, 1):
+        print("    Already scraped in this run")
+        return products
 
     try:
-        driver = webdriver.Chrome(options=chrome_options)
+        if owns_driver:
+            driver = create_driver(profile="LuxuryX")
+        get_rate_limiter().acquire(url, category)
         driver.get(url)
         time.sleep(6)
-
-        # First try to find products by their structure/classes
-        product_items = driver.find_elements(
-            By.CSS_SELECTOR, "li.product, div.product-item, div.product"
-        )
-
-        if product_items:
-            # Try DOM-based extraction first
-            for item in product_items:
-                try:
-                    # Try multiple ways to find name
-                    name = None
-                    name_selectors = ["h2", "h3", ".product-name", "a.product-link"]
-                    for name_sel in name_selectors:
-                        try:
-                            elem = item.find_element(By.CSS_SELECTOR, name_sel)
-                            name = elem.text.strip()
-                            if name and len(name) > 3:
-                                break
-                        except Exception:
-                            pass
-
-                    # Try multiple ways to find price
-                    price = None
-                    price_selectors = [
-                        "span.price",
-                        ".price",
-                        "span[data-price]",
-                        ".product-price",
-                    ]
-                    for price_sel in price_selectors:
-                        try:
-                            elems = item.find_elements(By.CSS_SELECTOR, price_sel)
-                            if elems:
-                                price = parse_price(elems[-1].text)
-                                if price:
-                                    break
-                        except Exception:
-                            pass
-
-                    if price and name and len(name) > 3 and 10000 <= price <= 10000000:
-                        products.append(
-                            {
-                                "site": "LuxuryX",
-                                "category": category,
-                                "product": name,
-                                "price_LKR": price,
-                                "is_own_shop": False,
-                            }
-                        )
-                except Exception:
-                    continue
-
-        # Fallback: Text-based parsing if DOM extraction failed
-        if len(products) == 0:
-            items = driver.find_elements(By.TAG_NAME, "li")
-
-            for li in items:
-                try:
-                    text = li.text.strip()
-
-                    if not text or "LKR" not in text:
-                        continue
-
-                    # Split by LKR
-                    if text.count("LKR") >= 1:
-                        parts = text.split("LKR")
-
-                        if len(parts) >= 2:
-                            name = parts[0].replace("*", "").strip()
-                            price_part = parts[1].strip()
-
-                            price = parse_price(price_part)
-
-                            if price and name and len(name) > 3:
-                                # Validation: 10,000 to 10,000,000 LKR range
-                                if 10000 <= price <= 10000000:
-                                    products.append(
-                                        {
-                                            "site": "LuxuryX",
-                                            "category": category,
-                                            "product": name,
-                                            "price_LKR": price,
-                                            "is_own_shop": False,
-                                        }
-                                    )
-
-                except Exception as e:
-                    continue
+        html = driver.page_source
+        archive_page(html, "LuxuryX", category, 1, url, "selenium")
+
+        # An unchanged grid reuses last run's products without reading the DOM
+        digest = grid_hash(html)
+        cached = cached_page("LuxuryX", category, 1, digest)
+        if cached:
+            products = cached["products"]
+            print(f"    Grid unchanged, reusing {len(products)} products of the last run")
+        else:
+            products = extract_luxuryx(driver, category)
 
     except Exception as e:
         print(f"  ✗ Error: {e}")
+        error = e
     finally:
-        if driver:
-            driver.quit()
+        if driver and owns_driver:
+            quit_driver(driver)
+
+    if sink:
+        if products:
+            sink.write_job("LuxuryX", category, 1, products, grid_hash=digest)
+        else:
+            sink.fail_job("LuxuryX", category, 1, error or "no products found")
+
+    return products
+
+
+def extract_luxuryx(driver, category):
+    """Products from the rendered page: product cards first, then any list item with a price"""
+    products = []
+
+    # First try to find products by their structure/classes
+    product_items = driver.find_elements(
+        By.CSS_SELECTOR, "li.product, div.product-item, div.product"
+    )
+
+    if product_items:
+        # Try DOM-based extraction first
+        for item in product_items:
+            try:
+                # Try multiple ways to find name
+                name = None
+                name_selectors = ["h2", "h3", ".product-name", "a.product-link"]
+                for name_sel in name_selectors:
+                    try:
+                        elem = item.find_element(By.CSS_SELECTOR, name_sel)
+                        name = elem.text.strip()
+                        if name and len(name) > 3:
+                            break
+                    except Exception:
+                        pass
+
+                # Try multiple ways to find price
+                price = None
+                price_selectors = [
+                    "span.price",
+                    ".price",
+                    "span[data-price]",
+                    ".product-price",
+                ]
+                for price_sel in price_selectors:
+                    try:
+                        elems = item.find_elements(By.CSS_SELECTOR, price_sel)
+                        if elems:
+                            price = parse_price(elems[-1].text)
+                            if price:
+                                break
+                    except Exception:
+                        pass
+
+                if price and name and len(name) > 3 and 10000 <= price <= 10000000:
+                    products.append(
+                        {
+                            "site": "LuxuryX",
+                            "category": category,
+                            "product": name,
+                            "price_LKR": price,
+                            "is_own_shop": False,
+                        }
+                    )
+            except Exception:
+                continue
+
+    # Fallback: Text-based parsing if DOM extraction failed
+    if len(products) == 0:
+        items = driver.find_elements(By.TAG_NAME, "li")
+
+        for li in items:
+            try:
+                text = li.text.strip()
+
+                if not text or "LKR" not in text:
+                    continue
+
+                # Split by LKR
+                if text.count("LKR") >= 1:
+                    parts = text.split("LKR")
+
+                    if len(parts) >= 2:
+                        name = parts[0].replace("*", "").strip()
+                        price_part = parts[1].strip()
+
+                        price = parse_price(price_part)
+
+                        if price and name and len(name) > 3:
+                            # Validation: 10,000 to 10,000,000 LKR range
+                            if 10000 <= price <= 10000000:
+                                products.append(
+                                    {
+                                        "site": "LuxuryX",
+                                        "category": category,
+                                        "product": name,
+                                        "price_LKR": price,
+                                        "is_own_shop": False,
+                                    }
+                                )
+
+            except Exception as e:
+                continue
 
     return products
@@ -2,121 +2,294 @@
 
 import sys
 import os
+import argparse
+import time
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from scraper.luxuryx_scraper import scrape_luxuryx
-from scraper.francium_scraper import scrape_francium
-from scraper.woocommerce_scraper import scrape_woocommerce_site
-from scraper.selenium_woocommerce_scraper import scrape_with_selenium
-from scraper.idealz_scraper import scrape_idealz, save_idealz_prices_to_config
-from config import SCRAPING_URLS
-import pandas as pd
+from scraper.engines import get_engine
+from scraper.engine_selector import EngineSelector
+from scraper.rate_limiter import get_rate_limiter
+from scraper.sink import ProductSink, latest_run_id
+from scraper.scheduler import Scheduler, Job, DeadlineExceeded
+from scraper.frequency import plan_frequency, carry_forward
+from scraper.aggregates import update_stats, STATS_FILE
+from scraper.history import append_history, HISTORY_DIR
+from scraper.analytics import update_analytics, ANALYTICS_DIR
+from scraper.alerts import dispatch_alerts
+from scraper.archive import get_archive
+from scraper.lookup import build_lookup_index, LOOKUP_INDEX
+from scraper.grid_cache import save_grid_hashes, GRID_HASH_FILE
+from config import SCRAPING_URLS, SITEMAP_URLS, DAEMON_SCHEDULE
 from datetime import datetime
 import json
+import pandas as pd
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape IdealZ and competitor prices")
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        metavar="RUN_ID",
+        help="Re-run only the failed or missing jobs of a previous run (default: latest run)",
+    )
+    parser.add_argument(
+        "--selenium-workers",
+        nargs="?",
+        const="auto",
+        metavar="N",
+        help="Run Selenium engines in N worker processes, one browser each "
+        "(default: sized from available cores and memory)",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        metavar="MINUTES",
+        help="Publish within this many minutes: the most valuable categories run "
+        "first and jobs that would not finish in time are skipped",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running and scrape on a schedule, reusing warm browsers and HTTP sessions",
+    )
+    parser.add_argument(
+        "--schedule",
+        default=DAEMON_SCHEDULE,
+        metavar="CRON",
+        help=f"Cron schedule of --daemon runs (default: '{DAEMON_SCHEDULE}')",
+    )
+    parser.add_argument(
+        "--all-categories",
+        action="store_true",
+        help="Scrape every category, even stable ones that are not due yet",
+    )
+    args = parser.parse_args(argv)
+    if args.daemon and args.resume:
+        parser.error("--resume can't be combined with --daemon")
+    return args
+
+
+# Engine of every competitor site (sites not listed here are WooCommerce)
+SITE_ENGINES = {"LuxuryX": "luxuryx", "Francium": "francium"}
+STATIC_ENGINES = ("woocommerce", "sitemap")  # Plain HTTP, never sent to the Selenium pool
+WOOCOMMERCE_SITES = [
+    "PresentSolution",
+    "DoctorMobile",
+    "GeniusMobile",
+    "LifeMobile",
+    "GQMobiles",
+    "XMobile",
+]
 
 
-def main():
+def competitor_jobs():
+    """
+    One scheduler job per competitor category in SCRAPING_URLS, plus an
+    "All Products" sitemap job per shop in SITEMAP_URLS
+    """
+    jobs = []
+    for site_name in list(SITE_ENGINES) + WOOCOMMERCE_SITES:
+        engine = SITE_ENGINES.get(site_name, "woocommerce")
+        for category, url in SCRAPING_URLS.items():
+            if site_name in category:
+                jobs.append(Job(category, site_name, engine, url))
+    for site_name, url in SITEMAP_URLS.items():
+        jobs.append(Job(f"{site_name} All Products", site_name, "sitemap", url))
+    return jobs
+
+
+def save_my_prices(idealz_products):
+    """Report the IdealZ result and save your prices for comparison"""
+    print(f"  ✓ Found {len(idealz_products)} products from your shop")
+
+    if idealz_products:
+        from scraper.idealz_scraper import save_idealz_prices_to_config
+
+        my_prices = save_idealz_prices_to_config(idealz_products)
+        os.makedirs("data", exist_ok=True)
+        with open("data/my_prices.json", "w") as f:
+            json.dump(my_prices, f, indent=2)
+        print("  ✓ Saved your prices to data/my_prices.json")
+
+
+def start_pool(workers):
+    """Selenium worker pool for --selenium-workers (N or "auto")"""
+    from scraper.selenium_pool import SeleniumPool
+
+    pool = SeleniumPool(None if workers == "auto" else int(workers))
+    print(f"Running Selenium engines in {pool.size} worker processes")
+    return pool
+
+
+def main(argv=None):
     """Main function to run all scrapers and combine results"""
-    all_products = []
+    args = parse_args(argv)
+
+    # Optional process pool: Selenium jobs run in worker processes while the
+    # static WooCommerce sites are scraped here. In daemon mode it is always
+    # used, and its browsers stay open between runs.
+    workers = args.selenium_workers or ("auto" if args.daemon else None)
+    pool = start_pool(workers) if workers else None
+    try:
+        if args.daemon:
+            from scraper.daemon import run_daemon
+
+            run_daemon(lambda: run_scrape(args, pool), args.schedule)
+        else:
+            run_scrape(args, pool)
+    finally:
+        if pool:
+            pool.shutdown()
+
+
+def run_scrape(args, pool=None):
+    """Scrape everything once and publish the snapshot; returns it"""
+    started = time.monotonic()  # The --deadline clock
+    run_id = None
+    if args.resume:
+        run_id = latest_run_id() if args.resume == "latest" else args.resume
+        if not run_id:
+            print("⚠ No previous run to resume, starting a new one")
+
+    # Engines stream products into the sink as they are extracted, and the
+    # sink checkpoints every (site, category, page) job in the run directory
+    output_file = "data/all_products.csv"
+    sink = ProductSink(output_file, run_id=run_id)
+
+    # Fetched pages are archived under the same run id (also in worker processes)
+    os.environ["SCRAPER_RUN_ID"] = sink.run_id
 
     print("=" * 60)
     print(f"Starting scraping at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    if run_id:
+        print(f"Resuming run {sink.run_id} ({len(sink.jobs)} jobs checkpointed)")
     print("=" * 60)
 
+    pool_jobs = []  # Collected below
+
     # STEP 1: Scrape your own shop first
     print("\n🏪 Scraping IdealZ (Your Shop)...")
-    try:
-        idealz_products = scrape_idealz()
-        all_products.extend(idealz_products)
-        print(f"  ✓ Found {len(idealz_products)} products from your shop")
-
-        # Save your prices for comparison
-        if idealz_products:
-            my_prices = save_idealz_prices_to_config(idealz_products)
-            os.makedirs("data", exist_ok=True)
-            with open("data/my_prices.json", "w") as f:
-                json.dump(my_prices, f, indent=2)
-            print("  ✓ Saved your prices to data/my_prices.json")
-    except Exception as e:
-        print(f"  ✗ Failed to scrape IdealZ: {e}")
-
-    # STEP 2: Scrape competitors
+    if pool:
+        idealz_job = pool.submit("idealz", sink)
+    else:
+        try:
+            save_my_prices(get_engine("idealz")(sink=sink))
+        except Exception as e:
+            print(f"  ✗ Failed to scrape IdealZ: {e}")
+
+    # STEP 2: Scrape competitors, the categories worth most to you first
     print("\n📱 Scraping Competitors...")
+    jobs, not_due = competitor_jobs(), []
+    if not args.all_categories:
+        jobs, not_due = plan_frequency(jobs)
+        if not_due:
+            print(f"Scraping {len(jobs)} of {len(jobs) + len(not_due)} categories, the others are not due:")
+            for job in not_due:
+                print(f"  {job.category} (every {job.interval:.0f}h)")
+
+    scheduler = Scheduler(
+        deadline=args.deadline * 60 if args.deadline else None, learn=not run_id, started=started
+    )
+    plan = scheduler.plan(jobs)
+    if args.deadline:
+        planned = sum(job.estimate for job in plan) / 60
+        left = (scheduler.deadline - time.monotonic()) / 60
+        print(f"Deadline in {left:.0f} minutes, about {planned:.0f} minutes of jobs planned")
 
-    # Scrape LuxuryX sites
-    luxuryx_urls = {k: v for k, v in SCRAPING_URLS.items() if "LuxuryX" in k}
-    for category, url in luxuryx_urls.items():
-        print(f"\nScraping {category}...")
+    # Static HTML first, Selenium only for sites whose HTML lacks the product grid
+    selector = EngineSelector(
+        selenium_engine=(
+            lambda url, category, site_name, sink=None: pool.run(
+                "selenium_woocommerce", sink, url=url, category=category, site_name=site_name
+            )
+        )
+        if pool
+        else None
+    )
+
+    for job in plan:
+        if pool and job.engine not in STATIC_ENGINES:
+            pool_jobs.append((job, pool.submit_call(
+                scheduler.run_timed, job, pool.run_timed, job.engine, sink, url=job.url, category=job.category
+            )))
+            continue
+        print(f"\nScraping {job.category}...")
         try:
-            products = scrape_luxuryx(url, category)
-            all_products.extend(products)
+            if job.engine == "woocommerce":
+                products = scheduler.run(job, selector.scrape, job.url, job.category, job.site, sink=sink)
+            elif job.engine == "sitemap":
+                products = scheduler.run(job, get_engine("sitemap"), job.url, job.category, job.site, sink=sink)
+            else:
+                products = scheduler.run(job, get_engine(job.engine), job.url, job.category, sink=sink)
             print(f"  ✓ Found {len(products)} products")
+        except DeadlineExceeded:
+            print(f"  ⏭ Skipped, usually takes {job.estimate:.0f}s")
         except Exception as e:
             print(f"  ✗ Error: {e}")
 
-    # Scrape Francium sites
-    francium_urls = {k: v for k, v in SCRAPING_URLS.items() if "Francium" in k}
-    for category, url in francium_urls.items():
-        print(f"\nScraping {category}...")
+    # Collect the jobs that ran in the Selenium worker pool
+    if pool:
+        print("\n🏪 IdealZ (Your Shop) [worker]...")
         try:
-            products = scrape_francium(url, category)
-            all_products.extend(products)
-            print(f"  ✓ Found {len(products)} products")
+            save_my_prices(idealz_job.result())
         except Exception as e:
-            print(f"  ✗ Error: {e}")
+            print(f"  ✗ Failed to scrape IdealZ: {e}")
 
-    # Scrape WooCommerce sites (all others use WooCommerce)
-    woocommerce_sites = [
-        "PresentSolution",
-        "DoctorMobile",
-        "GeniusMobile",
-        "LifeMobile",
-        "GQMobiles",
-        "XMobile",
-    ]
-
-    # Sites that need Selenium (JavaScript-heavy)
-    selenium_sites = ["DoctorMobile", "LifeMobile", "GQMobiles", "XMobile"]
-
-    for site_name in woocommerce_sites:
-        site_urls = {k: v for k, v in SCRAPING_URLS.items() if site_name in k}
-        for category, url in site_urls.items():
-            print(f"\nScraping {category}...")
+        for job, future in pool_jobs:
+            print(f"\n{job.category} [worker]...")
             try:
-                if site_name in selenium_sites:
-                    # Use Selenium for JavaScript-heavy sites
-                    print(f"  (using Selenium for {site_name})")
-                    products = scrape_with_selenium(url, category, site_name)
-                else:
-                    # Use requests for standard WooCommerce sites
-                    products = scrape_woocommerce_site(url, category, site_name)
-
-                all_products.extend(products)
-                print(f"  ✓ Found {len(products)} products")
+                print(f"  ✓ Found {len(future.result())} products")
+            except DeadlineExceeded:
+                print(f"  ⏭ Skipped, usually takes {job.estimate:.0f}s")
             except Exception as e:
                 print(f"  ✗ Error: {e}")
 
-    # Save to CSV
-    if all_products:
-        df = pd.DataFrame(all_products)
-        df["scraped_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    scheduler.save()
+    if scheduler.skipped:
+        print(f"\n⏭ Skipped {len(scheduler.skipped)} categories to meet the deadline: "
+              + ", ".join(job.category for job in scheduler.skipped))
 
-        # Create data directory if it doesn't exist
-        os.makedirs("data", exist_ok=True)
+    # Keep the previous snapshot to find the prices that changed in this run
+    previous = pd.read_csv(output_file) if os.path.exists(output_file) else pd.DataFrame()
 
-        output_file = "data/all_products.csv"
-        df.to_csv(output_file, index=False)
+    # Publish the staged products as the new snapshot (atomic rename); the
+    # categories not scraped this run keep their rows from the last snapshot
+    carried = carry_forward(previous, [job.category for job in not_due + scheduler.skipped])
+    df = sink.finalize(carried=carried)
+    # Next run reuses these pages' products when their grid is unchanged
+    recorded = save_grid_hashes(sink)
 
+    if not df.empty:
         # Separate your shop's data from competitors
         your_products = df[df.get("is_own_shop", False) == True]
         competitor_products = df[df.get("is_own_shop", False) == False]
 
         print("\n" + "=" * 60)
-        print(f"✓ Successfully scraped {len(all_products)} products")
+        print(f"✓ Successfully scraped {len(df)} products")
         print(f"  - Your shop: {len(your_products)} products")
         print(f"  - Competitors: {len(competitor_products)} products")
+        if sink.duplicates:
+            print(f"  - Merged {sink.duplicates} listings found under several categories")
+        if sink.carried:
+            print(f"  - Carried forward {len(sink.carried)} products of categories not scraped this run")
         print(f"✓ Saved to '{output_file}'")
+
+        # Pre-aggregated statistics read by the dashboard
+        update_stats(df)
+        print(f"✓ Updated category statistics in '{STATS_FILE}'")
+        print(f"✓ Added {append_history(df)} observations to '{HISTORY_DIR}'")
+        print(f"✓ Updated the price index for {update_analytics()} days in '{ANALYTICS_DIR}'")
+        build_lookup_index(df)
+        print(f"✓ Built the CLI lookup index '{LOOKUP_INDEX}'")
+        print(f"✓ Recorded the product grids of {recorded} pages in '{GRID_HASH_FILE}'")
+
+        try:
+            dispatch_alerts(previous, df)
+        except Exception as e:
+            print(f"⚠ Could not send price alerts: {e}")
         print("=" * 60)
 
         # Show summary by site
@@ -127,6 +300,30 @@ def main():
     else:
         print("\n⚠ No products scraped!")
 
+    archive = get_archive()
+    if archive:
+        if not df.empty:
+            # Lets re-extraction replace exactly this snapshot's history rows
+            archive.mark_published(df["scraped_at"].iloc[0])
+        runs, blobs = archive.prune()
+        print(f"\n🗄 Archived {len(archive.entries(sink.run_id))} pages of this run in '{archive.root}'"
+              + (f" (pruned {runs} old runs, {blobs} pages)" if runs or blobs else ""))
+
+    failed = sink.failed_jobs()
+    if failed:
+        print(f"\n⚠ {len(failed)} jobs failed - retry them with:")
+        print(f"  python scraper/main_scraper.py --resume {sink.run_id}")
+
+    # Show how long each job was held back by the per-domain rate limits
+    job_waits = get_rate_limiter().job_waits
+    if job_waits:
+        print("\nRate limiter waits:")
+        for job, waited in sorted(job_waits.items(), key=lambda item: -item[1]):
+            print(f"  {job}: {waited:.1f}s")
+        job_waits.clear()  # The daemon's next run reports its own waits
+
+    return df
+
 
 if __name__ == "__main__":
     main()
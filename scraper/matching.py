@@ -0,0 +1,166 @@
+# scraper/matching.py - Match the same model across shops by model number and storage
+
+import re
+
+def extract_model_number(product_name):
+    """Extract model number with variant (e.g., '17 pro max', '15', '16 plus')"""
+    product_lower = product_name.lower()
+    
+    # iPhone patterns
+    iphone_pattern = r'iphone\s+(\d+(?:\s*(?:pro\s*max|pro|plus|mini|e))?)'
+    match = re.search(iphone_pattern, product_lower)
+    if match:
+        model = match.group(1).strip()
+        # Normalize spacing
+        model = re.sub(r'\s+', ' ', model)
+        return model
+    
+    # iPad patterns
+    if 'ipad' in product_lower:
+        ipad_pattern = r'ipad\s+(\w+(?:\s+\w+)*)'
+        match = re.search(ipad_pattern, product_lower)
+        if match:
+            return match.group(1).strip()
+    
+    # MacBook patterns
+    if 'macbook' in product_lower:
+        mac_pattern = r'macbook\s+(\w+(?:\s+\w+)*)'
+        match = re.search(mac_pattern, product_lower)
+        if match:
+            return match.group(1).strip()
+    
+    # AirPods patterns
+    if 'airpod' in product_lower:
+        airpod_pattern = r'airpods?\s+(\w+(?:\s+\w+)*)'
+        match = re.search(airpod_pattern, product_lower)
+        if match:
+            return match.group(1).strip()
+    
+    # Watch patterns
+    if 'watch' in product_lower:
+        watch_pattern = r'watch\s+(\w+(?:\s+\w+)*)'
+        match = re.search(watch_pattern, product_lower)
+        if match:
+            return match.group(1).strip()
+    
+    return None
+
+def extract_storage(product_name):
+    """Extract storage capacity (e.g., '128GB', '256GB', '1TB')"""
+    # Look for storage patterns
+    storage_pattern = r'(\d+\s*(?:GB|TB))'
+    match = re.search(storage_pattern, product_name, re.IGNORECASE)
+    
+    if match:
+        storage = match.group(1).upper().replace(' ', '')
+        return storage
+    
+    return None
+
+def normalize_storage(storage):
+    """Normalize storage format (e.g., '1TB' -> '1024GB' for comparison)"""
+    if not storage:
+        return None
+    
+    storage_upper = storage.upper()
+    
+    if 'TB' in storage_upper:
+        # Convert TB to GB
+        tb_value = int(re.findall(r'\d+', storage_upper)[0])
+        return f"{tb_value * 1024}GB"
+    
+    return storage_upper
+
+def models_match(model1, model2):
+    """Check if two model numbers match exactly"""
+    if not model1 or not model2:
+        return False
+    
+    # Normalize
+    m1 = model1.lower().strip()
+    m2 = model2.lower().strip()
+    
+    # Remove extra spaces
+    m1 = re.sub(r'\s+', ' ', m1)
+    m2 = re.sub(r'\s+', ' ', m2)
+    
+    # Exact match
+    if m1 == m2:
+        return True
+    
+    # Remove all spaces for comparison
+    m1_nospace = m1.replace(' ', '')
+    m2_nospace = m2.replace(' ', '')
+    
+    return m1_nospace == m2_nospace
+
+def model_key(model):
+    """Model number in the form models_match compares (lowercase, no spaces)"""
+    return re.sub(r'\s+', '', model.lower()) if model else None
+
+def storages_compatible(storage1, storage2, exact=False):
+    """
+    Storage only rules out a match when both products state one.
+    With `exact`, a product without storage only matches another without.
+    """
+    if not storage1 or not storage2:
+        return not exact or (not storage1 and not storage2)
+    return normalize_storage(storage1) == normalize_storage(storage2)
+
+def build_model_index(products):
+    """
+    Index products by model key so matches are found with one lookup
+    instead of comparing against every product.
+    """
+    index = {}
+    for product in products:
+        key = model_key(extract_model_number(product['product']))
+        if key:
+            index.setdefault(key, []).append(product)
+    return index
+
+def find_matches(product, index, exact_storage=False):
+    """Products in the index with the same model and compatible storage"""
+    key = model_key(extract_model_number(product['product']))
+    storage = extract_storage(product['product'])
+    return [
+        other for other in index.get(key, [])
+        if storages_compatible(storage, extract_storage(other['product']), exact_storage)
+    ]
+
+def competitor_index(df):
+    """Model index of the competitor rows of a snapshot that have a price"""
+    competitors = df[(df['price_LKR'] > 0) & (df['is_own_shop'] == False)]
+    return build_model_index(competitors[['site', 'product', 'price_LKR']].to_dict('records'))
+
+def compare_product(product, index):
+    """Exact competitor matches of one product of your shop, or None without a model number"""
+    model = extract_model_number(product['product'])
+    if not model:
+        return None
+    matches = find_matches(product, index, exact_storage=True)
+    return {
+        'site': product['site'],
+        'product': product['product'],
+        'price_LKR': product['price_LKR'],
+        'model': model,
+        'storage': extract_storage(product['product']),
+        'matches': sorted(matches, key=lambda m: m['price_LKR']),
+    }
+
+def compare_products(df):
+    """
+    Exact competitor matches (same model and storage) of every product of
+    your shop, cheapest first:
+        {product name: {'site', 'product', 'price_LKR', 'model', 'storage', 'matches'}}
+    Computed once per snapshot and shared by the dashboard and the API.
+    """
+    own = df[(df['price_LKR'] > 0) & (df['is_own_shop'] == True)]
+    index = competitor_index(df)
+
+    comparisons = {}
+    for product in own[['site', 'product', 'price_LKR']].to_dict('records'):
+        comparison = compare_product(product, index)
+        if comparison:
+            comparisons[product['product']] = comparison
+    return comparisons
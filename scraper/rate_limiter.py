@@ -0,0 +1,110 @@
+# scraper/rate_limiter.py - Per-domain token-bucket rate limiting shared by all engines
+
+import threading
+import time
+from urllib.parse import urlparse
+from config import RATE_LIMITS
+
+# Slow down this much when a site answers 429/403, recover gradually on success
+BACKOFF_FACTOR = 0.5
+RECOVERY_FACTOR = 1.1
+MIN_RATE = 0.05  # Never slower than one request every 20 seconds
+
+
+def domain_of(url):
+    """Domain used as the rate limiting key (www. prefix ignored)"""
+    netloc = urlparse(url).netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations so callers sleep outside the lock"""
+
+    def __init__(self, rate, burst):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take one token, returning how long the caller must wait for it"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def slow_down(self):
+        with self.lock:
+            self.rate = max(MIN_RATE, self.rate * BACKOFF_FACTOR)
+            # Drop any saved-up burst so the next request really waits
+            self.tokens = min(self.tokens, 0)
+
+    def recover(self):
+        with self.lock:
+            self.rate = min(self.base_rate, self.rate * RECOVERY_FACTOR)
+
+
+class RateLimiter:
+    """
+    Central politeness budget: one token bucket per domain.
+    Rates (requests/second) and burst sizes come from RATE_LIMITS in config.py.
+    """
+
+    def __init__(self, limits=None):
+        self.limits = limits if limits is not None else RATE_LIMITS
+        self.buckets = {}
+        self.job_waits = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        domain = domain_of(url)
+        with self.lock:
+            if domain not in self.buckets:
+                limit = self.limits.get(domain, self.limits["default"])
+                self.buckets[domain] = TokenBucket(limit["rate"], limit["burst"])
+            return self.buckets[domain]
+
+    def acquire(self, url, job=None):
+        """Block until a request to url's domain is allowed, returning the seconds waited"""
+        wait = self.bucket(url).reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+        with self.lock:
+            key = job or domain_of(url)
+            self.job_waits[key] = self.job_waits.get(key, 0.0) + wait
+
+        return wait
+
+    def report(self, url, status_code):
+        """Adapt the domain's rate to the response status"""
+        if status_code in (403, 429):
+            self.bucket(url).slow_down()
+            print(f"    ⚠ {domain_of(url)} answered {status_code}, slowing down")
+        elif 200 <= status_code < 300:
+            self.bucket(url).recover()
+
+    def current_rate(self, url):
+        return self.bucket(url).rate
+
+    def waited(self, job):
+        """Total seconds a job has spent waiting for the rate limiter"""
+        with self.lock:
+            return self.job_waits.get(job, 0.0)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Process-wide rate limiter shared by every engine"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
@@ -0,0 +1,249 @@
+# scraper/reextract.py - Rebuild snapshots and history from archived pages with the current parsers
+
+import sys
+import os
+import argparse
+import contextlib
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from bs4 import BeautifulSoup
+from scraper.archive import PageArchive
+from scraper.dedup import dedupe_products, name_hash
+from scraper.history import HISTORY_DIR, read_history, replace_history
+from scraper.aggregates import update_stats, KEY_COLUMNS
+from scraper.analytics import update_analytics, ANALYTICS_DIR
+from scraper.sink import write_csv_atomic
+from config import ARCHIVE_DIR
+
+OUTPUT_DIR = "data/reextracted"
+
+# Sites whose engines read the live browser DOM (extract_luxuryx,
+# extract_francium) and have no parser for archived HTML: their pages are
+# not re-extracted and the rows their runs recorded are kept as they are
+DOM_ONLY_SITES = {"LuxuryX", "Francium"}
+
+
+def extract_page(entry, content):
+    """Products of one archived page, using the engine's current parser"""
+    # Imported here so every worker process picks up the code as it is now
+    from scraper.woocommerce_scraper import extract_products
+    from scraper.idealz_payload import records_from_text
+    from scraper.idealz_scraper import parse_idealz_text
+
+    if entry["engine"] == "payload":
+        return records_from_text(content)
+    if entry["engine"] == "rendered-text":
+        return parse_idealz_text(content)
+
+    soup = BeautifulSoup(content, "html.parser")
+    products, _, _ = extract_products(soup, entry["category"], entry["site"])
+    return products
+
+
+def extract_job(args):
+    """
+    Worker: re-extract one (run, site, category, page) job.
+    A page fetched by several engines (static, then Selenium after an
+    escalation) keeps the engine that yields the most products, as the
+    engine selector did. IdealZ data assets are combined into one list.
+    """
+    root, entries = args
+    from scraper.idealz_payload import to_products, dedupe_records
+    from scraper.idealz_scraper import categorize_product
+
+    archive = PageArchive(root)
+
+    by_engine = {}
+    with contextlib.redirect_stdout(io.StringIO()):  # Parsers log per page
+        for entry in entries:
+            try:
+                extracted = extract_page(entry, archive.load(entry["blob"]))
+            except Exception:
+                continue
+            by_engine.setdefault(entry["engine"], []).extend(extracted)
+
+    if "payload" in by_engine:
+        by_engine["payload"] = to_products(dedupe_records(by_engine["payload"]), categorize_product)
+
+    return max(by_engine.values(), key=len, default=[])
+
+
+def archived_jobs(archive, run_id):
+    """The run's re-extractable manifest entries grouped into (site, category, page) jobs"""
+    jobs = {}
+    for entry in archive.entries(run_id):
+        if entry["site"] in DOM_ONLY_SITES:
+            continue
+        jobs.setdefault((entry["site"], entry["category"], entry["page"]), []).append(entry)
+    return list(jobs.values())
+
+
+def compare(old, new):
+    """Added, removed and repriced products between two versions of a snapshot"""
+    def keyed(df):
+        if df.empty:
+            return {}
+        keys = df["site"] + "|" + df["product"].map(name_hash)
+        return dict(zip(keys, pd.to_numeric(df["price_LKR"], errors="coerce")))
+
+    old_prices, new_prices = keyed(old), keyed(new)
+    return {
+        "before": len(old_prices),
+        "after": len(new_prices),
+        "added": len(new_prices.keys() - old_prices.keys()),
+        "removed": len(old_prices.keys() - new_prices.keys()),
+        "repriced": sum(
+            1 for key in new_prices.keys() & old_prices.keys() if new_prices[key] != old_prices[key]
+        ),
+    }
+
+
+def reextract(archive, run_ids, workers=None, history_dir=HISTORY_DIR):
+    """
+    Re-extract the given runs across a process pool.
+    Returns {run_id: (snapshot DataFrame, change report)}; runs that never
+    published a snapshot are skipped. Recorded rows of (site, category)
+    pairs the run has no re-extractable page for - DOM_ONLY_SITES, and
+    jobs whose pages are never archived such as sitemap discovery - are
+    taken from the recorded history unchanged.
+    """
+    runs = {run_id: archive.published_at(run_id) for run_id in run_ids}
+    runs = {run_id: scraped_at for run_id, scraped_at in runs.items() if scraped_at}
+
+    work = [(run_id, jobs) for run_id in runs for jobs in archived_jobs(archive, run_id)]
+    results = {run_id: [] for run_id in runs}
+    covered = {run_id: set() for run_id in runs}
+    for run_id, jobs in work:
+        covered[run_id].add((jobs[0]["site"], jobs[0]["category"]))
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        extracted = pool.map(
+            extract_job, [(archive.root, jobs) for _, jobs in work], chunksize=16
+        )
+        for (run_id, _), products in zip(work, extracted):
+            results[run_id].extend(products)
+
+    # What the live runs recorded, read once for the whole period
+    stamps = [pd.Timestamp(scraped_at) for scraped_at in runs.values()]
+    recorded = read_history(min(stamps).date(), max(stamps).date(), history_dir) if stamps else None
+    recorded_by_stamp = dict(list(recorded.groupby("scraped_at"))) if stamps else {}
+
+    rebuilt = {}
+    for run_id, scraped_at in runs.items():
+        before = recorded_by_stamp.get(pd.Timestamp(scraped_at), pd.DataFrame())
+        if not before.empty:
+            uncovered = [key not in covered[run_id] for key in zip(before["site"], before["category"])]
+            kept = before[uncovered].drop(columns=["scraped_at"])
+        else:
+            kept = before
+        kept = [{key: value for key, value in row.items() if not pd.isna(value)} for row in kept.to_dict("records")]
+
+        df = pd.DataFrame(dedupe_products(results[run_id] + kept))
+        if not df.empty:
+            df["scraped_at"] = scraped_at
+        rebuilt[run_id] = (df, compare(before, df))
+
+    return rebuilt
+
+
+def with_carried_rows(rebuilt, current):
+    """
+    The rebuilt live snapshot plus the current snapshot's rows carried
+    forward from earlier runs (they were never archived with this run),
+    unless the listing was rebuilt.
+    """
+    if current.empty or "carried_from" not in current.columns:
+        return rebuilt
+    carried = current[current["carried_from"].notna()]
+    fresh = set(zip(rebuilt["site"], rebuilt["product"].map(name_hash)))
+    carried = carried[[key not in fresh for key in zip(carried["site"], carried["product"].map(name_hash))]]
+    return pd.concat([rebuilt, carried.assign(scraped_at=rebuilt["scraped_at"].iloc[0])], ignore_index=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Re-run extraction over archived pages without scraping again"
+    )
+    parser.add_argument("runs", nargs="*", metavar="RUN_ID", help="Runs to rebuild (default: all archived runs)")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU core)")
+    parser.add_argument(
+        "--apply",
+        action="store_true",
+        help="Replace the history partitions (and the current snapshot, if rebuilt) "
+        f"instead of writing the results to {OUTPUT_DIR}/",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    archive = PageArchive(args.archive_dir)
+    run_ids = args.runs or archive.runs()
+
+    print("=" * 60)
+    print(f"Re-extracting {len(run_ids)} archived runs from '{args.archive_dir}'")
+    print("=" * 60)
+
+    started = time.monotonic()
+    rebuilt = reextract(archive, run_ids, args.workers)
+    skipped = len(run_ids) - len(rebuilt)
+
+    print(f"\n{'Run':<18}{'Before':>8}{'After':>8}{'Added':>8}{'Removed':>9}{'Repriced':>10}")
+    for run_id, (_, report) in sorted(rebuilt.items()):
+        print(
+            f"{run_id:<18}{report['before']:>8}{report['after']:>8}{report['added']:>8}"
+            f"{report['removed']:>9}{report['repriced']:>10}"
+        )
+    totals = {k: sum(report[k] for _, report in rebuilt.values()) for k in ("before", "after", "added", "removed", "repriced")}
+    print(
+        f"{'Total':<18}{totals['before']:>8}{totals['after']:>8}{totals['added']:>8}"
+        f"{totals['removed']:>9}{totals['repriced']:>10}"
+    )
+    if skipped:
+        print(f"\n⚠ Skipped {skipped} runs that never published a snapshot")
+
+    snapshots = [df for df, _ in rebuilt.values() if not df.empty]
+    if not snapshots:
+        print("\n⚠ Nothing extracted")
+        return
+
+    history = pd.concat(snapshots, ignore_index=True)
+    latest = max(snapshots, key=lambda df: df["scraped_at"].iloc[0])
+
+    live_file = "data/all_products.csv"
+    current = pd.read_csv(live_file) if os.path.exists(live_file) else pd.DataFrame()
+    is_live = not current.empty and current["scraped_at"].iloc[0] == latest["scraped_at"].iloc[0]
+    if is_live:
+        rebuilt_latest = latest
+        latest = with_carried_rows(latest, current)
+        snapshots = [latest if df is rebuilt_latest else df for df in snapshots]
+
+    if args.apply:
+        # Only overwrite the live snapshot if it is the one that was rebuilt
+        history_dir, snapshot_file = HISTORY_DIR, live_file if is_live else None
+    else:
+        history_dir = os.path.join(OUTPUT_DIR, "history")
+        snapshot_file = os.path.join(OUTPUT_DIR, "all_products.csv")
+
+    written = replace_history(history, history_dir)  # Carried rows were recorded when they were seen
+    print(f"\n✓ Rebuilt {written} observations in '{history_dir}'")
+    if args.apply:
+        for df in sorted(snapshots, key=lambda df: df["scraped_at"].iloc[0]):
+            update_stats(df, by=KEY_COLUMNS)
+        print("✓ Rebuilt category statistics")
+        first_day = pd.Timestamp(min(df["scraped_at"].iloc[0] for df in snapshots))
+        print(f"✓ Recomputed the price index for {update_analytics(since=first_day)} days in '{ANALYTICS_DIR}'")
+    if snapshot_file:
+        write_csv_atomic(latest, snapshot_file)
+        print(f"✓ Rebuilt snapshot '{snapshot_file}'")
+    print(f"✓ Done in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
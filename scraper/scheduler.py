@@ -0,0 +1,202 @@
+# scraper/scheduler.py - Order scraping jobs by expected value and keep the run inside a deadline
+
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+import pandas as pd
+from scraper.dedup import CATEGORY_SEPARATOR
+from scraper.history import HISTORY_DIR, read_history
+from scraper.matching import extract_model_number, model_key
+from config import CHANGE_RATE_DAYS, CHANGE_RATE_PRIOR, DEADLINE_RESERVE_SECONDS, DEFAULT_JOB_SECONDS
+
+JOB_STATS_FILE = "data/job_stats.json"
+DURATION_SMOOTHING = 0.3  # Weight of the latest run in the duration average
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of starting a job that would not finish before the deadline"""
+
+
+class Job:
+    """One category to scrape; value and estimate are filled in by Scheduler.plan()"""
+
+    def __init__(self, category, site, engine, url):
+        self.category = category
+        self.site = site
+        self.engine = engine
+        self.url = url
+        self.value = 0.0
+        self.estimate = DEFAULT_JOB_SECONDS
+
+    def __repr__(self):
+        return f"Job({self.category!r}, value={self.value:.2f}, estimate={self.estimate:.0f}s)"
+
+
+def load_job_stats(path=JOB_STATS_FILE):
+    """Smoothed duration of every category: {category: {"seconds", "runs"}}"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_job_stats(stats, path=JOB_STATS_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(stats, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def memberships(df):
+    """One row per (product, category) - merged listings count for every category"""
+    if "categories" in df.columns:
+        df = df.assign(category=df["categories"].fillna(df["category"]).str.split(CATEGORY_SEPARATOR))
+        return df.explode("category")
+    return df
+
+
+def change_rates(history):
+    """Share of observations per category whose price differed from the product's previous one"""
+    if history.empty:
+        return {}
+    history = history.sort_values("scraped_at", ignore_index=True)
+    previous = history.groupby(["site", "product"])["price_LKR"].shift()
+    observed = memberships(history.assign(changed=history["price_LKR"] != previous)[previous.notna()])
+    if observed.empty:
+        return {}
+    return observed.groupby("category")["changed"].mean().to_dict()
+
+
+def catalogue_overlap(snapshot):
+    """Competitor products per category whose model your shop also sells"""
+    if snapshot.empty:
+        return {}
+    own = snapshot["is_own_shop"].fillna(False).astype(bool)
+    own_models = {model_key(extract_model_number(name)) for name in snapshot.loc[own, "product"]}
+    own_models.discard(None)
+
+    competitors = memberships(snapshot[~own])
+    matched = competitors["product"].map(lambda name: model_key(extract_model_number(name)) in own_models)
+    return matched.groupby(competitors["category"]).sum().astype(int).to_dict()
+
+
+class Scheduler:
+    """
+    Decides which categories to scrape first and which to drop when time is short.
+
+    A job's value is the number of price changes it is expected to reveal
+    on products your shop also sells: the competitor products matching
+    your models, times the category's recent price-change rate (plus a
+    small prior so quiet categories still rank). Jobs run most valuable
+    first, and with a deadline a job is only started if its usual duration
+    (learned from earlier runs) still fits - a slow job near the end is
+    skipped while shorter ones behind it may still run.
+    """
+
+    def __init__(
+        self,
+        deadline=None,
+        stats_path=JOB_STATS_FILE,
+        snapshot_path="data/all_products.csv",
+        history_dir=HISTORY_DIR,
+        learn=True,
+        started=None,
+    ):
+        # The deadline counts from `started` (time.monotonic() of the run's
+        # start), so work done before planning - your own shop - uses it up too
+        self.deadline = (started or time.monotonic()) + deadline if deadline else None
+        self.stats_path = stats_path
+        self.snapshot_path = snapshot_path
+        self.history_dir = history_dir
+        self.stats = load_job_stats(stats_path)
+        # Resumed runs skip finished pages, so their durations would mislead
+        self.learn = learn
+        self.lock = threading.Lock()
+        self.skipped = []
+
+    def remaining(self):
+        """Seconds left before results must be published (None = no deadline)"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic() - DEADLINE_RESERVE_SECONDS
+
+    def estimate(self, category):
+        return self.stats.get(category, {}).get("seconds", DEFAULT_JOB_SECONDS)
+
+    def values(self, categories):
+        """Expected value of scraping each category this run"""
+        try:
+            snapshot = pd.read_csv(self.snapshot_path)
+        except Exception:
+            snapshot = pd.DataFrame()
+        end = date.today()
+        history = read_history(end - timedelta(days=CHANGE_RATE_DAYS), end, self.history_dir)
+
+        rates = change_rates(history)
+        overlap = catalogue_overlap(snapshot)
+        values = {
+            category: (overlap[category] + 1) * (rates.get(category, 0.0) + CHANGE_RATE_PRIOR)
+            for category in categories
+            if category in overlap
+        }
+        # Categories not seen before rank like a typical one
+        typical = float(pd.Series(list(values.values())).median()) if values else 1.0
+        return {category: values.get(category, typical) for category in categories}
+
+    def plan(self, jobs):
+        """The jobs in the order they should run"""
+        values = self.values([job.category for job in jobs])
+        for job in jobs:
+            job.value = values[job.category]
+            job.estimate = self.estimate(job.category)
+
+        return sorted(jobs, key=lambda job: -job.value)
+
+    def fits(self, job):
+        remaining = self.remaining()
+        return remaining is None or job.estimate <= remaining
+
+    def start(self, job):
+        if not self.fits(job):
+            with self.lock:
+                self.skipped.append(job)
+            raise DeadlineExceeded(job.category)
+
+    def run(self, job, function, *args, **kwargs):
+        """Run a job if it fits before the deadline, and learn how long it took (thread-safe)"""
+        self.start(job)
+        started = time.monotonic()
+        result = function(*args, **kwargs)
+        if self.learn:
+            self.record(job.category, time.monotonic() - started)
+        return result
+
+    def run_timed(self, job, function, *args, **kwargs):
+        """
+        Like run(), for a function that returns (result, seconds) itself,
+        e.g. SeleniumPool.run_timed: waiting for a worker isn't job time
+        """
+        self.start(job)
+        result, seconds = function(*args, **kwargs)
+        if self.learn:
+            self.record(job.category, seconds)
+        return result
+
+    def record(self, category, seconds):
+        with self.lock:
+            entry = self.stats.setdefault(category, {"seconds": seconds, "runs": 0})
+            entry["seconds"] = round(
+                (1 - DURATION_SMOOTHING) * entry["seconds"] + DURATION_SMOOTHING * seconds
+                if entry["runs"]
+                else seconds,
+                1,
+            )
+            entry["runs"] += 1
+
+    def save(self):
+        with self.lock:
+            save_job_stats(self.stats, self.stats_path)
@@ -0,0 +1,276 @@
+# scraper/selenium_pool.py - Run Selenium engines in worker processes that each own one browser
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlparse
+from scraper.browser import create_driver, quit_driver, available_memory_mb, process_tree_rss_mb
+from scraper.sink import BufferedSink, CheckpointSnapshot
+from scraper.engines import get_engine
+from config import SELENIUM_WORKER_MEMORY_MB, SELENIUM_WORKER_RSS_LIMIT_MB
+
+MAX_RESTARTS = 2  # Times a job is retried after its worker process died
+RSS_CHECK_SECONDS = 5  # How often a running job's memory is checked
+
+
+def default_pool_size():
+    """One browser per core, as long as each gets SELENIUM_WORKER_MEMORY_MB"""
+    by_memory = available_memory_mb() // SELENIUM_WORKER_MEMORY_MB
+    return max(1, min(os.cpu_count() or 1, by_memory))
+
+
+# --- Worker process side -------------------------------------------------
+
+_driver = None
+
+
+def _worker_driver():
+    """The worker's browser, started on first use and after recycling"""
+    global _driver
+    if _driver is None:
+        # One shared profile for the pool; each worker locks its own slot of it
+        _driver = create_driver(profile="selenium-pool")
+    return _driver
+
+
+class LazyDriver:
+    """
+    Stands in for the worker's browser and starts it on first use, so a
+    job that never touches it (IdealZ read from its data assets) doesn't
+    launch Chrome.
+    """
+
+    def __getattr__(self, name):
+        return getattr(_worker_driver(), name)
+
+
+def _recycle_driver():
+    global _driver
+    if _driver is not None:
+        try:
+            quit_driver(_driver)
+        except Exception:
+            pass
+        _driver = None
+
+
+def _exit_worker():
+    os._exit(1)
+
+
+def _watch_memory(done):
+    """
+    Checks the worker's process tree while a job runs. Past the ceiling
+    the browser is stopped and the worker exits; the parent sees a
+    BrokenProcessPool and retries the job in a fresh worker.
+    """
+    while not done.wait(RSS_CHECK_SECONDS):
+        rss = process_tree_rss_mb()
+        if rss > SELENIUM_WORKER_RSS_LIMIT_MB:
+            print(f"    Worker {os.getpid()} at {rss} MB during a job, restarting the worker")
+            _recycle_driver()
+            _exit_worker()
+            return
+
+
+def _run_job(engine, kwargs, buffer, run_id=None):
+    """
+    Run one engine call with the worker's browser (if it needs one);
+    returns (products, buffered writes, seconds the engine ran)
+    """
+    # Workers outlive a run in daemon mode, so archive under the parent's current run
+    if run_id:
+        os.environ["SCRAPER_RUN_ID"] = run_id
+    started = time.monotonic()
+    done = threading.Event()
+    threading.Thread(target=_watch_memory, args=(done,), daemon=True).start()
+    try:
+        products = get_engine(engine)(**kwargs, sink=buffer, driver=LazyDriver())
+    except Exception:
+        # The browser may be in a bad state - start a fresh one next time
+        _recycle_driver()
+        raise
+    finally:
+        done.set()
+    seconds = time.monotonic() - started
+
+    # Drop network log entries nobody will read so they don't pile up
+    if _driver is not None:
+        try:
+            _driver.get_log("performance")
+        except Exception:
+            _recycle_driver()
+
+    # Long-lived Chrome instances grow; restart the browser past the ceiling
+    # between jobs (the watchdog only catches a job that runs away)
+    rss = process_tree_rss_mb()
+    if rss > SELENIUM_WORKER_RSS_LIMIT_MB:
+        print(f"    Worker {os.getpid()} at {rss} MB, restarting its browser")
+        _recycle_driver()
+
+    return products, buffer.calls, seconds
+
+
+def _shutdown_worker():
+    _recycle_driver()
+
+
+def _init_worker():
+    import atexit
+    atexit.register(_shutdown_worker)
+
+
+# --- Parent process side -------------------------------------------------
+
+
+class SeleniumPool:
+    """
+    Process pool for the Selenium engines.
+
+    Each worker process owns one Chrome instance that is reused across jobs
+    and restarted when the worker's process tree passes
+    SELENIUM_WORKER_RSS_LIMIT_MB (the whole worker is, if that happens
+    mid-job). Jobs for the same domain run one at a time so the per-domain
+    rate limit still holds across processes: queued jobs are only handed
+    to a dispatcher thread once their domain is free, so jobs of a busy
+    domain never hold threads other domains could use. A worker that
+    crashes takes the pool down with it; the pool is rebuilt and the
+    affected jobs are retried transparently.
+    """
+
+    def __init__(self, size=None):
+        self.size = size or default_pool_size()
+        self.executor = None
+        self.lock = threading.Lock()
+        self.domain_locks = {}
+        self.dispatcher = ThreadPoolExecutor(max_workers=self.size)
+        self.pending = deque()  # (domain, future, function, args, kwargs) waiting for their domain
+        self.busy = set()  # Domains with a dispatched job
+        self.queued = set()  # Futures of submitted calls that haven't finished
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def _executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            return self.executor
+
+    def _restart(self, broken):
+        with self.lock:
+            if self.executor is broken:
+                print("    ⚠ Selenium worker crashed, restarting the pool")
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+
+    def _domain_lock(self, url):
+        domain = urlparse(url).netloc
+        with self.lock:
+            return self.domain_locks.setdefault(domain, threading.Lock())
+
+    def _dispatch(self):
+        """Hand every queued call whose domain is free to a dispatcher thread, in order"""
+        ready = []
+        with self.lock:
+            for item in list(self.pending):
+                domain = item[0]
+                if domain is None or domain not in self.busy:
+                    self.pending.remove(item)
+                    if domain is not None:
+                        self.busy.add(domain)
+                    ready.append(item)
+        for item in ready:
+            self.dispatcher.submit(self._run_queued, *item)
+
+    def _run_queued(self, domain, future, function, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            result, error = None, None
+        else:
+            try:
+                result, error = function(*args, **kwargs), None
+            except BaseException as e:
+                result, error = None, e
+        with self.lock:
+            self.busy.discard(domain)
+        # Start the next job of the domain before this future completes,
+        # so shutdown() never sees an empty queue with work still to hand out
+        self._dispatch()
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _forget(self, future):
+        with self.lock:
+            self.queued.discard(future)
+
+    def run(self, engine, sink=None, **kwargs):
+        """Run one Selenium job in a worker and wait for its products (thread-safe)"""
+        return self.run_timed(engine, sink, **kwargs)[0]
+
+    def run_timed(self, engine, sink=None, **kwargs):
+        """run(), returning (products, seconds the job ran in its worker)"""
+        buffer = BufferedSink(CheckpointSnapshot(sink.jobs) if sink else None)
+
+        with self._domain_lock(kwargs.get("url", engine)):
+            for attempt in range(MAX_RESTARTS + 1):
+                executor = self._executor()
+                try:
+                    products, calls, seconds = executor.submit(
+                        _run_job, engine, kwargs, buffer, os.environ.get("SCRAPER_RUN_ID")
+                    ).result()
+                    break
+                except BrokenProcessPool:
+                    self._restart(executor)
+                    if attempt == MAX_RESTARTS:
+                        raise
+
+        buffer.calls = calls
+        buffer.commit(sink)
+        return products, seconds
+
+    def submit(self, engine, sink=None, **kwargs):
+        """Queue a Selenium job without waiting; returns a Future of its products"""
+        return self.submit_call(self.run, engine, sink, **kwargs)
+
+    def submit_call(self, function, *args, **kwargs):
+        """
+        Queue any call that ends in run() (e.g. wrapped by the scheduler).
+        It is dispatched once no other queued call for its `url`'s domain runs.
+        """
+        domain = urlparse(kwargs["url"]).netloc if kwargs.get("url") else None
+        future = Future()
+        with self.lock:
+            self.queued.add(future)
+            self.pending.append((domain, future, function, args, kwargs))
+        future.add_done_callback(self._forget)
+        self._dispatch()
+        return future
+
+    def shutdown(self):
+        # Queued calls are only handed to the dispatcher as earlier ones finish
+        while True:
+            with self.lock:
+                waiting = list(self.queued)
+            if not waiting:
+                break
+            wait(waiting)
+        self.dispatcher.shutdown(wait=True)
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+                self.executor = None
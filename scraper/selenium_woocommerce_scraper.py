@@ -3,47 +3,65 @@ scraper/selenium_woocommerce_scraper.py
 Selenium-based scraper for JavaScript-heavy WooCommerce sites
 """
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time
-from scraper.utils import parse_price
-
-
-def scrape_with_selenium(url, category, site_name, max_pages=3):
+from bs4 import BeautifulSoup
+from scraper.utils import parse_price, page_url, discover_page_count
+from scraper.rate_limiter import get_rate_limiter
+from scraper.archive import archive_page
+from scraper.browser import create_driver, quit_driver
+from scraper.grid_cache import grid_hash, cached_page
+from config import MAX_CATEGORY_PAGES
+
+
+def scrape_with_selenium(
+    url, category, site_name, max_pages=MAX_CATEGORY_PAGES, sink=None, driver=None
+):
     """
     Scrape WooCommerce sites that require JavaScript rendering
 
+    The page count is read from the rendered pagination of each page, so
+    categories are followed to their last page instead of a fixed range.
+
     Args:
         url: Base category URL
         category: Category name for labeling
         site_name: Site name for labeling
-        max_pages: Number of pages to scrape
+        max_pages: Optional cap on the number of pages to scrape
+        sink: Optional ProductSink that receives each page's products and
+              checkpoints each page; pages it already has are skipped
+        driver: Optional running Chrome to reuse (left open afterwards)
     """
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-    )
-
-    driver = None
+
+    # A driver passed in (e.g. by a pool worker) is reused and left running
+    owns_driver = driver is None
     products = []
 
+    # Pages finished by an earlier attempt of this run (--resume)
+    done = sink.completed_pages(site_name, category) if sink else {}
+    page_count = max([entry.get("page_count", 1) for entry in done.values()], default=1)
+    if max_pages:
+        page_count = min(page_count, max_pages)
+    if done and all(p in done for p in range(1, page_count + 1)):
+        print(f"    All {page_count} pages already scraped in this run")
+        return products
+
+    page = 1
+
     try:
-        driver = webdriver.Chrome(options=chrome_options)
+        if owns_driver:
+            driver = create_driver(profile=site_name)
 
-        for page in range(1, max_pages + 1):
-            page_url = f"{url}page/{page}/" if page > 1 else url
+        while page <= page_count:
+            if page in done:
+                page += 1
+                continue
 
             try:
-                print(f"    Fetching with Selenium: {page_url}")
-                driver.get(page_url)
+                print(f"    Fetching with Selenium: {page_url(url, page)}")
+                get_rate_limiter().acquire(url, category)
+                driver.get(page_url(url, page))
 
                 # Wait for products to load
                 wait = WebDriverWait(driver, 10)
@@ -74,90 +92,124 @@ def scrape_with_selenium(url, category, site_name, max_pages=3):
                     except Exception:
                         continue
 
+                html = driver.page_source
+                archive_page(html, site_name, category, page, page_url(url, page), "selenium")
+
                 if not product_elements:
                     print(f"    No products found on page {page}")
+                    if sink and page == 1:
+                        sink.fail_job(site_name, category, page, "no products found")
                     break
 
-                page_found = 0
-
-                for product_elem in product_elements:
-                    try:
-                        # Extract product name
-                        name = None
-                        name_selectors = [
-                            "h2.woocommerce-loop-product__title",
-                            "h3.product-title",
-                            ".product-title",
-                            "h2",
-                            "h3",
-                            "a",
-                        ]
-
-                        for name_sel in name_selectors:
-                            try:
-                                name_elem = product_elem.find_element(
-                                    By.CSS_SELECTOR, name_sel
-                                )
-                                name = name_elem.text.strip()
-                                if name and len(name) > 3:
-                                    break
-                            except Exception:
-                                pass
-
-                        # Extract price
-                        price = None
-                        price_selectors = [
-                            "span.woocommerce-Price-amount.amount bdi",
-                            "span.woocommerce-Price-amount.amount",
-                            "span.amount",
-                            "span.price",
-                            ".price",
-                            "bdi",
-                        ]
-
-                        for price_sel in price_selectors:
-                            try:
-                                price_elems = product_elem.find_elements(
-                                    By.CSS_SELECTOR, price_sel
-                                )
-                                if price_elems:
-                                    price_text = price_elems[-1].text
-                                    price = parse_price(price_text)
-                                    if price and price > 100:
-                                        break
-                            except Exception:
-                                pass
-
-                        if name and price and price > 100:
-                            products.append(
-                                {
-                                    "site": site_name,
-                                    "category": category,
-                                    "product": name,
-                                    "price_LKR": price,
-                                    "is_own_shop": False,
-                                }
-                            )
-                            page_found += 1
-
-                    except Exception as e:
-                        continue
-
-                print(f"    Found {page_found} products on page {page}")
-
-                if page_found == 0:
+                digest = grid_hash(html)
+                cached = cached_page(site_name, category, page, digest)
+                if cached:
+                    page_products = cached["products"]
+                    page_count = max(page_count, cached.get("page_count", 1))
+                    print(f"    Grid unchanged, reusing {len(page_products)} products of the last run")
+                else:
+                    page_products = extract_elements(product_elements, category, site_name)
+                    page_count = max(
+                        page_count, discover_page_count(BeautifulSoup(html, "html.parser"), page)
+                    )
+
+                print(f"    Found {len(page_products)} products on page {page}")
+
+                if not page_products:
                     break
 
-                time.sleep(2)
+                products.extend(page_products)
+
+                if sink:
+                    sink.write_job(
+                        site_name, category, page, page_products,
+                        page_count=page_count, grid_hash=digest,
+                    )
+                if max_pages:
+                    page_count = min(page_count, max_pages)
+                page += 1
 
             except Exception as e:
                 print(f"    Error loading page: {e}")
+                if sink:
+                    sink.fail_job(site_name, category, page, e)
                 break
 
     except Exception as e:
         print(f"  Error with Selenium: {e}")
+        if sink:
+            sink.fail_job(site_name, category, page, e)
     finally:
-        if driver:
-            driver.quit()
+        if driver and owns_driver:
+            quit_driver(driver)
 
     return products
+
+
+def extract_elements(product_elements, category, site_name):
+    """Products of one page from its rendered product elements"""
+    page_products = []
+
+    for product_elem in product_elements:
+        try:
+            # Extract product name
+            name = None
+            name_selectors = [
+                "h2.woocommerce-loop-product__title",
+                "h3.product-title",
+                ".product-title",
+                "h2",
+                "h3",
+                "a",
+            ]
+
+            for name_sel in name_selectors:
+                try:
+                    name_elem = product_elem.find_element(
+                        By.CSS_SELECTOR, name_sel
+                    )
+                    name = name_elem.text.strip()
+                    if name and len(name) > 3:
+                        break
+                except Exception:
+                    pass
+
+            # Extract price
+            price = None
+            price_selectors = [
+                "span.woocommerce-Price-amount.amount bdi",
+                "span.woocommerce-Price-amount.amount",
+                "span.amount",
+                "span.price",
+                ".price",
+                "bdi",
+            ]
+
+            for price_sel in price_selectors:
+                try:
+                    price_elems = product_elem.find_elements(
+                        By.CSS_SELECTOR, price_sel
+                    )
+                    if price_elems:
+                        price_text = price_elems[-1].text
+                        price = parse_price(price_text)
+                        if price and price > 100:
+                            break
+                except Exception:
+                    pass
+
+            if name and price and price > 100:
+                page_products.append(
+                    {
+                        "site": site_name,
+                        "category": category,
+                        "product": name,
+                        "price_LKR": price,
+                        "is_own_shop": False,
+                    }
+                )
+
+        except Exception as e:
+            continue
+
+    return page_products
@@ -0,0 +1,312 @@
+# scraper/sink.py - Streaming, crash-safe product sink with per-job checkpoints
+
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from scraper.dedup import dedupe_products
+
+RUNS_DIR = "data/runs"
+KEEP_RUNS = 5  # Run directories kept for --resume
+
+
+def job_key(site, category, page):
+    """Checkpoint key for one (site, category, page) job"""
+    return f"{site}|{category}|{page}"
+
+
+class CheckpointLookup:
+    """Checkpoint queries over a {job key: latest status entry} dict in self.jobs"""
+
+    def completed(self, site, category, page):
+        """Status entry of a finished job, or None if it still needs to run"""
+        entry = self.jobs.get(job_key(site, category, page))
+        return entry if entry and entry["status"] == "done" else None
+
+    def completed_pages(self, site, category):
+        """{page: status entry} for the finished pages of one category"""
+        prefix = job_key(site, category, "")
+        return {
+            int(key[len(prefix):]): entry
+            for key, entry in self.jobs.items()
+            if key.startswith(prefix) and entry["status"] == "done"
+        }
+
+
+class CheckpointSnapshot(CheckpointLookup):
+    """Read-only copy of a run's checkpoints that can be sent to a worker process"""
+
+    def __init__(self, jobs):
+        self.jobs = dict(jobs)
+
+
+class ProductSink(CheckpointLookup):
+    """
+    Engines write products here as soon as they are extracted.
+
+    Every run gets a directory under data/runs/<run_id>/ holding:
+      - products.jsonl: product rows, appended and fsync'ed every
+        `fsync_every` rows or `fsync_interval` seconds
+      - jobs.jsonl: one status line per (site, category, page) job
+
+    A job's rows are only counted once its "done" status line exists, so a
+    crash never leaves half a page in the snapshot. Reopening an existing
+    run (by passing its run_id) skips jobs that already finished and retries the
+    failed or missing ones. `finalize()` turns the finished jobs into the
+    CSV snapshot with an atomic rename.
+    """
+
+    def __init__(
+        self,
+        output_file="data/all_products.csv",
+        runs_dir=RUNS_DIR,
+        run_id=None,
+        fsync_every=50,
+        fsync_interval=5.0,
+    ):
+        self.output_file = output_file
+        self.runs_dir = runs_dir
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.run_dir = os.path.join(runs_dir, self.run_id)
+        self.staging_path = os.path.join(self.run_dir, "products.jsonl")
+        self.jobs_path = os.path.join(self.run_dir, "jobs.jsonl")
+        self.published_path = os.path.join(self.run_dir, "published_at")
+        # Rows from an earlier, interrupted attempt of a job are ignored
+        self.attempt = f"{os.getpid()}-{time.time_ns()}"
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.count = 0
+        self.duplicates = 0  # Rows merged by the last finalize()
+        self.carried = []  # Rows carried forward by the last finalize()
+        self.lock = threading.Lock()
+
+        os.makedirs(self.run_dir, exist_ok=True)
+        self.jobs = self.load_jobs()
+        self.file = open(self.staging_path, "a", encoding="utf-8")
+        self.jobs_file = open(self.jobs_path, "a", encoding="utf-8")
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def load_jobs(self):
+        """Latest status of every job recorded in this run"""
+        jobs = {}
+        if os.path.exists(self.jobs_path):
+            with open(self.jobs_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        status = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line from a crash
+                    jobs[status["job"]] = status
+        return jobs
+
+    def write(self, products, job=None):
+        """Append extracted products to the staging file"""
+        if not products:
+            return
+
+        if job:
+            products = [dict(p, _job=job, _attempt=self.attempt) for p in products]
+        lines = "".join(json.dumps(p, ensure_ascii=False) + "\n" for p in products)
+
+        with self.lock:
+            self.file.write(lines)
+            self.count += len(products)
+            self.unsynced += len(products)
+
+            if (
+                self.unsynced >= self.fsync_every
+                or time.monotonic() - self.last_sync >= self.fsync_interval
+            ):
+                self._sync()
+
+    def write_job(self, site, category, page, products, **meta):
+        """Write one job's products and checkpoint it as done"""
+        key = job_key(site, category, page)
+        self.write(products, job=key)
+        with self.lock:
+            # Rows must be durable before the job is marked done
+            self._sync()
+        self._record(key, "done", products=len(products), **meta)
+
+    def fail_job(self, site, category, page, error):
+        """Checkpoint a job as failed so --resume retries it"""
+        self._record(job_key(site, category, page), "failed", error=str(error))
+
+    def _record(self, key, status, **fields):
+        entry = {"job": key, "status": status, "attempt": self.attempt,
+                 "at": datetime.now().isoformat(timespec="seconds"), **fields}
+        with self.lock:
+            self.jobs_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.jobs_file.flush()
+            os.fsync(self.jobs_file.fileno())
+            self.jobs[key] = entry
+
+    def failed_jobs(self):
+        return [key for key, entry in self.jobs.items() if entry["status"] == "failed"]
+
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self._sync()
+                self.file.close()
+            if not self.jobs_file.closed:
+                self.jobs_file.close()
+
+    def read_staged(self, by_job=False):
+        """
+        Load the products of every finished job (plus untagged rows), or
+        with `by_job` as {job key: products} of the tagged rows only.
+        """
+        done = {
+            key: entry["attempt"]
+            for key, entry in self.load_jobs().items()
+            if entry["status"] == "done"
+        }
+        products, jobs = [], {}
+        with open(self.staging_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    product = json.loads(line)
+                except ValueError:
+                    continue
+                key = product.pop("_job", None)
+                attempt = product.pop("_attempt", None)
+                if key is None or done.get(key) == attempt:
+                    products.append(product)
+                    if key is not None:
+                        jobs.setdefault(key, []).append(product)
+        return jobs if by_job else products
+
+    def published_at(self):
+        """
+        The run's scraped_at stamp: picked by its first publish and reused
+        when a resumed attempt publishes again, so history records the
+        observations of jobs finished in the first attempt only once.
+        """
+        try:
+            with open(self.published_path, encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            stamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            with open(self.published_path, "w", encoding="utf-8") as f:
+                f.write(stamp)
+            return stamp
+
+    def finalize(self, scraped_at=None, carried=()):
+        """
+        Publish the staged products as the CSV snapshot.
+        Listings found under several categories of a site are merged into
+        one row first (see scraper/dedup.py). The CSV is written to a
+        temporary file and renamed over the old snapshot, so readers never
+        see a half-written file. The run directory is kept so failed jobs
+        can still be retried with --resume.
+
+        `carried` rows (earlier snapshot rows of categories not scraped this
+        run, see scraper/frequency.py) are added unless the listing was
+        scraped again.
+
+        Returns the snapshot DataFrame (empty if nothing was scraped, in
+        which case the previous snapshot is left untouched).
+        """
+        import pandas as pd
+
+        self.close()
+
+        staged = self.read_staged()
+        products = dedupe_products(staged)
+        self.duplicates = len(staged) - len(products)
+
+        fresh = {(p["site"], p["product_id"]) for p in products}
+        self.carried = [p for p in carried if (p["site"], p["product_id"]) not in fresh] if products else []
+
+        df = pd.DataFrame(products + self.carried)
+        if not df.empty:
+            df["scraped_at"] = scraped_at or self.published_at()
+            write_csv_atomic(df, self.output_file)
+
+        prune_runs(self.runs_dir, keep=KEEP_RUNS)
+        return df
+
+
+class BufferedSink:
+    """
+    Holds an engine's writes in memory until they are accepted.
+    Used to try a cheap engine and throw its result away if it falls short,
+    and to carry a worker process's writes back to the parent. Checkpoint
+    lookups go to the wrapped sink (or CheckpointSnapshot).
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.calls = []
+
+    def write_job(self, *args, **kwargs):
+        self.calls.append(("write_job", args, kwargs))
+
+    def fail_job(self, site, category, page, error):
+        # Stored as text so the buffer can be pickled back from a worker
+        self.calls.append(("fail_job", (site, category, page, str(error)), {}))
+
+    @property
+    def jobs(self):
+        return self.sink.jobs if self.sink else {}
+
+    def completed(self, site, category, page):
+        return self.sink.completed(site, category, page) if self.sink else None
+
+    def completed_pages(self, site, category):
+        return self.sink.completed_pages(site, category) if self.sink else {}
+
+    def commit(self, sink=None):
+        """Replay the buffered writes into the real sink"""
+        target = sink or self.sink
+        if target:
+            for method, args, kwargs in self.calls:
+                getattr(target, method)(*args, **kwargs)
+        self.calls = []
+
+
+def latest_run_id(runs_dir=RUNS_DIR):
+    """Most recent run directory, used by --resume without an explicit run id"""
+    if not os.path.isdir(runs_dir):
+        return None
+    runs = sorted(
+        name for name in os.listdir(runs_dir)
+        if os.path.isdir(os.path.join(runs_dir, name))
+    )
+    return runs[-1] if runs else None
+
+
+def prune_runs(runs_dir=RUNS_DIR, keep=KEEP_RUNS):
+    """Delete all but the newest `keep` run directories"""
+    if not os.path.isdir(runs_dir):
+        return
+    runs = sorted(
+        name for name in os.listdir(runs_dir)
+        if os.path.isdir(os.path.join(runs_dir, name))
+    )
+    for name in runs[:-keep]:
+        shutil.rmtree(os.path.join(runs_dir, name), ignore_errors=True)
+
+
+def write_csv_atomic(df, path):
+    """Write a DataFrame to CSV via a temporary file and an atomic rename"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.tmp")
+
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        df.to_csv(f, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
@@ -0,0 +1,229 @@
+# scraper/sitemap_scraper.py - Discover every product of a shop from its sitemap, fetching only new or updated pages
+
+import json
+import os
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from bs4 import BeautifulSoup
+from scraper.utils import parse_price
+from scraper.woocommerce_scraper import fetch_page
+from config import MAX_CONCURRENT_REQUESTS_PER_HOST, SITEMAP_BATCH_SIZE, SITEMAP_MAX_FETCHES, SITEMAP_REFRESH_DAYS
+
+SITEMAP_STATE_FILE = "data/sitemap_state.json"
+
+# Product page template, used when a page has no schema.org Product JSON-LD
+TITLE_SELECTORS = ["h1.product_title", "h1.product-title", "h1"]
+PRICE_SELECTORS = [
+    ".summary .price ins .amount",
+    ".summary .price .amount",
+    "p.price ins .amount",
+    "p.price .amount",
+    "p.price",
+]
+
+_state_lock = threading.Lock()
+
+
+def _tag(element):
+    """Element name without its XML namespace"""
+    return element.tag.rsplit("}", 1)[-1]
+
+
+def parse_sitemap(xml):
+    """
+    ({url: lastmod or None}, [child sitemap urls]) of a sitemap document.
+    A <urlset> lists pages, a <sitemapindex> lists further sitemaps.
+    """
+    root = ET.fromstring(xml)
+    urls, children = {}, []
+    for entry in root:
+        fields = {_tag(child): (child.text or "").strip() for child in entry}
+        if not fields.get("loc"):
+            continue
+        if _tag(root) == "sitemapindex":
+            children.append(fields["loc"])
+        else:
+            urls[fields["loc"]] = fields.get("lastmod") or None
+    return urls, children
+
+
+def discover_urls(sitemap_url, job=None):
+    """
+    Every product URL with its lastmod date, following a sitemap index
+    into its product sitemaps. None if any sitemap could not be read, as
+    a partial list would drop the products it misses.
+    """
+    response = fetch_page(sitemap_url, job)
+    if response is None:
+        return None
+    urls, children = parse_sitemap(response.content)
+    for child in children:
+        if "product" not in child:
+            continue
+        response = fetch_page(child, job)
+        if response is None:
+            return None
+        urls.update(parse_sitemap(response.content)[0])
+    return urls
+
+
+def product_offer(data):
+    """(name, lowest price) of the first schema.org Product in JSON-LD data, or None"""
+    stack = [data]
+    while stack:
+        item = stack.pop(0)
+        if isinstance(item, list):
+            stack.extend(item)
+            continue
+        if not isinstance(item, dict):
+            continue
+        types = item.get("@type")
+        if "Product" in (types if isinstance(types, list) else [types]):
+            offers = item.get("offers") or []
+            prices = []
+            for offer in offers if isinstance(offers, list) else [offers]:
+                # Simple products have a price, variable ones an AggregateOffer range
+                price = parse_price(offer.get("price") or offer.get("lowPrice"))
+                if price:
+                    prices.append(price)
+            if item.get("name") and prices:
+                return item["name"].strip(), min(prices)
+        stack.extend(value for value in item.values() if isinstance(value, (dict, list)))
+    return None
+
+
+def extract_product(html):
+    """(name, price) of a product page - JSON-LD first, then the WooCommerce template"""
+    soup = BeautifulSoup(html, "html.parser")
+    for script in soup.select('script[type="application/ld+json"]'):
+        try:
+            found = product_offer(json.loads(script.string or ""))
+        except ValueError:
+            continue
+        if found:
+            return found
+
+    name_elem = next(filter(None, (soup.select_one(sel) for sel in TITLE_SELECTORS)), None)
+    price_elem = next(filter(None, (soup.select_one(sel) for sel in PRICE_SELECTORS)), None)
+    if name_elem and price_elem:
+        price = parse_price(price_elem.get_text(strip=True))
+        if price:
+            return name_elem.get_text(strip=True), price
+    return None
+
+
+def load_sitemap_state(path=SITEMAP_STATE_FILE):
+    """{site: {url: {"lastmod", "fetched", "product"}}} recorded by earlier runs"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_sitemap_state(site_name, entries, path=SITEMAP_STATE_FILE):
+    """Replace one site's entries (other shops may be scraped at the same time)"""
+    with _state_lock:
+        state = load_sitemap_state(path)
+        state[site_name] = entries
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+        os.replace(tmp_path, path)
+
+
+def needs_fetch(entry, lastmod, stale_before):
+    """A page is fetched when new, when its lastmod moved, or when not fetched for a while"""
+    return entry is None or entry.get("lastmod") != lastmod or entry.get("fetched", "") < stale_before
+
+
+def scrape_sitemap(url, category, site_name, sink=None, state_path=SITEMAP_STATE_FILE, today=None):
+    """
+    Scrape every product a shop lists in its sitemap
+
+    The sitemap gives each product URL with its lastmod date. Only pages
+    that are new, whose lastmod changed, or that were last fetched more
+    than SITEMAP_REFRESH_DAYS ago are requested (newest first, at most
+    SITEMAP_MAX_FETCHES per run); every other product is published with
+    the name and price recorded when its page was last fetched, marked
+    with that date in `carried_from` so history doesn't record the old
+    price again and a fresh price for the listing wins in dedup. URLs are
+    processed in batches of SITEMAP_BATCH_SIZE, each checkpointed in the
+    sink as one page of the job, and requests go through the shared
+    per-domain rate limiter.
+
+    Args:
+        url: Product sitemap (or sitemap index) URL
+        category: Category name for labeling, e.g. "DoctorMobile All Products"
+        site_name: Site name for labeling
+        sink: Optional ProductSink that receives each batch's products
+    """
+    today = today or date.today()
+    try:
+        urls = discover_urls(url, category)
+    except ET.ParseError as e:
+        print(f"    Invalid sitemap: {e}")
+        urls = None
+    if not urls:
+        print("    No product URLs found in the sitemap")
+        if sink:
+            sink.fail_job(site_name, category, 1, "no sitemap")
+        return []
+
+    known = load_sitemap_state(state_path).get(site_name, {})
+    stale_before = (today - timedelta(days=SITEMAP_REFRESH_DAYS)).isoformat()
+    changed = [u for u, lastmod in urls.items() if needs_fetch(known.get(u), lastmod, stale_before)]
+    changed.sort(key=lambda u: urls[u] or "", reverse=True)
+    postponed = len(changed) - SITEMAP_MAX_FETCHES
+    changed = set(changed[:SITEMAP_MAX_FETCHES])
+    print(
+        f"    {len(urls)} products in the sitemap, {len(changed)} new or updated"
+        + (f" ({postponed} left for the next runs)" if postponed > 0 else "")
+    )
+
+    ordered = sorted(urls)
+    batches = [ordered[i:i + SITEMAP_BATCH_SIZE] for i in range(0, len(ordered), SITEMAP_BATCH_SIZE)]
+    done = sink.completed_pages(site_name, category) if sink else {}
+    products, fetched, failed = [], set(), 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS_PER_HOST) as pool:
+            for page, batch in enumerate(batches, start=1):
+                if page in done:
+                    continue
+                to_fetch = [u for u in batch if u in changed]
+                for product_url, response in zip(to_fetch, pool.map(lambda u: fetch_page(u, category), to_fetch)):
+                    if response is None:
+                        failed += 1  # Keeps its old entry, so it is tried again next run
+                        continue
+                    found = extract_product(response.content)
+                    known[product_url] = {
+                        "lastmod": urls[product_url],
+                        "fetched": today.isoformat(),
+                        "product": {"product": found[0], "price_LKR": found[1]} if found else None,
+                    }
+                    fetched.add(product_url)
+
+                batch_products = []
+                for u in batch:
+                    entry = known.get(u, {})
+                    if not entry.get("product") or entry["product"]["price_LKR"] <= 100:
+                        continue
+                    row = {"site": site_name, "category": category, **entry["product"], "is_own_shop": False}
+                    if u not in fetched:
+                        row["carried_from"] = entry["fetched"]
+                    batch_products.append(row)
+                products.extend(batch_products)
+                if sink:
+                    sink.write_job(site_name, category, page, batch_products, page_count=len(batches))
+    except Exception as e:
+        print(f"    Error: {e}")
+    finally:
+        # Products that left the sitemap are forgotten
+        save_sitemap_state(site_name, {u: known[u] for u in ordered if u in known}, state_path)
+
+    print(f"    Fetched {len(fetched)} product pages" + (f" ({failed} failed)" if failed else ""))
+    return products
@@ -1,4 +1,5 @@
 import re
+import threading
 
 def parse_price(price_str):
     """
@@ -50,3 +51,60 @@ def parse_price(price_str):
             
     except ValueError:
         return None
+
+
+def page_url(url, page):
+    """Build the WooCommerce URL for a given category page (page 1 is the base URL)"""
+    if page <= 1:
+        return url
+    return f"{url.rstrip('/')}/page/{page}/"
+
+
+def discover_page_count(soup, current_page=1):
+    """
+    Read the number of pages in a WooCommerce category from a listing page.
+    Uses the numbered pagination links and the "next" link (themes that only
+    render "next" tell us there is at least one more page).
+    Returns current_page when there is no further pagination.
+    """
+    page_numbers = [current_page]
+
+    for link in soup.select("a.page-numbers, .woocommerce-pagination a, .pagination a"):
+        href = link.get("href") or ""
+        match = re.search(r'/page/(\d+)', href)
+        if match:
+            page_numbers.append(int(match.group(1)))
+            continue
+        text = link.get_text(strip=True).replace(",", "")
+        if text.isdigit():
+            page_numbers.append(int(text))
+
+    for link in soup.select('link[rel="next"], a[rel="next"], a.next'):
+        match = re.search(r'/page/(\d+)', link.get("href") or "")
+        page_numbers.append(int(match.group(1)) if match else current_page + 1)
+
+    return max(page_numbers)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def http_session():
+    """
+    Process-wide requests session. Keep-alive connections (and TLS
+    sessions) are reused across pages, categories and - in daemon mode -
+    runs, instead of a new handshake per request.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from config import MAX_CONCURRENT_REQUESTS_PER_HOST
+
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=MAX_CONCURRENT_REQUESTS_PER_HOST * 2)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
@@ -1,162 +1,251 @@
 # scraper/woocommerce_scraper.py - Improved WooCommerce scraper with better error handling
 
-import requests
 from bs4 import BeautifulSoup
-import time
-from scraper.utils import parse_price
+from concurrent.futures import ThreadPoolExecutor
+from scraper.utils import parse_price, page_url, discover_page_count, http_session
+from scraper.rate_limiter import get_rate_limiter
+from scraper.archive import archive_page
+from scraper.grid_cache import grid_hash, cached_page
+from config import MAX_CATEGORY_PAGES, MAX_CONCURRENT_REQUESTS_PER_HOST
+
+# Enhanced headers to avoid 403 Forbidden errors
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Connection": "keep-alive",
+    "Cache-Control": "max-age=0",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+# Multiple selector patterns
+# Exclude 'product-category' which are just links to subcategories
+PRODUCT_SELECTORS = [
+    "li.product:not(.product-category)",
+    "div.product:not(.product-category)",
+    "li.product-type-simple",
+    "div.product-small",
+    ".products li:not(.product-category)",
+    "div[data-product-id]",
+    "div.wd-product",  # ecomall WooCommerce theme
+]
+
+NAME_SELECTORS = [
+    "h2.woocommerce-loop-product__title",
+    "h3.product-title",
+    "h2.product-title",
+    ".product-title",
+    "a.woocommerce-LoopProduct-link",
+    "h2",
+    "h3",
+    'a[href*="product"]',
+    ".product-name",
+    ".product-item-title",
+    "a.product-image-link",  # ecomall theme
+]
+
+PRICE_SELECTORS = [
+    "span.woocommerce-Price-amount.amount bdi",  # Specific for new WC
+    "span.woocommerce-Price-amount.amount",
+    "ins span.amount",
+    "span.price span.amount",
+    ".price ins .amount",
+    ".price .amount",
+    "span.amount",
+    "bdi",
+    ".price",
+    "span.product-price",
+    ".sale-price",
+    ".product-amount",
+    "span[data-price]",
+    "ins",
+    "strong.amount",
+    "span.product-sale-price",
+]
+
+
+def fetch_page(url, job=None, retries=2):
+    """Fetch one category page, returning the response or None on failure"""
+    limiter = get_rate_limiter()
+
+    for attempt in range(retries + 1):
+        try:
+            print(f"    Fetching: {url}")
+            limiter.acquire(url, job)
+            response = http_session().get(url, headers=HEADERS, timeout=20)
+            limiter.report(url, response.status_code)
+
+            if response.status_code == 200:
+                return response
+
+            print(f"    Status code: {response.status_code}")
+            # 429/403 slowed the domain down - try again at the new rate
+            if response.status_code not in (403, 429):
+                return None
+        except Exception as e:
+            print(f"    Request failed: {e}")
+            return None
+
+    return None
+
+
+def extract_products(soup, category, site_name):
+    """
+    Extract products from a parsed WooCommerce category page
+
+    Returns:
+        (products, item_count, missing_prices)
+    """
+    products = []
+
+    product_elements = []
+    for selector in PRODUCT_SELECTORS:
+        product_elements = soup.select(selector)
+        if product_elements:
+            print(f"    Using selector: {selector} (found {len(product_elements)})")
+            break
+
+    page_no_price = 0
+
+    for product in product_elements:
+        try:
+            # Find name
+            name_elem = None
+            for sel in NAME_SELECTORS:
+                name_elem = product.select_one(sel)
+                if name_elem:
+                    break
+
+            # Find price
+            price_elem = None
+            for sel in PRICE_SELECTORS:
+                # Get the LAST matching element if there are multiple (often sale price is last)
+                elems = product.select(sel)
+                if elems:
+                    price_elem = elems[-1]
+                    break
+
+            if name_elem and price_elem:
+                name = name_elem.get_text(strip=True)
+                price_text = price_elem.get_text(strip=True)
+
+                price = parse_price(price_text)
+
+                if price and name and price > 100:  # Filter out weird low prices
+                    products.append(
+                        {
+                            "site": site_name,
+                            "category": category,
+                            "product": name,
+                            "price_LKR": price,
+                            "is_own_shop": False,
+                        }
+                    )
+                elif name and not price:
+                    page_no_price += 1
+            elif name_elem and not price_elem:
+                page_no_price += 1
 
+        except Exception:
+            continue
 
-def scrape_woocommerce_site(url, category, site_name):
+    return products, len(product_elements), page_no_price
+
+
+def scrape_woocommerce_site(
+    url, category, site_name, max_pages=MAX_CATEGORY_PAGES, sink=None
+):
     """
     Generic scraper for WooCommerce-based sites with improved price extraction
+
+    Page 1 is fetched first to discover how many pages the category has;
+    the remaining pages are then fetched concurrently (bounded by
+    MAX_CONCURRENT_REQUESTS_PER_HOST) and parsed in page order. Every
+    request is scheduled through the shared per-domain rate limiter.
+
+    Args:
+        url: Base category URL
+        category: Category name for labeling
+        site_name: Site name for labeling
+        max_pages: Optional cap on the number of pages to scrape
+        sink: Optional ProductSink that receives each page's products and
+              checkpoints each page; pages it already has are skipped
     """
     products = []
-    # Enhanced headers to avoid 403 Forbidden errors
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-        "Connection": "keep-alive",
-        "Cache-Control": "max-age=0",
-        "Upgrade-Insecure-Requests": "1",
-    }
+
+    # Pages finished by an earlier attempt of this run (--resume)
+    done = sink.completed_pages(site_name, category) if sink else {}
+    page_count = max([entry.get("page_count", 1) for entry in done.values()], default=1)
+    fetched_upto = 0
 
     try:
-        # Try first 3 pages
-        for page in range(1, 4):
-            page_url = f"{url}page/{page}/" if page > 1 else url
-
-            try:
-                print(f"    Fetching: {page_url}")
-                # Add minimal delay to appear more human-like (helps with 403 errors)
-                time.sleep(0.5)
-                response = requests.get(page_url, headers=headers, timeout=20)
-
-                if response.status_code != 200:
-                    print(f"    Status code: {response.status_code}")
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS_PER_HOST) as pool:
+            while True:
+                if max_pages:
+                    page_count = min(page_count, max_pages)
+
+                pages = [p for p in range(fetched_upto + 1, page_count + 1) if p not in done]
+                fetched_upto = page_count
+                if not pages:
                     break
 
-            except Exception as e:
-                print(f"    Request failed: {e}")
-                break
-
-            soup = BeautifulSoup(response.content, "html.parser")
-
-            # Multiple selector patterns
-            # Exclude 'product-category' which are just links to subcategories
-            selectors = [
-                "li.product:not(.product-category)",
-                "div.product:not(.product-category)",
-                "li.product-type-simple",
-                "div.product-small",
-                ".products li:not(.product-category)",
-                "div[data-product-id]",
-                "div.wd-product",  # ecomall WooCommerce theme
-            ]
-
-            product_elements = []
-            for selector in selectors:
-                product_elements = soup.select(selector)
-                if product_elements:
+                responses = pool.map(lambda p: fetch_page(page_url(url, p), category), pages)
+                finished = True
+
+                for page, response in zip(pages, responses):
+                    if response is None:
+                        if sink:
+                            sink.fail_job(site_name, category, page, "request failed")
+                        finished = False
+                        break
+
+                    archive_page(
+                        response.content, site_name, category, page, page_url(url, page), "requests"
+                    )
+                    # An unchanged grid reuses last run's products without parsing
+                    digest = grid_hash(response.content)
+                    cached = cached_page(site_name, category, page, digest)
+                    if cached:
+                        soup = None
+                        page_products, page_no_price = cached["products"], 0
+                        item_count = len(page_products)
+                        page_count = max(page_count, cached.get("page_count", 1))
+                        print(f"    Grid unchanged on page {page}, reusing {item_count} products")
+                    else:
+                        soup = BeautifulSoup(response.content, "html.parser")
+                        page_products, item_count, page_no_price = extract_products(
+                            soup, category, site_name
+                        )
+
+                    if item_count == 0:
+                        print("    No products found with any selector")
+                        if sink and page == 1:
+                            sink.fail_job(site_name, category, page, "no products found")
+                        finished = False
+                        break
+
+                    products.extend(page_products)
                     print(
-                        f"    Using selector: {selector} (found {len(product_elements)})"
+                        f"    Found {len(page_products)} products from {item_count} items on page {page}"
+                        + (f" ({page_no_price} missing prices)" if page_no_price > 0 else "")
                     )
-                    break
 
-            if not product_elements:
-                print("    No products found with any selector")
-                break
-
-            page_found = 0
-            page_no_price = 0
-
-            for product in product_elements:
-                try:
-                    # Find name
-                    name_selectors = [
-                        "h2.woocommerce-loop-product__title",
-                        "h3.product-title",
-                        "h2.product-title",
-                        ".product-title",
-                        "a.woocommerce-LoopProduct-link",
-                        "h2",
-                        "h3",
-                        'a[href*="product"]',
-                        ".product-name",
-                        ".product-item-title",
-                        "a.product-image-link",  # ecomall theme
-                    ]
-
-                    name_elem = None
-                    for sel in name_selectors:
-                        name_elem = product.select_one(sel)
-                        if name_elem:
-                            break
-
-                    # Find price
-                    price_selectors = [
-                        "span.woocommerce-Price-amount.amount bdi",  # Specific for new WC
-                        "span.woocommerce-Price-amount.amount",
-                        "ins span.amount",
-                        "span.price span.amount",
-                        ".price ins .amount",
-                        ".price .amount",
-                        "span.amount",
-                        "bdi",
-                        ".price",
-                        "span.product-price",
-                        ".sale-price",
-                        ".product-amount",
-                        "span[data-price]",
-                        "ins",
-                        "strong.amount",
-                        "span.product-sale-price",
-                    ]
-
-                    price_elem = None
-                    for sel in price_selectors:
-                        # Get the LAST matching element if there are multiple (often sale price is last)
-                        elems = product.select(sel)
-                        if elems:
-                            price_elem = elems[-1]
-                            break
-
-                    if name_elem and price_elem:
-                        name = name_elem.get_text(strip=True)
-                        price_text = price_elem.get_text(strip=True)
-
-                        price = parse_price(price_text)
-
-                        if (
-                            price and name and price > 100
-                        ):  # Filter out weird low prices
-                            products.append(
-                                {
-                                    "site": site_name,
-                                    "category": category,
-                                    "product": name,
-                                    "price_LKR": price,
-                                    "is_own_shop": False,
-                                }
-                            )
-                            page_found += 1
-                        elif name and not price:
-                            page_no_price += 1
-                    elif name_elem and not price_elem:
-                        page_no_price += 1
-
-                except Exception as e:
-                    continue
-
-            print(
-                f"    Found {page_found} products from {len(product_elements)} items on page {page}"
-                + (f" ({page_no_price} missing prices)" if page_no_price > 0 else "")
-            )
-
-            if page_found == 0:
-                break
-
-            time.sleep(2)
+                    # Pagination may only advertise a window of pages (or just
+                    # "next"), so every page can extend the known page count
+                    if soup is not None:
+                        page_count = max(page_count, discover_page_count(soup, page))
+                    if sink:
+                        sink.write_job(
+                            site_name, category, page, page_products,
+                            page_count=page_count, grid_hash=digest,
+                        )
+
+                    if not page_products:
+                        finished = False
+                        break
+
+                if not finished:
+                    break
 
     except Exception as e:
         print(f"    Error: {e}")
@@ -0,0 +1,63 @@
+# test_aggregates.py - Per-(site, category, day) statistics and their incremental updates
+
+import pandas as pd
+from scraper.aggregates import compute_stats, update_stats, load_stats, combine_stats, KEY_COLUMNS
+
+
+def snapshot(day, rows):
+    return pd.DataFrame([
+        {"site": site, "category": category, "product": f"{category} {i}", "price_LKR": price,
+         "is_own_shop": False, "scraped_at": f"{day} 10:00:00"}
+        for i, (site, category, price) in enumerate(rows)
+    ])
+
+
+def test_compute_stats_per_site_category_day():
+    df = snapshot("2026-05-01", [
+        ("A", "iPhone", 100000), ("A", "iPhone", 300000), ("A", "iPhone", 200000),
+        ("B", "iPhone", 150000), ("A", "AirPods", 0),
+    ])
+    stats = compute_stats(df).set_index(["site", "category"])
+
+    assert ("A", "AirPods") not in stats.index  # Zero prices are dropped
+    a = stats.loc[("A", "iPhone")]
+    assert (a["count"], a["mean"], a["median"], a["min"], a["max"]) == (3, 200000, 200000, 100000, 300000)
+    assert a["day"] == "2026-05-01"
+
+
+def test_update_replaces_only_rescraped_site_days(tmp_path):
+    path = str(tmp_path / "category_stats.csv")
+    update_stats(snapshot("2026-05-01", [("A", "iPhone", 100000), ("B", "iPhone", 120000)]), path)
+    update_stats(snapshot("2026-05-02", [("A", "iPhone", 110000)]), path)
+    # A second run on the same day only for site A
+    update_stats(snapshot("2026-05-02", [("A", "iPhone", 90000), ("A", "iPhone", 95000)]), path)
+
+    stats = load_stats(path).set_index(["site", "day"])
+    assert len(stats) == 3
+    assert stats.loc[("A", "2026-05-01"), "count"] == 1
+    assert stats.loc[("A", "2026-05-02"), "count"] == 2
+    assert stats.loc[("A", "2026-05-02"), "min"] == 90000
+    assert stats.loc[("B", "2026-05-01"), "max"] == 120000
+
+
+def test_update_by_category_keeps_other_categories_of_the_day(tmp_path):
+    path = str(tmp_path / "category_stats.csv")
+    update_stats(snapshot("2026-05-01", [("A", "iPhone", 100000), ("A", "Watch", 50000)]), path)
+    # A rebuilt snapshot without the Watch category (carried forward at the time)
+    update_stats(snapshot("2026-05-01", [("A", "iPhone", 98000)]), path, by=KEY_COLUMNS)
+
+    stats = load_stats(path).set_index(["category"])
+    assert stats.loc["iPhone", "min"] == 98000
+    assert stats.loc["Watch", "min"] == 50000
+
+
+def test_combine_stats_matches_raw_rows():
+    df = snapshot("2026-05-01", [
+        ("A", "iPhone", 100000), ("A", "iPhone", 200000),
+        ("B", "iPhone", 400000), ("B", "Samsung", 90000),
+    ])
+    combined = combine_stats(compute_stats(df), ["category"]).set_index("category")
+    raw = df.groupby("category")["price_LKR"].agg(["count", "mean", "min", "max"])
+
+    for column in ["count", "mean", "min", "max"]:
+        assert list(combined[column]) == list(raw[column].round(2))
@@ -0,0 +1,196 @@
+# test_alerts.py - Price-war alerts on changed prices, cooldowns and digests over a local SMTP server
+
+import os
+import socketserver
+import subprocess
+import sys
+import threading
+from datetime import datetime, timedelta
+from email import message_from_bytes
+import pandas as pd
+from scraper import alerts
+from scraper.alerts import changed_products, evaluate_changes, dispatch_alerts, price_wars, load_pending_alerts
+from scraper.matching import compare_products
+
+
+class SMTPDebugHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept messages and keep them for inspection"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 localhost debug SMTP")
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line[:4].upper()
+            if command in ("HELO", "EHLO"):
+                self.reply("250 localhost")
+            elif command == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif command == "RCPT":
+                recipients.append(line.split(":", 1)[1].strip(" <>"))
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = b""
+                while True:
+                    chunk = self.rfile.readline()
+                    if chunk in (b".\r\n", b""):
+                        break
+                    data += chunk
+                self.server.messages.append((recipients, message_from_bytes(data)))
+                self.reply("250 OK")
+            elif command == "QUIT" or not line:
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPDebugHandler)
+    server.daemon_threads = True
+    server.messages = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def snapshot(prices):
+    mine = {"iPhone 15 128GB": 250000, "AirPods Pro 2": 70000}
+    rows = [
+        {"site": "IdealZ (Your Shop)", "category": "IdealZ", "product": name,
+         "price_LKR": price, "is_own_shop": True}
+        for name, price in mine.items()
+    ]
+    rows += [
+        {"site": site, "category": "iPhone", "product": name, "price_LKR": price, "is_own_shop": False}
+        for (site, name), price in prices.items()
+    ]
+    return pd.DataFrame(rows)
+
+
+BASE = {
+    ("Celltronics", "Apple iPhone 15 128GB"): 248000,
+    ("Celltronics", "Apple iPhone 15 256GB"): 200000,  # Other storage, never a match
+    ("Lifemobile", "Apple AirPods Pro 2"): 69000,
+}
+
+
+def test_only_changed_products_are_evaluated():
+    previous = snapshot(BASE)
+    current = snapshot({**BASE, ("Celltronics", "Apple iPhone 15 128GB"): 230000})
+
+    changed = changed_products(previous, current)
+    assert [p["product"] for p in changed] == ["Apple iPhone 15 128GB"]
+
+    alerts = evaluate_changes(changed, current, threshold=5)
+    assert [(a["my_product"], a["competitor_price"]) for a in alerts] == [("iPhone 15 128GB", 230000)]
+
+
+def test_digest_per_recipient_with_cooldown(tmp_path):
+    server = smtp_server()
+    host, port = server.server_address
+    paths = dict(state_path=str(tmp_path / "state.json"), log_path=str(tmp_path / "alerts.jsonl"))
+    smtp = dict(host=host, port=port, starttls=False, user=None, sender="monitor@localhost")
+    now = datetime(2026, 5, 1, 9, 0)
+
+    try:
+        previous = snapshot(BASE)
+        current = snapshot({
+            **BASE,
+            ("Celltronics", "Apple iPhone 15 128GB"): 230000,
+            ("Lifemobile", "Apple AirPods Pro 2"): 60000,
+        })
+        sent = dispatch_alerts(previous, current, ["a@example.com", "b@example.com"], now, **paths, **smtp)
+        assert len(sent) == 2
+        # One digest per recipient, holding every alert of the run
+        assert sorted(r[0] for r, _ in server.messages) == ["a@example.com", "b@example.com"]
+        body = server.messages[0][1].get_payload()
+        assert "Apple iPhone 15 128GB" in body and "Apple AirPods Pro 2" in body
+
+        # Same prices an hour later: nothing new, nothing sent
+        again = snapshot({**BASE, ("Celltronics", "Apple iPhone 15 128GB"): 231000})
+        assert dispatch_alerts(current, again, ["a@example.com"], now + timedelta(hours=1), **paths, **smtp) == []
+
+        # A further drop breaks through the cooldown
+        lower = snapshot({**BASE, ("Celltronics", "Apple iPhone 15 128GB"): 220000})
+        sent = dispatch_alerts(again, lower, ["a@example.com"], now + timedelta(hours=2), **paths, **smtp)
+        assert [a["competitor_price"] for a in sent] == [220000]
+        assert len(server.messages) == 3
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert len((tmp_path / "alerts.jsonl").read_text().splitlines()) == 3
+
+
+def test_only_products_touched_by_a_change_are_compared(monkeypatch):
+    compared = []
+    compare = alerts.compare_product
+    monkeypatch.setattr(alerts, "compare_product", lambda product, index: compared.append(product["product"]) or compare(product, index))
+
+    previous = snapshot(BASE)
+    current = snapshot({**BASE, ("Lifemobile", "Apple AirPods Pro 2"): 60000})
+    evaluate_changes(changed_products(previous, current), current, threshold=5)
+    assert compared == ["AirPods Pro 2"]
+
+    compared.clear()
+    current = snapshot({**BASE, ("Lifemobile", "Samsung Charger 25W"): 9000})
+    assert evaluate_changes(changed_products(previous, current), current, threshold=5) == []
+    assert compared == []
+
+
+def test_emails_and_dashboard_report_the_same_price_wars():
+    current = snapshot({
+        **BASE,
+        ("Celltronics", "Apple iPhone 15 128GB"): 230000,
+        ("Lifemobile", "iPhone 15 Pro 128GB"): 200000,  # Contains "15", but another model
+    })
+    emailed = evaluate_changes(changed_products(None, current), current, threshold=5)
+    shown = price_wars(compare_products(current), threshold=5)
+
+    assert emailed == shown
+    assert [a["competitor_product"] for a in shown] == ["Apple iPhone 15 128GB"]
+
+
+def test_unsent_digest_is_retried_next_run(tmp_path):
+    paths = dict(state_path=str(tmp_path / "state.json"), log_path=str(tmp_path / "alerts.jsonl"),
+                 pending_path=str(tmp_path / "pending.json"))
+    smtp = dict(starttls=False, user=None, sender="monitor@localhost")
+    now = datetime(2026, 5, 1, 9, 0)
+    previous = snapshot(BASE)
+    current = snapshot({**BASE, ("Celltronics", "Apple iPhone 15 128GB"): 230000})
+
+    # Nothing listens on the port: the digest fails and its alert is kept
+    with socketserver.TCPServer(("127.0.0.1", 0), socketserver.BaseRequestHandler) as closed:
+        down = closed.server_address
+    assert dispatch_alerts(previous, current, ["a@example.com"], now, **paths, host=down[0], port=down[1], **smtp) == []
+    assert [a["competitor_price"] for a in load_pending_alerts(paths["pending_path"])] == [230000]
+
+    # The next run has no new changes, but sends what is pending
+    server = smtp_server()
+    host, port = server.server_address
+    try:
+        sent = dispatch_alerts(current, current, ["a@example.com"], now + timedelta(hours=1),
+                               **paths, host=host, port=port, **smtp)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert [a["competitor_price"] for a in sent] == [230000]
+    assert len(server.messages) == 1
+    assert load_pending_alerts(paths["pending_path"]) == []
+    assert len((tmp_path / "alerts.jsonl").read_text().splitlines()) == 1
+
+
+def test_unset_workflow_secrets_mean_defaults():
+    """The workflow passes secrets that were never set as empty variables"""
+    env = {**os.environ, "SMTP_HOST": "", "SMTP_PORT": "", "SMTP_USER": "", "SMTP_PASSWORD": ""}
+    result = subprocess.run(
+        [sys.executable, "-c", "import config; print(config.SMTP_HOST, config.SMTP_PORT, config.SMTP_USER)"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.split() == ["None", "587", "None"]
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scraper.analytics import (
+    update_analytics, load_daily, rolling_stats, product_family, MODEL_DAILY_FILE, CATEGORY_DAILY_FILE,
+)
+from scraper.history import append_history, replace_history
+
+START = pd.Timestamp("2026-03-01 06:00:00")
+
+
+def snapshot(day, prices):
+    """prices: {(site, product, is_own_shop): price}"""
+    return pd.DataFrame([
+        {"site": site, "category": f"{site} iPhone", "product": product, "price_LKR": price,
+         "is_own_shop": own, "scraped_at": str(START + pd.Timedelta(days=day))}
+        for (site, product, own), price in prices.items()
+    ])
+
+
+def record_days(history_dir, days):
+    for day in days:
+        prices = {
+            ("A", "iPhone 15 128GB", False): 200000 - 1000 * day,
+            ("B", "Apple iPhone 15 128GB", False): 210000,
+            ("C", "iPhone 16 256GB", False): 300000 + 500 * (day % 3),
+            ("Own", "iPhone 15 128GB", True): 205000,
+        }
+        append_history(snapshot(day, prices), history_dir)
+
+
+def tables(analytics_dir):
+    models = load_daily(f"{analytics_dir}/{MODEL_DAILY_FILE}").sort_values(["model", "day"], ignore_index=True)
+    categories = load_daily(f"{analytics_dir}/{CATEGORY_DAILY_FILE}").sort_values(["family", "day"], ignore_index=True)
+    return models, categories
+
+
+def test_position_against_market_min_and_median(tmp_path):
+    record_days(tmp_path / "history", [0])
+    update_analytics(tmp_path / "history", tmp_path / "analytics", today=START.date())
+    models, _ = tables(tmp_path / "analytics")
+
+    iphone15 = models[models["model"] == "15 128GB"].iloc[0]
+    assert iphone15["market_min"] == 200000
+    assert iphone15["market_median"] == 205000
+    assert iphone15["offers"] == 2
+    assert iphone15["vs_min"] == pytest.approx(0.025)
+    assert iphone15["vs_median"] == pytest.approx(0.0)
+    assert iphone15["index"] == pytest.approx(100.0)
+
+
+def test_index_chains_competitor_price_relatives(tmp_path):
+    record_days(tmp_path / "history", range(3))
+    update_analytics(tmp_path / "history", tmp_path / "analytics", today=(START + pd.Timedelta(days=2)).date())
+    models, _ = tables(tmp_path / "analytics")
+
+    # Geometric mean of A's and B's relatives, chained day to day; your price is not part of it
+    iphone15 = models[models["model"] == "15 128GB"]["index"].to_numpy()
+    expected = 100 * np.sqrt(np.array([200000, 199000, 198000]) / 200000)
+    assert iphone15 == pytest.approx(expected, rel=1e-5)
+
+
+def test_incremental_update_matches_full_rebuild(tmp_path):
+    days = range(20)
+    last = (START + pd.Timedelta(days=19)).date()
+    record_days(tmp_path / "history", days)
+    update_analytics(tmp_path / "history", tmp_path / "full", today=last)
+
+    record_days(tmp_path / "partial", range(12))
+    update_analytics(tmp_path / "partial", tmp_path / "incremental", today=(START + pd.Timedelta(days=11)).date())
+    record_days(tmp_path / "partial", range(12, 20))
+    computed = update_analytics(tmp_path / "partial", tmp_path / "incremental", today=last)
+
+    assert computed == 9  # The last stored day again, and the 8 new ones
+    for full, incremental in zip(tables(tmp_path / "full"), tables(tmp_path / "incremental")):
+        pd.testing.assert_frame_equal(full, incremental, check_exact=False, atol=1e-3, check_categorical=False)
+
+
+def test_rolling_statistics(tmp_path):
+    record_days(tmp_path / "history", range(10))
+    update_analytics(tmp_path / "history", tmp_path / "analytics", today=(START + pd.Timedelta(days=9)).date())
+    models, _ = tables(tmp_path / "analytics")
+    stats = rolling_stats(models, "model")
+
+    iphone16 = stats[stats["model"] == "16 256GB"].reset_index(drop=True)
+    assert iphone16["market_min_7d"].iloc[-1] == 300000
+    assert iphone16["market_median_7d"].iloc[-1] == pytest.approx(iphone16["market_median"].iloc[-7:].mean())
+    assert np.isnan(iphone16["volatility_7d"].iloc[0])
+    assert iphone16["volatility_30d"].iloc[-1] > 0
+
+
+def test_product_family():
+    names = pd.Series(["Apple iPhone 15", "iPad Air", "Galaxy S24", "Apple Watch Ultra", "Charger"])
+    assert list(product_family(names)) == ["iPhone", "iPad", "Samsung", "Watch", "Other"]
+
+
+def test_categories_not_scraped_keep_their_market(tmp_path):
+    history_dir = tmp_path / "history"
+    for day in range(3):
+        prices = {("A", "iPhone 15 128GB", False): 200000, ("Own", "iPhone 15 128GB", True): 205000}
+        if day != 1:  # B's category was not due on day 1
+            prices[("B", "Apple iPhone 15 128GB", False)] = 190000
+        append_history(snapshot(day, prices), history_dir)
+    update_analytics(history_dir, tmp_path / "analytics", today=(START + pd.Timedelta(days=2)).date())
+    models, _ = tables(tmp_path / "analytics")
+
+    assert list(models["market_min"]) == [190000] * 3
+    assert list(models["offers"]) == [2] * 3
+    assert list(models["index"]) == pytest.approx([100.0] * 3)
+
+
+def test_since_recomputes_rewritten_days(tmp_path):
+    history_dir, analytics_dir = tmp_path / "history", tmp_path / "analytics"
+    record_days(history_dir, range(5))
+    last = (START + pd.Timedelta(days=4)).date()
+    update_analytics(history_dir, analytics_dir, today=last)
+
+    # Day 2 is rebuilt from archived pages with a corrected price
+    rebuilt = snapshot(2, {("A", "iPhone 15 128GB", False): 150000})
+    replace_history(rebuilt.assign(scraped_at=str(START + pd.Timedelta(days=2))), history_dir)
+    assert update_analytics(history_dir, analytics_dir, today=last) == 1
+    assert update_analytics(history_dir, analytics_dir, today=last, since=START + pd.Timedelta(days=2)) == 3
+
+    models, _ = tables(analytics_dir)
+    iphone15 = models[models["model"] == "15 128GB"].set_index("day")
+    assert iphone15.loc[START.normalize() + pd.Timedelta(days=2), "market_min"] == 150000
@@ -0,0 +1,83 @@
+# test_api.py - JSON API over precomputed comparisons, with ETag revalidation
+
+import http.client
+import json
+import threading
+import pandas as pd
+from scraper.api import ComparisonData, create_server
+
+
+def write_snapshot(path):
+    pd.DataFrame([
+        {"site": "IdealZ (Your Shop)", "category": "IdealZ", "product": "iPhone 15 128GB", "price_LKR": 250000, "is_own_shop": True},
+        {"site": "Celltronics", "category": "iPhone", "product": "Apple iPhone 15 128GB", "price_LKR": 245000, "is_own_shop": False},
+        {"site": "Lifemobile", "category": "iPhone", "product": "iPhone 15 (128GB)", "price_LKR": 240000, "is_own_shop": False},
+        {"site": "Lifemobile", "category": "iPhone", "product": "iPhone 15 256GB", "price_LKR": 200000, "is_own_shop": False},
+    ]).assign(scraped_at="2026-05-01 09:00:00").to_csv(path, index=False)
+
+
+def serve(tmp_path):
+    write_snapshot(tmp_path / "all_products.csv")
+    (tmp_path / "alerts.jsonl").write_text(
+        '{"at": "2026-05-01T09:00:00", "my_product": "A"}\n'
+        '{"at": "2026-05-02T09:00:00", "my_product": "B"}\n'
+    )
+    data = ComparisonData(str(tmp_path / "all_products.csv"), str(tmp_path / "alerts.jsonl"))
+    server = create_server("127.0.0.1", 0, data)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def get(connection, path, headers=None):
+    connection.request("GET", path, headers=headers or {})
+    response = connection.getresponse()
+    body = response.read()
+    return response.status, response.getheader("ETag"), json.loads(body) if body else None
+
+
+def test_endpoints_and_etags(tmp_path):
+    server = serve(tmp_path)
+    connection = http.client.HTTPConnection(*server.server_address)
+    try:
+        status, etag, best = get(connection, "/best?sku=iphone%2015%20128gb")
+        assert status == 200
+        assert (best["best"]["site"], best["difference_LKR"]) == ("Lifemobile", 10000)
+
+        # Same connection, revalidated: nothing is sent again
+        status, _, body = get(connection, "/best?sku=iPhone%2015%20128GB", {"If-None-Match": etag})
+        assert (status, body) == (304, None)
+
+        _, _, matches = get(connection, f"/matches?sku={best['product_id']}")
+        assert [m["price_LKR"] for m in matches["matches"]] == [240000, 245000]
+
+        _, _, alerts = get(connection, "/alerts?since=2026-05-02")
+        assert [a["my_product"] for a in alerts["alerts"]] == ["B"]
+
+        assert get(connection, "/best?sku=Galaxy%20S24")[0] == 404
+        assert get(connection, "/best")[0] == 400
+    finally:
+        connection.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_snapshot_without_own_shop_column(tmp_path):
+    pd.DataFrame([
+        {"site": "Celltronics", "category": "iPhone", "product": "Apple iPhone 15 128GB", "price_LKR": 245000},
+    ]).to_csv(tmp_path / "all_products.csv", index=False)
+    data = ComparisonData(str(tmp_path / "all_products.csv"), str(tmp_path / "alerts.jsonl"))
+    data.load_snapshot()
+    assert data.responses == {}
+
+
+def test_alerts_echo_their_own_since(tmp_path):
+    (tmp_path / "alerts.jsonl").write_text('{"at": "2026-05-02T09:00:00", "my_product": "B"}\n')
+    data = ComparisonData(str(tmp_path / "missing.csv"), str(tmp_path / "alerts.jsonl"))
+
+    # Both dates select the same alerts, but each response names its own
+    first, first_etag = data.alerts_since("2026-05-01")
+    second, second_etag = data.alerts_since("2026-04-30")
+    assert json.loads(first)["since"] == "2026-05-01"
+    assert json.loads(second)["since"] == "2026-04-30"
+    assert json.loads(first)["alerts"] == json.loads(second)["alerts"]
+    assert first_etag != second_etag
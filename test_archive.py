@@ -0,0 +1,48 @@
+# test_archive.py - Content-addressed page archive, manifests and retention
+
+import os
+import time
+from scraper.archive import PageArchive
+
+PAGE = "<html><body><li class='product'>iPhone 15 <span class='amount'>Rs. 250,000</span></li></body></html>"
+
+
+def blob_files(root):
+    return [name for _, _, files in os.walk(os.path.join(root, "blobs")) for name in files]
+
+
+def test_identical_pages_are_stored_once(tmp_path):
+    root = str(tmp_path)
+    first = PageArchive(root, run_id="20260501-090000")
+    digest = first.store(PAGE, "Celltronics", "iPhone", 1, "https://celltronics.lk/iphone/", "requests")
+    second = PageArchive(root, run_id="20260502-090000")
+    assert second.store(PAGE, "Celltronics", "iPhone", 1, "https://celltronics.lk/iphone/", "requests") == digest
+    second.store(PAGE.replace("250,000", "245,000"), "Celltronics", "iPhone", 2)
+
+    assert len(blob_files(root)) == 2
+    assert second.load(digest) == PAGE
+
+    entries = second.entries()
+    assert [(e["run"], e["site"], e["category"], e["page"]) for e in entries] == [
+        ("20260502-090000", "Celltronics", "iPhone", 1),
+        ("20260502-090000", "Celltronics", "iPhone", 2),
+    ]
+    assert second.runs() == ["20260501-090000", "20260502-090000"]
+
+
+def test_prune_keeps_pages_still_referenced(tmp_path):
+    root = str(tmp_path)
+    old = PageArchive(root, run_id="20260101-090000")
+    shared = old.store(PAGE, "LuxuryX", "iPhone", 1)
+    old.store("<html>only in the old run</html>", "LuxuryX", "iPad", 1)
+
+    # Age the old run's manifest past the retention window
+    stale = time.time() - 40 * 86400
+    os.utime(old.manifest_path(old.run_id), (stale, stale))
+
+    current = PageArchive(root, run_id="20260501-090000")
+    current.store(PAGE, "LuxuryX", "iPhone", 1)
+
+    assert current.prune(retention_days=30) == (1, 1)
+    assert current.runs() == ["20260501-090000"]
+    assert current.load(shared) == PAGE
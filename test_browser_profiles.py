@@ -0,0 +1,34 @@
+# test_browser_profiles.py - Persistent Chrome profile slots for concurrent workers
+
+import os
+from selenium.webdriver.chrome.options import Options
+from scraper.browser import acquire_profile, use_profile
+
+
+def test_concurrent_browsers_get_separate_slots(tmp_path):
+    first = acquire_profile("LuxuryX", root=str(tmp_path), slots=2)
+    second = acquire_profile("LuxuryX", root=str(tmp_path), slots=2)
+    assert first.path != second.path
+    assert os.path.dirname(first.path) == str(tmp_path / "luxuryx")
+
+    # All slots taken: fall back to a blank profile
+    assert acquire_profile("LuxuryX", root=str(tmp_path), slots=2) is None
+
+    # A released slot is reused, with the stale Chrome lock cleaned up
+    open(os.path.join(first.path, "SingletonLock"), "w").close()
+    first.release()
+    again = acquire_profile("LuxuryX", root=str(tmp_path), slots=2)
+    assert again.path == first.path
+    assert not os.path.exists(os.path.join(again.path, "SingletonLock"))
+
+    again.release()
+    second.release()
+
+
+def test_profile_options_bound_the_disk_cache(tmp_path):
+    slot = acquire_profile("Celltronics", root=str(tmp_path))
+    arguments = use_profile(Options(), slot, cache_mb=50).arguments
+    slot.release()
+
+    assert f"--user-data-dir={os.path.abspath(slot.path)}" in arguments
+    assert f"--disk-cache-size={50 * 1024 * 1024}" in arguments
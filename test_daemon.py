@@ -0,0 +1,78 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+import pytest
+
+from scraper.daemon import DaemonState, next_run, parse_cron, run_daemon, serve_status
+
+AFTER = datetime(2026, 4, 10, 11, 47, 30)  # A Friday
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("0 */6 * * *", datetime(2026, 4, 10, 12, 0)),
+    ("*/15 * * * *", datetime(2026, 4, 10, 12, 0)),
+    ("47 11 * * *", datetime(2026, 4, 11, 11, 47)),
+    ("30 2 * * 1-5", datetime(2026, 4, 13, 2, 30)),
+    ("0 9 * * 7", datetime(2026, 4, 12, 9, 0)),
+    ("0 0 1,15 * *", datetime(2026, 4, 15, 0, 0)),
+    ("0 0 29 2 *", datetime(2028, 2, 29, 0, 0)),
+])
+def test_next_run(expression, expected):
+    assert next_run(expression, AFTER) == expected
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "0 0 32 * *", "5-1 * * * *"])
+def test_invalid_schedules_are_rejected(expression):
+    with pytest.raises(ValueError):
+        parse_cron(expression)
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode()
+
+
+def test_health_and_metrics():
+    state = DaemonState("0 */6 * * *")
+    server = serve_status(state, "127.0.0.1", 0)
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        state.run_started()
+        state.run_finished(products=250)
+        status, body = get(f"{base}/health")
+        assert status == 200 and json.loads(body)["products"] == 250
+
+        status, body = get(f"{base}/metrics")
+        assert "scraper_runs_total 1" in body and "scraper_last_products 250" in body
+
+        state.run_started()
+        state.run_finished(error=RuntimeError("site down"))
+        status, body = get(f"{base}/health")
+        assert status == 503 and json.loads(body)["last_error"] == "site down"
+        assert "scraper_run_failures_total 1" in get(f"{base}/metrics")[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_daemon_finishes_the_current_run_when_stopped():
+    stop = threading.Event()
+    runs = []
+
+    def scrape():
+        runs.append(1)
+        stop.set()  # e.g. SIGTERM arriving mid-run
+        return None
+
+    thread = threading.Thread(target=run_daemon, args=(scrape, "0 0 1 1 *", "127.0.0.1", 0, stop, True))
+    thread.start()
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    assert runs == [1]
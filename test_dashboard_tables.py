@@ -0,0 +1,52 @@
+# test_dashboard_tables.py - Server-side search, sort, paging and export of dashboard tables
+
+import io
+import pandas as pd
+from dashboard.tables import search_frame, sort_frame, page_slice, export_bytes, PARQUET_AVAILABLE
+
+
+def sample_frame():
+    return pd.DataFrame([
+        {"site": "Celltronics", "category": "iPhone", "product": "iPhone 15 128GB", "price_LKR": 250000},
+        {"site": "LuxuryX", "category": "iPhone", "product": "iPhone 15 Pro", "price_LKR": 350000},
+        {"site": "Celltronics", "category": "Samsung", "product": "Galaxy S24", "price_LKR": 250000},
+        {"site": "Lifemobile", "category": "AirPods", "product": "AirPods Pro 2", "price_LKR": 70000},
+    ])
+
+
+def test_search_is_case_insensitive_across_columns():
+    df = sample_frame()
+    assert list(search_frame(df, "IPHONE")["product"]) == ["iPhone 15 128GB", "iPhone 15 Pro"]
+    assert list(search_frame(df, "celltron")["product"]) == ["iPhone 15 128GB", "Galaxy S24"]
+    assert search_frame(df, "") is df
+    # Regex characters are matched literally
+    assert search_frame(df, "(").empty
+
+
+def test_sort_breaks_ties_by_product():
+    df = sample_frame()
+    assert list(sort_frame(df, "price_LKR")["product"]) == [
+        "AirPods Pro 2", "Galaxy S24", "iPhone 15 128GB", "iPhone 15 Pro",
+    ]
+    assert sort_frame(df, "missing") is df
+
+
+def test_page_slice_clamps_out_of_range_pages():
+    df = pd.DataFrame({"product": [f"p{i}" for i in range(7)]})
+
+    rows, page_count = page_slice(df, 2, 3)
+    assert page_count == 3
+    assert list(rows["product"]) == ["p3", "p4", "p5"]
+
+    rows, _ = page_slice(df, 9, 3)
+    assert list(rows["product"]) == ["p6"]
+
+    rows, page_count = page_slice(df.iloc[0:0], 1, 25)
+    assert page_count == 1 and rows.empty
+
+
+def test_export_round_trips():
+    df = sample_frame()
+    assert pd.read_csv(io.BytesIO(export_bytes(df, "csv"))).equals(df)
+    if PARQUET_AVAILABLE:
+        assert pd.read_parquet(io.BytesIO(export_bytes(df, "parquet"))).equals(df)
@@ -0,0 +1,54 @@
+# test_dedup.py - Cross-category deduplication before the snapshot is written
+
+import pandas as pd
+from scraper.dedup import dedupe_products, name_hash
+from scraper.sink import ProductSink
+
+
+def product(site, category, name, price):
+    return {"site": site, "category": category, "product": name, "price_LKR": price, "is_own_shop": False}
+
+
+def test_name_hash_ignores_case_spacing_and_punctuation():
+    assert name_hash("Samsung Galaxy S24 Ultra (256GB)") == name_hash("samsung  galaxy s24 ultra 256gb")
+    assert name_hash("Galaxy S24") != name_hash("Galaxy S25")
+
+
+def test_merges_categories_per_site():
+    products = dedupe_products([
+        product("LuxuryX", "LuxuryX Android/Samsung", "Galaxy S24 Ultra", 380000),
+        product("LuxuryX", "LuxuryX Samsung Deals", "Galaxy  S24 ultra", 380000),
+        product("Celltronics", "Celltronics Samsung", "Galaxy S24 Ultra", 375000),
+        product("LuxuryX", "LuxuryX Apple iPhone", "iPhone 15", 0),
+        product("LuxuryX", "LuxuryX Apple Deals", "iPhone 15", 240000),
+    ])
+
+    assert [(p["site"], p["product"], p["price_LKR"]) for p in products] == [
+        ("LuxuryX", "Galaxy S24 Ultra", 380000),
+        ("Celltronics", "Galaxy S24 Ultra", 375000),
+        ("LuxuryX", "iPhone 15", 240000),  # A real price beats a missing one
+    ]
+    assert products[0]["categories"] == "LuxuryX Android/Samsung|LuxuryX Samsung Deals"
+    assert products[2]["categories"] == "LuxuryX Apple iPhone|LuxuryX Apple Deals"
+    assert products[2]["category"] == "LuxuryX Apple Deals"
+    assert products[0]["product_id"] == products[1]["product_id"]
+
+
+def test_price_seen_this_run_beats_a_carried_one():
+    carried = dict(product("Shop", "Shop All Products", "iPhone 15", 200000), carried_from="2026-04-03")
+    products = dedupe_products([carried, product("Shop", "Shop iPhone", "iPhone 15", 215000)])
+
+    assert [(p["price_LKR"], p.get("carried_from")) for p in products] == [(215000, None)]
+    assert products[0]["categories"] == "Shop All Products|Shop iPhone"
+
+
+def test_finalize_writes_deduplicated_snapshot(tmp_path):
+    output = tmp_path / "all_products.csv"
+    sink = ProductSink(str(output), runs_dir=str(tmp_path / "runs"), run_id="run")
+    sink.write_job("LuxuryX", "Android", 1, [product("LuxuryX", "Android", "Galaxy S24", 300000)])
+    sink.write_job("LuxuryX", "Deals", 1, [product("LuxuryX", "Deals", "Galaxy S24", 300000)])
+
+    df = sink.finalize()
+    assert sink.duplicates == 1
+    assert len(df) == 1
+    assert pd.read_csv(output)["categories"].tolist() == ["Android|Deals"]
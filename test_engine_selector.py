@@ -0,0 +1,89 @@
+# test_engine_selector.py - Tests for static-first engine selection
+
+from datetime import datetime, timedelta
+from scraper import engine_selector
+from scraper.engine_selector import EngineSelector
+from scraper.sink import ProductSink
+
+URL = "https://shop.example/product-category/iphone/"
+
+
+def fake_engine(count, calls, name):
+    def scrape(url, category, site_name, sink=None, **kwargs):
+        calls.append(name)
+        products = [
+            {"site": site_name, "category": category, "product": f"{category} {i}", "price_LKR": 100000 + i, "is_own_shop": False}
+            for i in range(count)
+        ]
+        if sink and products:
+            sink.write_job(site_name, category, 1, products)
+        return products
+    return scrape
+
+
+def make_selector(tmp_path, monkeypatch, static_count, selenium_count, state=None):
+    calls = []
+    state_path = str(tmp_path / "engine_state.json")
+    if state:
+        engine_selector.save_engine_state(state, state_path)
+    selector = EngineSelector(
+        state_path,
+        str(tmp_path / "missing.csv"),
+        selenium_engine=fake_engine(selenium_count, calls, "selenium"),
+        static_engine=fake_engine(static_count, calls, "static"),
+    )
+    return selector, calls
+
+
+def test_static_result_is_kept(tmp_path, monkeypatch):
+    """Server-rendered sites never start Chrome"""
+    selector, calls = make_selector(tmp_path, monkeypatch, 12, 12)
+    sink = ProductSink(str(tmp_path / "all_products.csv"), str(tmp_path / "runs"))
+
+    selector.scrape(URL, "Shop iPhone", "Shop", sink=sink)
+
+    assert calls == ["static"]
+    assert len(sink.finalize()) == 12
+    assert selector.state["Shop"]["counts"]["Shop iPhone"] == 12
+
+
+def test_short_static_result_escalates_and_is_remembered(tmp_path, monkeypatch):
+    """A short static page falls back to Selenium, and the next category goes straight there"""
+    state = {"Shop": {"engine": "static", "counts": {"Shop iPhone": 20}}}
+    selector, calls = make_selector(tmp_path, monkeypatch, 3, 20, state)
+    sink = ProductSink(str(tmp_path / "all_products.csv"), str(tmp_path / "runs"))
+
+    selector.scrape(URL, "Shop iPhone", "Shop", sink=sink)
+    selector.scrape(URL, "Shop iPad", "Shop", sink=sink)
+
+    assert calls == ["static", "selenium", "selenium"]
+    # The rejected static rows never reach the snapshot
+    assert len(sink.finalize()) == 40
+    assert engine_selector.load_engine_state(selector.state_path)["Shop"]["engine"] == "selenium"
+
+
+def test_selenium_decision_is_rechecked(tmp_path, monkeypatch):
+    """Old Selenium decisions get another static attempt"""
+    decided_at = (datetime.now() - timedelta(days=30)).isoformat(timespec="seconds")
+    state = {"Shop": {"engine": "selenium", "decided_at": decided_at, "counts": {"Shop iPhone": 10}}}
+    selector, calls = make_selector(tmp_path, monkeypatch, 10, 10, state)
+
+    selector.scrape(URL, "Shop iPhone", "Shop")
+
+    assert calls == ["static"]
+    assert selector.state["Shop"]["engine"] == "static"
+
+
+def test_failed_selenium_keeps_the_static_result(tmp_path, monkeypatch):
+    """Chrome finding nothing doesn't throw away a partial static result"""
+    state = {"Shop": {"engine": "static", "counts": {"Shop iPhone": 20}}}
+    selector, calls = make_selector(tmp_path, monkeypatch, 8, 0, state)
+    sink = ProductSink(str(tmp_path / "all_products.csv"), str(tmp_path / "runs"))
+
+    products = selector.scrape(URL, "Shop iPhone", "Shop", sink=sink)
+
+    assert calls == ["static", "selenium"]
+    assert len(products) == 8
+    assert len(sink.finalize()) == 8
+    assert selector.state["Shop"]["engine"] == "static"
+    assert selector.state["Shop"]["counts"]["Shop iPhone"] == 8
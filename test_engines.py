@@ -0,0 +1,42 @@
+import subprocess
+import sys
+
+import pytest
+
+from scraper import engines
+
+
+def loaded_modules(code):
+    """Top-level modules imported by running code in a fresh interpreter"""
+    script = f"import sys\n{code}\nprint(' '.join(sorted({{m.split('.')[0] for m in sys.modules}})))"
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+
+def test_package_import_loads_no_engine():
+    """CLI tools and pool workers start without Selenium, pandas or bs4"""
+    modules = loaded_modules("import scraper, scraper.lookup, scraper.selenium_pool")
+    assert not modules & {"selenium", "pandas", "bs4", "requests"}
+
+
+def test_engine_loads_only_its_own_dependencies():
+    modules = loaded_modules("from scraper.engines import get_engine; get_engine('woocommerce')")
+    assert "bs4" in modules
+    assert "selenium" not in modules
+
+
+def test_registered_engine_is_loaded_on_demand(monkeypatch):
+    monkeypatch.setattr(engines, "ENGINES", dict(engines.ENGINES))
+    engines.register_engine("json_dumps", "json", "dumps")
+    assert "json_dumps" in engines.engine_names()
+    assert engines.get_engine("json_dumps")([1]) == "[1]"
+
+    with pytest.raises(ValueError):
+        engines.get_engine("missing")
+
+
+def test_package_exports_resolve_lazily():
+    import scraper
+    from scraper.woocommerce_scraper import scrape_woocommerce_site
+
+    assert scraper.scrape_woocommerce_site is scrape_woocommerce_site
@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+
+from scraper.frequency import category_rates, scrape_interval, plan_frequency, carry_forward
+from scraper.history import append_history, read_history
+from scraper.scheduler import Job
+from scraper.sink import ProductSink
+from config import FREQUENCY_MAX_AGE_HOURS
+
+NOW = pd.Timestamp("2026-04-10 06:00:00")
+
+
+def observation(category, product, price, days_ago):
+    return {"site": category.split()[0], "category": category, "product": product, "price_LKR": price,
+            "is_own_shop": False, "scraped_at": str(NOW - pd.Timedelta(days=days_ago))}
+
+
+def record(history_dir, rows):
+    df = pd.DataFrame(rows)
+    for _, snapshot in df.groupby("scraped_at"):
+        append_history(snapshot, history_dir)
+
+
+def test_rate_is_changes_per_product_day():
+    history = pd.DataFrame([
+        observation("A iPhone", "iPhone 15", 200000, 2),
+        observation("A iPhone", "iPhone 15", 190000, 1),
+        observation("A iPhone", "iPhone 16", 250000, 2),
+        observation("A iPhone", "iPhone 16", 250000, 1),
+        observation("A AirPods", "AirPods Pro", 70000, 1),
+    ])
+    history["scraped_at"] = pd.to_datetime(history["scraped_at"])
+    rates = category_rates(history)
+
+    assert rates["A iPhone"]["rate"] == pytest.approx(0.5)
+    assert rates["A AirPods"]["rate"] is None
+
+
+def test_interval_shrinks_with_volatility_and_is_capped():
+    assert scrape_interval(0) == FREQUENCY_MAX_AGE_HOURS
+    assert scrape_interval(0.001) == FREQUENCY_MAX_AGE_HOURS
+    assert scrape_interval(2.0) < scrape_interval(0.5) < FREQUENCY_MAX_AGE_HOURS
+
+
+def test_stable_categories_wait_until_due(tmp_path):
+    history_dir = str(tmp_path)
+    rows = []
+    for days_ago, price in [(3, 200000), (2, 190000), (1, 185000)]:
+        rows.append(observation("A iPhone", "iPhone 15", price, days_ago))
+        rows.append(observation("A AirPods", "AirPods Pro", 70000, days_ago))
+    rows.append(observation("A Watch", "Apple Watch", 120000, 4))
+    rows.append(observation("A Watch", "Apple Watch", 120000, 3.5))
+    record(history_dir, rows)
+
+    jobs = [Job(category, "A", "woocommerce", "") for category in ("A iPhone", "A AirPods", "A Watch", "A iPad")]
+    due, skipped = plan_frequency(jobs, history_dir, now=NOW)
+
+    # Volatile, overdue (forced refresh) and never seen categories run
+    assert [job.category for job in due] == ["A iPhone", "A Watch", "A iPad"]
+    assert [job.category for job in skipped] == ["A AirPods"]
+
+
+def test_skipped_categories_are_carried_forward_once(tmp_path):
+    previous = pd.DataFrame([
+        {"site": "A", "category": "A AirPods", "categories": "A AirPods", "product": "AirPods Pro",
+         "product_id": "p1", "price_LKR": 70000, "is_own_shop": False, "scraped_at": "2026-04-09 06:00:00"},
+        {"site": "A", "category": "A AirPods", "categories": "A AirPods|A iPhone", "product": "MagSafe Charger",
+         "product_id": "p2", "price_LKR": 15000, "is_own_shop": False, "scraped_at": "2026-04-09 06:00:00"},
+        {"site": "A", "category": "A iPhone", "categories": "A iPhone", "product": "iPhone 15",
+         "product_id": "p3", "price_LKR": 190000, "is_own_shop": False, "scraped_at": "2026-04-09 06:00:00"},
+    ])
+    carried = carry_forward(previous, ["A AirPods"])
+    assert [row["product"] for row in carried] == ["AirPods Pro"]
+    assert carried[0]["carried_from"] == "2026-04-09 06:00:00"
+
+    sink = ProductSink(str(tmp_path / "all.csv"), runs_dir=str(tmp_path / "runs"))
+    sink.write_job("A", "A iPhone", 1, [{"site": "A", "category": "A iPhone", "product": "iPhone 15",
+                                         "price_LKR": 185000, "is_own_shop": False}])
+    df = sink.finalize(scraped_at="2026-04-10 06:00:00", carried=carried)
+
+    assert len(df) == 2 and (df["scraped_at"] == "2026-04-10 06:00:00").all()
+    history_dir = str(tmp_path / "history")
+    assert append_history(df, history_dir) == 1
+    assert list(read_history(history_dir=history_dir, end=NOW.date())["product"]) == ["iPhone 15"]
@@ -0,0 +1,59 @@
+from scraper import grid_cache, woocommerce_scraper
+from scraper.grid_cache import grid_hash, cached_page, save_grid_hashes, load_grid_hashes
+from scraper.sink import ProductSink
+
+PAGE = """<html><head><script>var nonce = "{nonce}";</script></head><body>
+<div class="banner">{ad}</div>
+<ul class="products columns-4">
+  <li class="product" data-nonce="{nonce}"><a href="/p/iphone-15?utm={nonce}"><h2 class="woocommerce-loop-product__title">iPhone 15 128GB</h2></a>
+  <span class="woocommerce-Price-amount amount"><bdi>Rs {price}</bdi></span></li>
+</ul>
+<footer>Rendered at {time}</footer></body></html>"""
+
+
+def page(price="220,000", nonce="a1", ad="Sale!", time="10:31"):
+    return PAGE.format(price=price, nonce=nonce, ad=ad, time=time)
+
+
+def test_hash_ignores_noise_outside_the_grid():
+    assert grid_hash(page()) == grid_hash(page(nonce="b7", ad="New arrivals", time="11:02"))
+    assert grid_hash(page()) == grid_hash(page().encode("utf-8"))
+    assert grid_hash(page()) != grid_hash(page(price="215,000"))
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, html):
+        self.content = html.encode("utf-8")
+
+
+def run_scrape(tmp_path, monkeypatch, html, run):
+    monkeypatch.setattr(woocommerce_scraper, "fetch_page", lambda url, job=None: FakeResponse(html))
+    sink = ProductSink(str(tmp_path / "all.csv"), runs_dir=str(tmp_path / "runs"), run_id=run)
+    products = woocommerce_scraper.scrape_woocommerce_site("https://shop.test/c/", "Shop iPhone", "Shop", sink=sink)
+    sink.finalize()
+    return products, sink
+
+
+def test_unchanged_grid_skips_parsing(tmp_path, monkeypatch):
+    path = str(tmp_path / "grid_hashes.json")
+    monkeypatch.setattr(grid_cache, "GRID_HASH_FILE", path)
+    monkeypatch.setattr(woocommerce_scraper, "cached_page", lambda *args: cached_page(*args, path=path))
+
+    products, sink = run_scrape(tmp_path, monkeypatch, page(), "run-1")
+    assert save_grid_hashes(sink, path) == 1
+    assert load_grid_hashes(path)["Shop|Shop iPhone|1"]["products"] == products
+
+    def no_parsing(*args):
+        raise AssertionError("page was parsed")
+
+    monkeypatch.setattr(woocommerce_scraper, "extract_products", no_parsing)
+    reused, sink = run_scrape(tmp_path, monkeypatch, page(nonce="zz", ad="Other ad"), "run-2")
+    assert reused == products
+    assert sink.jobs["Shop|Shop iPhone|1"]["grid_hash"] == grid_hash(page())
+
+    monkeypatch.undo()
+    monkeypatch.setattr(woocommerce_scraper, "cached_page", lambda *args: cached_page(*args, path=path))
+    changed, _ = run_scrape(tmp_path, monkeypatch, page(price="210,000"), "run-3")
+    assert changed[0]["price_LKR"] == 210000
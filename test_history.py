@@ -0,0 +1,60 @@
+# test_history.py - Month-partitioned price history and chart downsampling
+
+from datetime import date
+import numpy as np
+import pandas as pd
+from scraper.history import append_history, read_history, months_between
+from dashboard.downsample import downsample, minmax_indices, lttb_indices
+
+
+def snapshot(scraped_at, price):
+    return pd.DataFrame([{
+        "site": "Celltronics", "category": "iPhone", "product": "iPhone 15",
+        "price_LKR": price, "is_own_shop": False, "scraped_at": scraped_at,
+    }])
+
+
+def test_append_is_partitioned_and_idempotent(tmp_path):
+    history_dir = str(tmp_path)
+    assert append_history(snapshot("2026-04-30 10:00:00", 250000), history_dir) == 1
+    assert append_history(snapshot("2026-05-01 10:00:00", 245000), history_dir) == 1
+    # Publishing the same snapshot again adds nothing
+    assert append_history(snapshot("2026-05-01 10:00:00", 245000), history_dir) == 0
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["2026-04.csv", "2026-05.csv"]
+
+    history = read_history(date(2026, 5, 1), date(2026, 5, 31), history_dir)
+    assert list(history["price_LKR"]) == [245000]
+    assert len(read_history(date(2026, 3, 1), date(2026, 6, 30), history_dir)) == 2
+
+
+def test_months_between_crosses_years():
+    assert months_between(date(2025, 11, 20), date(2026, 2, 1)) == ["2025-11", "2025-12", "2026-01", "2026-02"]
+
+
+def test_minmax_keeps_spikes_and_drops():
+    y = np.full(100000, 250000.0)
+    y[12345] = 400000  # Spike
+    y[67890] = 90000   # Drop
+    indices = minmax_indices(y, 600)
+
+    assert len(indices) <= 602
+    assert 12345 in indices and 67890 in indices
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+
+
+def test_lttb_returns_requested_points():
+    x = np.arange(10000)
+    y = np.sin(x / 100.0)
+    indices = lttb_indices(x, y, 500)
+    assert len(indices) == 500
+    assert indices[0] == 0 and indices[-1] == 9999
+
+
+def test_downsample_short_series_unchanged():
+    series = pd.DataFrame({
+        "scraped_at": pd.date_range("2026-01-01", periods=50, freq="D"),
+        "price_LKR": range(50),
+    })
+    assert downsample(series, 600) is series
+    assert len(downsample(series, 10, method="lttb")) == 10
@@ -0,0 +1,56 @@
+# test_idealz_parser.py - Tests for the single-pass IdealZ text parser
+
+from scraper.idealz_scraper import parse_idealz_text
+
+with open("fixtures/idealz_page_text.txt", encoding="utf-8") as f:
+    FIXTURE = f.read()
+
+
+def test_fixture_covers_every_tab():
+    """All four tabs of the recorded page are parsed"""
+    products = parse_idealz_text(FIXTURE)
+    categories = {p["category"] for p in products}
+
+    assert len(products) == 27
+    assert categories == {
+        "IdealZ iPhone", "IdealZ Samsung", "IdealZ MacBook",
+        "IdealZ iPad", "IdealZ Watch", "IdealZ AirPods",
+    }
+
+
+def test_price_layouts():
+    """Prices on the same line, the next line, or a few lines later"""
+    text = "\n".join([
+        "Apple Devices",
+        "iPhone 15 128GB",
+        "Rs. 221,500    Rs. 216,000",
+        "iPhone 16 128GB    Rs. 257,500",
+        "iPhone 15 Pro 128GB",
+        "New arrival",
+        "Limited stock",
+        "Rs. 289,000    Rs. 283,000",
+        "iPhone 14 128GB",
+        "one", "two", "three",
+        "Rs. 199,000",
+    ])
+    products = {p["product"]: (p["price_LKR"], p["cash_price_LKR"]) for p in parse_idealz_text(text)}
+
+    assert products == {
+        "iPhone 15 128GB": (221500, 216000),
+        "iPhone 16 128GB": (257500, 257500),
+        "iPhone 15 Pro 128GB": (289000, 283000),
+    }
+
+
+def test_same_line_prices_belong_to_their_product():
+    """
+    The old lookahead parser gave these the next product's prices and kept
+    the prices in the name; each now gets the prices on its own line
+    """
+    products = {p["product"]: (p["price_LKR"], p["cash_price_LKR"]) for p in parse_idealz_text(FIXTURE)}
+
+    assert products["iPhone 15 256GB"] == (254000, 249000)
+    assert products["iPhone 16 Plus 128GB"] == (287000, 281000)
+    assert products["iPad 10th Gen 64GB"] == (139000, 136000)
+    assert products["AirPods Pro 2"] == (69000, 67500)
+    assert not any("Rs." in name for name in products)
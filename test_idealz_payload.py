@@ -0,0 +1,60 @@
+# test_idealz_payload.py - Tests for reading IdealZ prices from the app's data
+
+import json
+from scraper.idealz_payload import records_from_text, asset_urls
+from scraper.idealz_scraper import categorize_product
+from scraper.idealz_payload import to_products
+
+DATA = {
+    "Apple Devices": {"iPhone": [
+        {"name": "iPhone 15 128GB", "price": "Rs. 221,500", "cashPrice": "Rs. 215,000"},
+        {"name": "iPhone 16 128GB", "price": 257500},
+    ]},
+    "Android Devices": [{"model": "Galaxy S24 256GB", "standardPrice": 245000, "cash_price": 239000}],
+    "Mac & iPad": [{"title": "MacBook Air M3 256GB", "price": "Rs. 365,000"}],
+    "meta": {"name": "Price List", "updated": "2026-04-03"},
+}
+
+EXPECTED = [
+    ("iPhone 15 128GB", 221500, 215000),
+    ("iPhone 16 128GB", 257500, 257500),
+    ("Galaxy S24 256GB", 245000, 239000),
+    ("MacBook Air M3 256GB", 365000, 365000),
+]
+
+
+def test_json_payload_covers_every_tab():
+    """Nested JSON from every tab is flattened into products"""
+    assert records_from_text(json.dumps(DATA)) == EXPECTED
+
+
+def test_js_bundle_payloads():
+    """Data inlined by the bundler as JSON.parse('...') or object literals"""
+    inlined = "var e=JSON.parse('" + json.dumps(DATA).replace("'", "\\\\'") + "');"
+    assert records_from_text(inlined) == EXPECTED
+
+    literals = (
+        'const r=[{id:1,name:"iPhone 15 128GB",price:221500,cashPrice:215000},'
+        '{id:2,name:"AirPods Pro 2",price:"Rs. 64,000"}];function x(){return{a:1}}'
+    )
+    assert records_from_text(literals) == [
+        ("iPhone 15 128GB", 221500, 215000),
+        ("AirPods Pro 2", 64000, 64000),
+    ]
+
+
+def test_products_and_assets():
+    """Records become standard rows; only same-origin assets are followed"""
+    products = to_products(EXPECTED, categorize_product)
+    assert [p["category"] for p in products] == ["IdealZ iPhone", "IdealZ iPhone", "IdealZ Samsung", "IdealZ MacBook"]
+    assert all(p["is_own_shop"] for p in products)
+
+    html = (
+        '<script src="/assets/index-abc.js"></script>'
+        '<script src="https://cdn.example/analytics.js"></script>'
+        '<link rel="modulepreload" href="/assets/vendor.js"><link rel="stylesheet" href="/a.css">'
+    )
+    assert asset_urls(html, "https://idealzpricelist.netlify.app/") == [
+        "https://idealzpricelist.netlify.app/assets/index-abc.js",
+        "https://idealzpricelist.netlify.app/assets/vendor.js",
+    ]
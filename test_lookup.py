@@ -0,0 +1,45 @@
+# test_lookup.py - Command-line price lookups from the compact index
+
+import json
+import pandas as pd
+from scraper.lookup import build_lookup_index, load_index, lookup, main
+
+
+def build(tmp_path):
+    path = str(tmp_path / "lookup_index.json")
+    build_lookup_index(pd.DataFrame([
+        {"site": "IdealZ (Your Shop)", "product": "iPhone 15 Pro 256GB", "price_LKR": 330000, "is_own_shop": True},
+        {"site": "Celltronics", "product": "Apple iPhone 15 Pro (256 GB)", "price_LKR": 325000, "is_own_shop": False},
+        {"site": "Lifemobile", "product": "iPhone 15 Pro 1TB", "price_LKR": 420000, "is_own_shop": False},
+        {"site": "LuxuryX", "product": "Samsung Galaxy S24 Ultra", "price_LKR": 380000, "is_own_shop": False},
+        {"site": "LuxuryX", "product": "Samsung Galaxy S24", "price_LKR": 0, "is_own_shop": False},
+    ]).assign(scraped_at="2026-05-01 09:00:00"), path)
+    return path
+
+
+def test_model_and_storage_queries(tmp_path):
+    index = load_index(build(tmp_path))
+
+    matches = lookup(index, "iphone 15 pro 256gb")
+    assert [(m["site"], m["price_LKR"]) for m in matches] == [("Celltronics", 325000), ("IdealZ (Your Shop)", 330000)]
+
+    assert len(lookup(index, model="15 Pro")) == 3
+    assert [m["site"] for m in lookup(index, model="15 pro", storage="1tb")] == ["Lifemobile"]
+    # No model number: falls back to a name search (zero prices aren't indexed)
+    assert [m["product"] for m in lookup(index, "galaxy s24")] == ["Samsung Galaxy S24 Ultra"]
+
+
+def test_cli_json_and_exit_status(tmp_path, capsys):
+    path = build(tmp_path)
+
+    assert main(["iPhone 15 Pro 256GB", "--cheapest", "--json", "--index", path]) == 0
+    result = json.loads(capsys.readouterr().out)
+    assert [m["site"] for m in result["results"]] == ["Celltronics"]
+
+    assert main(["Pixel 9", "--index", path]) == 1
+
+
+def test_cli_unquoted_query(tmp_path, capsys):
+    path = build(tmp_path)
+    assert main(["iPhone", "15", "Pro", "256GB", "--cheapest", "--json", "--index", path]) == 0
+    assert [m["site"] for m in json.loads(capsys.readouterr().out)["results"]] == ["Celltronics"]
@@ -0,0 +1,85 @@
+# test_pagination.py - Offline tests for WooCommerce pagination discovery
+
+from bs4 import BeautifulSoup
+from scraper import woocommerce_scraper
+from scraper.utils import page_url, discover_page_count
+
+BASE_URL = "https://shop.example/product-category/iphone/"
+
+
+def category_page(products, pagination=""):
+    """Build a minimal WooCommerce category page"""
+    items = "".join(
+        f'<li class="product"><h2 class="woocommerce-loop-product__title">{name}</h2>'
+        f'<span class="woocommerce-Price-amount amount"><bdi>Rs. {price:,}</bdi></span></li>'
+        for name, price in products
+    )
+    return f'<html><body><ul class="products">{items}</ul>{pagination}</body></html>'
+
+
+class FakeResponse:
+    def __init__(self, html):
+        self.content = html.encode()
+        self.status_code = 200
+
+
+def numbered_pagination(last_page):
+    links = "".join(
+        f'<a class="page-numbers" href="{page_url(BASE_URL, p)}">{p}</a>'
+        for p in range(2, last_page + 1)
+    )
+    return f'<nav class="woocommerce-pagination">{links}</nav>'
+
+
+def test_discover_page_count():
+    """Numbered links, next-only links and no pagination"""
+    assert discover_page_count(BeautifulSoup(numbered_pagination(7), "html.parser")) == 7
+
+    next_only = f'<a class="next" href="{page_url(BASE_URL, 4)}">Next</a>'
+    assert discover_page_count(BeautifulSoup(next_only, "html.parser"), 3) == 4
+
+    assert discover_page_count(BeautifulSoup("<html></html>", "html.parser")) == 1
+
+
+def test_scrapes_every_discovered_page(monkeypatch):
+    """A 5-page category is scraped completely, not truncated to 3 pages"""
+    pages = {
+        page_url(BASE_URL, p): category_page(
+            [(f"iPhone {p} 128GB", 100000 + p)], numbered_pagination(5)
+        )
+        for p in range(1, 6)
+    }
+    fetched = []
+
+    def fake_fetch(url, job=None):
+        fetched.append(url)
+        return FakeResponse(pages[url]) if url in pages else None
+
+    monkeypatch.setattr(woocommerce_scraper, "fetch_page", fake_fetch)
+
+    products = woocommerce_scraper.scrape_woocommerce_site(BASE_URL, "Test iPhone", "Test")
+
+    assert [p["price_LKR"] for p in products] == [100001, 100002, 100003, 100004, 100005]
+    assert sorted(fetched) == sorted(pages)
+
+
+def test_single_page_and_cap(monkeypatch):
+    """Unpaginated categories stop after one request; max_pages caps big ones"""
+    fetched = []
+
+    def fake_fetch(url, job=None):
+        fetched.append(url)
+        return FakeResponse(category_page([("iPhone 15 128GB", 221500)], numbered_pagination(9)))
+
+    monkeypatch.setattr(woocommerce_scraper, "fetch_page", fake_fetch)
+    woocommerce_scraper.scrape_woocommerce_site(BASE_URL, "Test iPhone", "Test", max_pages=2)
+    assert len(fetched) == 2
+
+    fetched.clear()
+    monkeypatch.setattr(
+        woocommerce_scraper,
+        "fetch_page",
+        lambda url, job=None: fetched.append(url) or FakeResponse(category_page([("iPhone 15 128GB", 221500)])),
+    )
+    woocommerce_scraper.scrape_woocommerce_site(BASE_URL, "Test iPhone", "Test")
+    assert fetched == [BASE_URL]
@@ -0,0 +1,51 @@
+# test_rate_limiter.py - Tests for the per-domain token-bucket rate limiter
+
+import time
+from scraper.rate_limiter import RateLimiter, domain_of
+
+LIMITS = {
+    "default": {"rate": 20.0, "burst": 2},
+    "slow.example": {"rate": 5.0, "burst": 1},
+}
+
+
+def test_domain_key():
+    """www. prefix and paths don't split a shop into several buckets"""
+    assert domain_of("https://www.geniusmobile.lk/product-category/iphones/") == "geniusmobile.lk"
+    assert domain_of("https://geniusmobile.lk/page/2/") == "geniusmobile.lk"
+
+
+def test_burst_then_rate():
+    """Burst requests go straight through, the rest are spaced by the rate"""
+    limiter = RateLimiter(LIMITS)
+    url = "https://fast.example/a"
+
+    assert limiter.acquire(url, "job") == 0
+    assert limiter.acquire(url, "job") == 0
+    waited = limiter.acquire(url, "job")
+
+    assert 0.03 < waited <= 0.05
+    assert limiter.waited("job") == waited
+
+
+def test_domains_do_not_block_each_other():
+    """A throttled domain doesn't hold back requests to another shop"""
+    limiter = RateLimiter(LIMITS)
+    limiter.acquire("https://slow.example/a")
+
+    start = time.monotonic()
+    limiter.acquire("https://fast.example/a")
+    assert time.monotonic() - start < 0.01
+
+
+def test_backoff_and_recovery():
+    """429/403 halves the rate, successful responses bring it back to the configured rate"""
+    limiter = RateLimiter(LIMITS)
+    url = "https://slow.example/a"
+
+    limiter.report(url, 429)
+    assert limiter.current_rate(url) == 2.5
+
+    for _ in range(20):
+        limiter.report(url, 200)
+    assert limiter.current_rate(url) == 5.0
@@ -0,0 +1,88 @@
+# test_reextract.py - Offline re-extraction of archived runs
+
+import pandas as pd
+from scraper.archive import PageArchive
+from scraper.history import append_history, read_history, replace_history
+from scraper.reextract import reextract, with_carried_rows
+from test_pagination import category_page
+
+
+def archive_run(root, run_id, scraped_at, products):
+    archive = PageArchive(root, run_id=run_id)
+    html = category_page(products)
+    archive.store(html, "Celltronics", "iPhone", 1, "https://celltronics.lk/iphone/", "requests")
+    archive.mark_published(scraped_at)
+    return archive
+
+
+def test_rebuilds_runs_and_reports_changes(tmp_path):
+    root, history_dir = str(tmp_path / "archive"), str(tmp_path / "history")
+    archive_run(root, "20260501-090000", "2026-05-01 09:10:00", [("iPhone 15", 250000), ("iPhone 16", 300000)])
+    archive = archive_run(root, "20260502-090000", "2026-05-02 09:10:00", [("iPhone 15", 245000)])
+    PageArchive(root, run_id="20260503-090000").store("<html></html>", "Celltronics", "iPhone", 1)
+
+    # What the live run recorded on May 1st, with one product missed
+    append_history(pd.DataFrame([{
+        "site": "Celltronics", "category": "iPhone", "product": "iPhone 15",
+        "price_LKR": 255000, "is_own_shop": False, "scraped_at": "2026-05-01 09:10:00",
+    }]), history_dir)
+
+    rebuilt = reextract(archive, archive.runs(), workers=2, history_dir=history_dir)
+
+    # The run that never published is skipped
+    assert sorted(rebuilt) == ["20260501-090000", "20260502-090000"]
+    df, report = rebuilt["20260501-090000"]
+    assert sorted(df["product"]) == ["iPhone 15", "iPhone 16"]
+    assert report == {"before": 1, "after": 2, "added": 1, "removed": 0, "repriced": 1}
+
+    replace_history(pd.concat([df for df, _ in rebuilt.values()]), history_dir)
+    history = read_history(pd.Timestamp("2026-05-01").date(), pd.Timestamp("2026-05-31").date(), history_dir)
+    assert len(history) == 3
+    assert sorted(history[history["product"] == "iPhone 15"]["price_LKR"]) == [245000, 250000]
+
+
+def test_sites_without_an_html_parser_keep_their_recorded_rows(tmp_path):
+    root, history_dir = str(tmp_path / "archive"), str(tmp_path / "history")
+    archive = archive_run(root, "20260501-090000", "2026-05-01 09:10:00", [("iPhone 15", 250000)])
+    # LuxuryX is parsed from the live DOM; its archived HTML must not go through the WooCommerce parser
+    archive.store(category_page([("iPhone 15 Pro", 1)]), "LuxuryX", "LuxuryX Apple iPhone", 1, engine="selenium")
+
+    append_history(pd.DataFrame([
+        {"site": "Celltronics", "category": "iPhone", "product": "iPhone 15",
+         "price_LKR": 250000, "is_own_shop": False, "scraped_at": "2026-05-01 09:10:00"},
+        {"site": "LuxuryX", "category": "LuxuryX Apple iPhone", "product": "iPhone 15 Pro 256GB",
+         "price_LKR": 330000, "is_own_shop": False, "scraped_at": "2026-05-01 09:10:00"},
+    ]), history_dir)
+
+    df, report = reextract(archive, archive.runs(), workers=1, history_dir=history_dir)["20260501-090000"]
+    assert sorted(zip(df["site"], df["product"], df["price_LKR"])) == [
+        ("Celltronics", "iPhone 15", 250000), ("LuxuryX", "iPhone 15 Pro 256GB", 330000),
+    ]
+    assert report == {"before": 2, "after": 2, "added": 0, "removed": 0, "repriced": 0}
+
+
+def test_rows_without_archived_pages_survive_a_rebuild(tmp_path):
+    root, history_dir = str(tmp_path / "archive"), str(tmp_path / "history")
+    archive = archive_run(root, "20260501-090000", "2026-05-01 09:10:00", [("iPhone 15", 250000)])
+    # Sitemap discovery doesn't archive product pages
+    append_history(pd.DataFrame([
+        {"site": "Celltronics", "category": "Celltronics All Products", "product": "iPad Air M2",
+         "price_LKR": 190000, "is_own_shop": False, "scraped_at": "2026-05-01 09:10:00"},
+    ]), history_dir)
+
+    df, _ = reextract(archive, archive.runs(), workers=1, history_dir=history_dir)["20260501-090000"]
+    assert sorted(df["product"]) == ["iPad Air M2", "iPhone 15"]
+
+    # The live snapshot also held a category carried forward from an earlier run
+    current = pd.concat([df, pd.DataFrame([
+        {"site": "Celltronics", "category": "Celltronics Watch", "product": "Apple Watch 10",
+         "price_LKR": 125000, "is_own_shop": False, "scraped_at": "2026-05-01 09:10:00",
+         "carried_from": "2026-04-29 09:10:00"},
+        {"site": "Celltronics", "category": "Celltronics iPhone", "product": "iPhone 15",
+         "price_LKR": 240000, "is_own_shop": False, "scraped_at": "2026-05-01 09:10:00",
+         "carried_from": "2026-04-29 09:10:00"},
+    ])], ignore_index=True)
+    merged = with_carried_rows(df, current)
+    assert sorted(zip(merged["product"], merged["price_LKR"])) == [
+        ("Apple Watch 10", 125000), ("iPad Air M2", 190000), ("iPhone 15", 250000),
+    ]
@@ -0,0 +1,118 @@
+import time
+
+import pandas as pd
+import pytest
+
+from scraper import scheduler as scheduler_module
+from scraper.history import append_history
+from scraper.scheduler import Scheduler, Job, DeadlineExceeded, change_rates, catalogue_overlap
+
+NOW = pd.Timestamp.now().floor("s")
+
+
+def snapshot(rows, scraped_at=NOW):
+    df = pd.DataFrame(rows, columns=["site", "category", "product", "price_LKR", "is_own_shop"])
+    df["scraped_at"] = str(scraped_at)
+    return df
+
+
+OWN = [("IdealZ (Your Shop)", "IdealZ iPhone", "iPhone 15 128GB", 220000, True)]
+
+
+def test_change_rate_counts_repricings_per_category():
+    history = pd.concat([
+        snapshot([("A", "A iPhone", "iPhone 15 128GB", 200000, False), ("A", "A iPad", "iPad Air", 150000, False)],
+                 NOW - pd.Timedelta(days=1)),
+        snapshot([("A", "A iPhone", "iPhone 15 128GB", 195000, False), ("A", "A iPad", "iPad Air", 150000, False)]),
+    ])
+    history["scraped_at"] = pd.to_datetime(history["scraped_at"])
+
+    assert change_rates(history) == {"A iPhone": 1.0, "A iPad": 0.0}
+
+
+def test_overlap_counts_competitor_products_you_also_sell():
+    df = snapshot(OWN + [
+        ("A", "A iPhone", "Apple iPhone 15 256GB", 240000, False),
+        ("A", "A iPhone", "iPhone 13 128GB", 150000, False),
+        ("A", "A Watch", "Apple Watch Ultra", 250000, False),
+    ])
+    assert catalogue_overlap(df) == {"A iPhone": 1, "A Watch": 0}
+
+
+def test_plan_runs_price_sensitive_categories_first(tmp_path):
+    history_dir = str(tmp_path / "history")
+    rows = [
+        ("A", "A iPhone", "iPhone 15 128GB", 200000, False),
+        ("A", "A Watch", "Apple Watch Ultra", 250000, False),
+    ]
+    append_history(snapshot(OWN + rows, NOW - pd.Timedelta(days=1)), history_dir)
+    rows[0] = ("A", "A iPhone", "iPhone 15 128GB", 190000, False)
+    current = snapshot(OWN + rows)
+    append_history(current, history_dir)
+    current.to_csv(tmp_path / "all_products.csv", index=False)
+
+    scheduler = Scheduler(
+        stats_path=str(tmp_path / "job_stats.json"),
+        snapshot_path=str(tmp_path / "all_products.csv"),
+        history_dir=history_dir,
+    )
+    jobs = [Job("A Watch", "A", "woocommerce", "w"), Job("B iPhone", "B", "woocommerce", "b"),
+            Job("A iPhone", "A", "woocommerce", "i")]
+    plan = scheduler.plan(jobs)
+
+    assert [job.category for job in plan][0] == "A iPhone"
+    assert plan[-1].category == "A Watch"
+
+
+def test_jobs_that_would_miss_the_deadline_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler_module, "DEADLINE_RESERVE_SECONDS", 0)
+    stats_path = str(tmp_path / "job_stats.json")
+    scheduler_module.save_job_stats({"slow": {"seconds": 600, "runs": 3}, "fast": {"seconds": 5, "runs": 3}}, stats_path)
+    scheduler = Scheduler(deadline=60, stats_path=stats_path, snapshot_path=str(tmp_path / "missing.csv"),
+                          history_dir=str(tmp_path))
+    slow, fast = scheduler.plan([Job("slow", "A", "woocommerce", "s"), Job("fast", "B", "woocommerce", "f")])
+
+    with pytest.raises(DeadlineExceeded):
+        scheduler.run(slow, lambda: [])
+    assert scheduler.run(fast, lambda: [1]) == [1]
+    assert scheduler.skipped == [slow]
+
+
+def test_deadline_counts_from_the_start_of_the_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler_module, "DEADLINE_RESERVE_SECONDS", 0)
+    # Planned 50s into a 60s run, e.g. after scraping your own shop
+    scheduler = Scheduler(deadline=60, snapshot_path=str(tmp_path / "missing.csv"), history_dir=str(tmp_path),
+                          started=time.monotonic() - 50)
+    job = Job("A iPhone", "A", "woocommerce", "i")
+    job.estimate = 30
+
+    assert scheduler.remaining() <= 10
+    with pytest.raises(DeadlineExceeded):
+        scheduler.run(job, lambda: [])
+
+
+def test_durations_are_learned_and_saved(tmp_path):
+    stats_path = str(tmp_path / "job_stats.json")
+    scheduler = Scheduler(stats_path=stats_path, snapshot_path=str(tmp_path / "missing.csv"), history_dir=str(tmp_path))
+    job = Job("A iPhone", "A", "woocommerce", "i")
+    scheduler.run(job, time.sleep, 0.05)
+    scheduler.record("A iPhone", 10.0)
+    scheduler.save()
+
+    stats = scheduler_module.load_job_stats(stats_path)["A iPhone"]
+    assert stats["runs"] == 2
+    assert stats["seconds"] == pytest.approx(0.7 * 0.1 + 0.3 * 10, abs=0.1)
+
+
+def test_pool_jobs_learn_only_their_worker_time(tmp_path):
+    """Time spent waiting for a worker or the shop's domain is not job time"""
+    scheduler = Scheduler(stats_path=str(tmp_path / "job_stats.json"), snapshot_path=str(tmp_path / "missing.csv"),
+                          history_dir=str(tmp_path))
+    job = Job("A iPhone", "A", "selenium_woocommerce", "i")
+
+    def queued_then_ran():
+        time.sleep(0.05)  # Waiting in the pool
+        return ["product"], 12.0
+
+    assert scheduler.run_timed(job, queued_then_ran) == ["product"]
+    assert scheduler.stats["A iPhone"]["seconds"] == 12.0
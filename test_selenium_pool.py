@@ -0,0 +1,269 @@
+# test_selenium_pool.py - Selenium worker pool with a fake engine and a fake browser
+
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from selenium import webdriver
+
+from scraper import browser, engines, selenium_pool
+from scraper.browser import create_driver, quit_driver, process_tree_rss_mb, available_memory_mb
+from scraper.selenium_pool import SeleniumPool, default_pool_size, MAX_RESTARTS, _run_job
+from scraper.sink import BufferedSink, ProductSink
+
+PAGES = 3
+
+
+class FakeDriver:
+    def __init__(self, options=None):
+        self.visited = []
+        self.quit_called = False
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def get_log(self, kind):
+        return []
+
+    def quit(self):
+        self.quit_called = True
+
+
+def browser_engine(url, category, site_name, sink=None, driver=None):
+    """Loads each page not checkpointed yet and writes one product per page"""
+    products = []
+    for page in range(1, PAGES + 1):
+        if sink.completed(site_name, category, page):
+            continue
+        driver.get(f"{url}?page={page}")
+        found = [{"site": site_name, "category": category, "product": f"Phone {page}", "price_LKR": 100000 + page}]
+        sink.write_job(site_name, category, page, found, page_count=PAGES)
+        products.extend(found)
+    return products
+
+
+watchdog_fired = threading.Event()
+
+
+def runaway_engine(url, category, site_name, sink=None, driver=None):
+    """Keeps its browser busy until the watchdog has stepped in"""
+    driver.get(url)
+    watchdog_fired.wait(5)
+    return []
+
+
+def payload_engine(url, category, site_name, sink=None, driver=None):
+    """Reads its products over HTTP and never touches the browser"""
+    return [{"site": site_name, "category": category, "product": "iPhone 15", "price_LKR": 200000}]
+
+
+@pytest.fixture
+def fake_browser(monkeypatch):
+    """Registers the fake engines and counts the browsers the worker starts"""
+    started = []
+
+    def fake_create_driver(options=None, profile=None):
+        started.append(FakeDriver())
+        return started[-1]
+
+    monkeypatch.setattr(selenium_pool, "create_driver", fake_create_driver)
+    monkeypatch.setattr(selenium_pool, "quit_driver", lambda driver: driver.quit())
+    monkeypatch.setattr(selenium_pool, "process_tree_rss_mb", lambda: 100)
+    monkeypatch.setattr(selenium_pool, "_driver", None)
+    monkeypatch.setattr(engines, "ENGINES", dict(engines.ENGINES))
+    monkeypatch.setattr(engines, "_loaded", {})
+    engines.register_engine("fake_browser", __name__, "browser_engine")
+    engines.register_engine("fake_payload", __name__, "payload_engine")
+    engines.register_engine("fake_runaway", __name__, "runaway_engine")
+    return started
+
+
+class FakeExecutor:
+    """Runs jobs in-process; the first `crashes` submits fail like a dead worker"""
+
+    crashes = 0
+    created = 0
+
+    def __init__(self, **kwargs):
+        FakeExecutor.created += 1
+
+    def submit(self, function, *args):
+        future = Future()
+        if FakeExecutor.crashes:
+            FakeExecutor.crashes -= 1
+            future.set_exception(BrokenProcessPool("worker died"))
+        else:
+            future.set_result(function(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+@pytest.fixture
+def fake_executor(monkeypatch, fake_browser):
+    monkeypatch.setattr(selenium_pool, "ProcessPoolExecutor", FakeExecutor)
+    FakeExecutor.crashes = 0
+    FakeExecutor.created = 0
+    return FakeExecutor
+
+
+def job(site="Shop"):
+    return {"url": f"https://{site.lower()}.test/phones", "category": f"{site} Phones", "site_name": site}
+
+
+def test_pool_size_follows_cores_and_memory(monkeypatch):
+    monkeypatch.setattr(selenium_pool, "SELENIUM_WORKER_MEMORY_MB", 500)
+    monkeypatch.setattr(selenium_pool.os, "cpu_count", lambda: 8)
+
+    monkeypatch.setattr(selenium_pool, "available_memory_mb", lambda: 16000)
+    assert default_pool_size() == 8
+    monkeypatch.setattr(selenium_pool, "available_memory_mb", lambda: 1600)
+    assert default_pool_size() == 3
+    monkeypatch.setattr(selenium_pool, "available_memory_mb", lambda: 200)
+    assert default_pool_size() == 1
+
+
+def test_browser_is_reused_and_only_started_when_needed(fake_browser):
+    products, _, _ = _run_job("fake_payload", job(), BufferedSink(None))
+    assert len(products) == 1
+    assert fake_browser == []
+
+    _run_job("fake_browser", job("A"), BufferedSink(None))
+    _run_job("fake_browser", job("B"), BufferedSink(None))
+    assert len(fake_browser) == 1
+    assert len(fake_browser[0].visited) == 2 * PAGES
+
+
+def test_browser_is_restarted_past_the_rss_limit(fake_browser, monkeypatch):
+    monkeypatch.setattr(selenium_pool, "SELENIUM_WORKER_RSS_LIMIT_MB", 1000)
+    monkeypatch.setattr(selenium_pool, "process_tree_rss_mb", lambda: 1500)
+    _run_job("fake_browser", job(), BufferedSink(None))
+    assert fake_browser[0].quit_called
+    assert selenium_pool._driver is None
+
+    _run_job("fake_browser", job(), BufferedSink(None))
+    assert len(fake_browser) == 2
+
+
+def test_worker_is_recycled_when_memory_runs_away_mid_job(fake_browser, monkeypatch):
+    watchdog_fired.clear()
+    monkeypatch.setattr(selenium_pool, "RSS_CHECK_SECONDS", 0.01)
+    monkeypatch.setattr(selenium_pool, "SELENIUM_WORKER_RSS_LIMIT_MB", 1000)
+    monkeypatch.setattr(selenium_pool, "process_tree_rss_mb", lambda: 1500)
+    monkeypatch.setattr(selenium_pool, "_exit_worker", watchdog_fired.set)
+
+    _run_job("fake_runaway", job(), BufferedSink(None))
+    assert watchdog_fired.is_set()
+    assert fake_browser[0].quit_called
+
+
+def test_watchdog_stops_with_the_job(fake_browser, monkeypatch):
+    checks = []
+    monkeypatch.setattr(selenium_pool, "RSS_CHECK_SECONDS", 0.01)
+    monkeypatch.setattr(selenium_pool, "process_tree_rss_mb", lambda: checks.append(1) or 100)
+    _run_job("fake_payload", job(), BufferedSink(None))
+    time.sleep(0.05)
+    after = len(checks)
+    time.sleep(0.05)
+    assert len(checks) == after
+
+
+def test_failed_job_restarts_the_browser(fake_browser, monkeypatch):
+    _run_job("fake_browser", job(), BufferedSink(None))
+    with pytest.raises(TypeError):
+        _run_job("fake_browser", {"url": "https://shop.test/"}, BufferedSink(None))
+    assert fake_browser[0].quit_called
+    assert selenium_pool._driver is None
+
+
+def test_crashed_worker_is_retried(fake_executor):
+    fake_executor.crashes = MAX_RESTARTS
+    with SeleniumPool(size=1) as pool:
+        products = pool.run("fake_browser", **job())
+    assert len(products) == PAGES
+    assert fake_executor.created == MAX_RESTARTS + 1
+
+
+def test_gives_up_after_max_restarts(fake_executor):
+    fake_executor.crashes = MAX_RESTARTS + 1
+    with SeleniumPool(size=1) as pool:
+        with pytest.raises(BrokenProcessPool):
+            pool.run("fake_browser", **job())
+
+
+def test_worker_writes_are_replayed_into_the_sink(fake_executor, tmp_path):
+    sink = ProductSink(str(tmp_path / "all.csv"), runs_dir=str(tmp_path / "runs"), run_id="run-1")
+    first = {"site": "Shop", "category": "Shop Phones", "product": "Phone 1", "price_LKR": 100001}
+    sink.write_job("Shop", "Shop Phones", 1, [first], page_count=PAGES)
+
+    # The worker only sees a snapshot of the checkpoints, so page 1 is skipped
+    with SeleniumPool(size=1) as pool:
+        products = pool.run("fake_browser", sink=sink, **job())
+    assert [p["product"] for p in products] == ["Phone 2", "Phone 3"]
+    assert sorted(sink.completed_pages("Shop", "Shop Phones")) == [1, 2, 3]
+
+    snapshot = sink.finalize()
+    assert sorted(snapshot["product"]) == ["Phone 1", "Phone 2", "Phone 3"]
+
+
+def test_busy_domains_do_not_hold_dispatcher_threads():
+    """With two threads, a second job for a busy shop waits in the queue while another shop runs"""
+    release = threading.Event()
+    started = []
+
+    def call(name, url):
+        started.append(name)
+        if name == "a1":
+            assert release.wait(5)
+        return name
+
+    pool = SeleniumPool(size=2)
+    a1 = pool.submit_call(call, "a1", url="https://a.test/phones")
+    a2 = pool.submit_call(call, "a2", url="https://a.test/tablets")
+    b1 = pool.submit_call(call, "b1", url="https://b.test/phones")
+
+    assert b1.result(timeout=5) == "b1"
+    assert "a2" not in started
+    release.set()
+    assert [a1.result(timeout=5), a2.result(timeout=5)] == ["a1", "a2"]
+    assert started.index("a2") > started.index("a1")
+    pool.shutdown()
+    assert pool.queued == set()
+
+
+def test_quitting_a_driver_releases_its_profile_slot(tmp_path, monkeypatch):
+    monkeypatch.setattr(browser, "CHROME_PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(webdriver, "Chrome", FakeDriver)
+
+    driver = create_driver(profile="selenium-pool")
+    assert driver.profile_slot.path.endswith("slot-0")
+    quit_driver(driver)
+    assert driver.quit_called
+
+    again = create_driver(profile="selenium-pool")
+    assert again.profile_slot.path == driver.profile_slot.path
+    quit_driver(again)
+
+
+def test_failed_start_releases_its_profile_slot(tmp_path, monkeypatch):
+    monkeypatch.setattr(browser, "CHROME_PROFILE_DIR", str(tmp_path))
+
+    def broken_chrome(options=None):
+        raise RuntimeError("chromedriver not found")
+
+    monkeypatch.setattr(webdriver, "Chrome", broken_chrome)
+    with pytest.raises(RuntimeError):
+        create_driver(profile="selenium-pool")
+
+    monkeypatch.setattr(webdriver, "Chrome", FakeDriver)
+    driver = create_driver(profile="selenium-pool")
+    assert driver.profile_slot.path.endswith("slot-0")
+    quit_driver(driver)
+
+
+def test_memory_readings():
+    assert available_memory_mb() > 0
+    assert process_tree_rss_mb() > 0
@@ -0,0 +1,50 @@
+# test_selenium_woocommerce.py - Product extraction from rendered WooCommerce grid elements
+
+from selenium.webdriver.common.by import By
+from scraper.selenium_woocommerce_scraper import extract_elements
+
+
+class FakeElement:
+    """A rendered product tile: a title and its price amounts"""
+
+    def __init__(self, name, prices):
+        self.name = name
+        self.prices = prices
+
+    @property
+    def text(self):
+        return self.name
+
+    def find_element(self, by, selector):
+        assert by == By.CSS_SELECTOR
+        if selector == "h2.woocommerce-loop-product__title" and self.name:
+            return self
+        raise LookupError(selector)
+
+    def find_elements(self, by, selector):
+        if selector == "span.woocommerce-Price-amount.amount bdi":
+            return [Amount(price) for price in self.prices]
+        return []
+
+
+class Amount:
+    def __init__(self, text):
+        self.text = text
+
+
+def test_every_product_of_the_page_is_extracted():
+    elements = [
+        FakeElement("iPhone 15 128GB", ["Rs 220,000"]),
+        FakeElement("iPhone 15 Pro 256GB", ["Rs 340,000", "Rs 329,000"]),  # Sale: the last amount wins
+        FakeElement("", ["Rs 10,000"]),  # No title
+        FakeElement("USB-C Cable", ["Rs 90"]),  # Below the price floor
+        FakeElement("iPad Air M2", ["Rs 190,000"]),
+    ]
+    products = extract_elements(elements, "Shop iPhone", "Shop")
+
+    assert [(p["product"], p["price_LKR"]) for p in products] == [
+        ("iPhone 15 128GB", 220000),
+        ("iPhone 15 Pro 256GB", 329000),
+        ("iPad Air M2", 190000),
+    ]
+    assert {(p["site"], p["category"], p["is_own_shop"]) for p in products} == {("Shop", "Shop iPhone", False)}
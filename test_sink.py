@@ -0,0 +1,96 @@
+# test_sink.py - Tests for the streaming product sink
+
+import json
+import os
+import pandas as pd
+from scraper.sink import ProductSink
+
+PRODUCTS = [
+    {"site": "LuxuryX", "category": "LuxuryX Apple iPhone", "product": "iPhone 15 128GB", "price_LKR": 219000, "is_own_shop": False},
+    {"site": "Francium", "category": "Francium iPhone", "product": "iPhone 15 128GB", "price_LKR": 224000, "is_own_shop": False},
+]
+
+
+def test_staged_rows_survive_a_crash(tmp_path):
+    """Rows are on disk as soon as they are written, before finalize()"""
+    sink = ProductSink(str(tmp_path / "all_products.csv"), str(tmp_path / "runs"), fsync_every=1)
+    sink.write(PRODUCTS)
+
+    # Simulate the process dying: read the staging file without closing the sink
+    with open(sink.staging_path) as f:
+        rows = [json.loads(line) for line in f]
+
+    assert rows == PRODUCTS
+    assert not os.path.exists(tmp_path / "all_products.csv")
+
+
+def test_finalize_publishes_snapshot(tmp_path):
+    """finalize() writes the CSV snapshot from the staged rows"""
+    output_file = tmp_path / "all_products.csv"
+    sink = ProductSink(str(output_file), str(tmp_path / "runs"))
+    sink.write(PRODUCTS[:1])
+    sink.write(PRODUCTS[1:])
+
+    df = sink.finalize(scraped_at="2026-04-03 10:31:13")
+
+    assert len(df) == 2
+    snapshot = pd.read_csv(output_file)
+    assert snapshot["price_LKR"].tolist() == [219000, 224000]
+    assert (snapshot["scraped_at"] == "2026-04-03 10:31:13").all()
+
+
+def test_empty_run_keeps_previous_snapshot(tmp_path):
+    """A run that scraped nothing doesn't clobber the last good snapshot"""
+    output_file = tmp_path / "all_products.csv"
+    output_file.write_text("site,product\nLuxuryX,iPhone 15\n")
+
+    df = ProductSink(str(output_file), str(tmp_path / "runs")).finalize()
+
+    assert df.empty
+    assert output_file.read_text() == "site,product\nLuxuryX,iPhone 15\n"
+
+
+def test_resume_reruns_only_unfinished_jobs(tmp_path):
+    """Finished pages are kept, failed and half-written pages are retried"""
+    output_file = str(tmp_path / "all_products.csv")
+    runs_dir = str(tmp_path / "runs")
+
+    first = ProductSink(output_file, runs_dir)
+    first.write_job("LuxuryX", "LuxuryX Apple iPhone", 1, PRODUCTS[:1], page_count=2)
+    first.fail_job("Francium", "Francium iPhone", 1, "timeout")
+    # Page 2 crashed after its rows were written but before it was marked done
+    first.write(PRODUCTS[:1], job="LuxuryX|LuxuryX Apple iPhone|2")
+    first.close()
+
+    resumed = ProductSink(output_file, runs_dir, run_id=first.run_id)
+    assert resumed.completed("LuxuryX", "LuxuryX Apple iPhone", 1)["page_count"] == 2
+    assert not resumed.completed("LuxuryX", "LuxuryX Apple iPhone", 2)
+    assert not resumed.completed("Francium", "Francium iPhone", 1)
+    assert resumed.failed_jobs() == ["Francium|Francium iPhone|1"]
+
+    resumed.write_job("Francium", "Francium iPhone", 1, PRODUCTS[1:])
+    df = resumed.finalize()
+
+    assert df["site"].tolist() == ["LuxuryX", "Francium"]
+    assert "_job" not in df.columns
+
+
+def test_resumed_run_is_recorded_in_history_once(tmp_path):
+    """Publishing a run, resuming it and publishing again adds only the retried jobs"""
+    from scraper.history import append_history, read_history
+
+    output_file, runs_dir, history_dir = str(tmp_path / "all_products.csv"), str(tmp_path / "runs"), str(tmp_path / "history")
+
+    first = ProductSink(output_file, runs_dir)
+    first.write_job("LuxuryX", "LuxuryX Apple iPhone", 1, PRODUCTS[:1])
+    first.fail_job("Francium", "Francium iPhone", 1, "timeout")
+    assert append_history(first.finalize(), history_dir) == 1
+
+    resumed = ProductSink(output_file, runs_dir, run_id=first.run_id)
+    resumed.write_job("Francium", "Francium iPhone", 1, PRODUCTS[1:])
+    df = resumed.finalize()
+    assert df["scraped_at"].nunique() == 1
+    assert append_history(df, history_dir) == 1
+
+    history = read_history(history_dir=history_dir)
+    assert sorted(history["site"]) == ["Francium", "LuxuryX"]
@@ -0,0 +1,141 @@
+import json
+from datetime import date
+
+import pandas as pd
+
+from scraper import sitemap_scraper
+from scraper.sitemap_scraper import parse_sitemap, extract_product, scrape_sitemap, load_sitemap_state
+from scraper.sink import ProductSink
+from scraper.history import append_history, read_history
+
+SITEMAP = "https://shop.test/product-sitemap.xml"
+
+INDEX = """<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://shop.test/post-sitemap.xml</loc></sitemap>
+  <sitemap><loc>https://shop.test/product-sitemap.xml</loc><lastmod>2026-04-02</lastmod></sitemap>
+</sitemapindex>"""
+
+PRODUCT_PAGE = """<html><head>
+<script type="application/ld+json">{{"@context": "https://schema.org", "@graph": [
+  {{"@type": "WebPage", "name": "{name} - Shop"}},
+  {{"@type": "Product", "name": "{name}", "offers": [{{"@type": "Offer", "price": "{price}", "priceCurrency": "LKR"}}]}}
+]}}</script></head><body><h1 class="product_title">{name}</h1></body></html>"""
+
+
+def urlset(entries):
+    urls = "".join(f"<url><loc>{loc}</loc><lastmod>{lastmod}</lastmod></url>" for loc, lastmod in entries.items())
+    return f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, html):
+        self.content = html.encode("utf-8")
+
+
+class FakeShop:
+    """Serves a sitemap and product pages, recording every requested URL"""
+
+    def __init__(self, products):
+        self.products = products  # {slug: (name, price, lastmod)}
+        self.requested = []
+
+    def fetch(self, url, job=None):
+        self.requested.append(url)
+        if url == SITEMAP:
+            return FakeResponse(urlset({f"https://shop.test/p/{slug}/": p[2] for slug, p in self.products.items()}))
+        name, price, _ = self.products[url.rstrip("/").rsplit("/", 1)[-1]]
+        return FakeResponse(PRODUCT_PAGE.format(name=name, price=price))
+
+
+def scrape(tmp_path, monkeypatch, shop, run, today=date(2026, 4, 10)):
+    monkeypatch.setattr(sitemap_scraper, "fetch_page", shop.fetch)
+    shop.requested = []
+    sink = ProductSink(str(tmp_path / "all.csv"), runs_dir=str(tmp_path / "runs"), run_id=run)
+    products = scrape_sitemap(SITEMAP, "Shop All Products", "Shop", sink=sink,
+                              state_path=str(tmp_path / "sitemap_state.json"), today=today)
+    sink.finalize()
+    return {p["product"]: p["price_LKR"] for p in products}
+
+
+def test_parse_sitemap_and_index():
+    urls, children = parse_sitemap(urlset({"https://shop.test/p/a/": "2026-04-01T10:00:00+00:00"}))
+    assert urls == {"https://shop.test/p/a/": "2026-04-01T10:00:00+00:00"}
+    assert children == []
+
+    urls, children = parse_sitemap(INDEX)
+    assert urls == {}
+    assert children == ["https://shop.test/post-sitemap.xml", "https://shop.test/product-sitemap.xml"]
+
+
+def test_extract_product_from_json_ld_and_template():
+    assert extract_product(PRODUCT_PAGE.format(name="iPhone 15 128GB", price="215000.00")) == ("iPhone 15 128GB", 215000)
+
+    variable = {"@type": "Product", "name": "iPad Air", "offers": {"@type": "AggregateOffer", "lowPrice": "180000", "highPrice": "240000"}}
+    page = f'<script type="application/ld+json">{json.dumps(variable)}</script>'
+    assert extract_product(page) == ("iPad Air", 180000)
+
+    template = '<h1 class="product_title">AirPods 4</h1><p class="price"><span class="amount">Rs. 54,900</span></p>'
+    assert extract_product(template) == ("AirPods 4", 54900)
+
+
+def test_only_new_or_updated_pages_are_fetched(tmp_path, monkeypatch):
+    shop = FakeShop({
+        "iphone-15": ("iPhone 15 128GB", 215000, "2026-04-01"),
+        "ipad-air": ("iPad Air M2", 190000, "2026-04-01"),
+        "airpods-4": ("AirPods 4", 54900, "2026-04-01"),
+    })
+    first = scrape(tmp_path, monkeypatch, shop, "run-1")
+    assert first == {"iPhone 15 128GB": 215000, "iPad Air M2": 190000, "AirPods 4": 54900}
+    assert len(shop.requested) == 4
+
+    # One product updated, one removed, one added: only two product pages are requested
+    shop.products["iphone-15"] = ("iPhone 15 128GB", 209000, "2026-04-09")
+    del shop.products["airpods-4"]
+    shop.products["watch-10"] = ("Apple Watch Series 10", 125000, "2026-04-09")
+    second = scrape(tmp_path, monkeypatch, shop, "run-2")
+
+    assert second == {"iPhone 15 128GB": 209000, "iPad Air M2": 190000, "Apple Watch Series 10": 125000}
+    assert set(shop.requested) == {SITEMAP, "https://shop.test/p/iphone-15/", "https://shop.test/p/watch-10/"}
+    assert "https://shop.test/p/airpods-4/" not in load_sitemap_state(str(tmp_path / "sitemap_state.json"))["Shop"]
+
+
+def test_unchanged_pages_are_refreshed_eventually(tmp_path, monkeypatch):
+    shop = FakeShop({"iphone-15": ("iPhone 15 128GB", 215000, "2026-04-01")})
+    scrape(tmp_path, monkeypatch, shop, "run-1")
+    scrape(tmp_path, monkeypatch, shop, "run-2", today=date(2026, 4, 20))
+    assert shop.requested == [SITEMAP, "https://shop.test/p/iphone-15/"]
+
+
+def test_fetches_per_run_are_capped_newest_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(sitemap_scraper, "SITEMAP_MAX_FETCHES", 2)
+    monkeypatch.setattr(sitemap_scraper, "SITEMAP_BATCH_SIZE", 2)
+    shop = FakeShop({f"phone-{n}": (f"Phone {n}", 100000 + n, f"2026-04-0{n}") for n in range(1, 6)})
+
+    first = scrape(tmp_path, monkeypatch, shop, "run-1")
+    assert sorted(first) == ["Phone 4", "Phone 5"]
+    second = scrape(tmp_path, monkeypatch, shop, "run-2")
+    assert sorted(second) == ["Phone 2", "Phone 3", "Phone 4", "Phone 5"]
+
+
+def test_reused_products_are_not_recorded_again(tmp_path, monkeypatch):
+    shop = FakeShop({
+        "iphone-15": ("iPhone 15 128GB", 215000, "2026-04-01"),
+        "ipad-air": ("iPad Air M2", 190000, "2026-04-01"),
+    })
+    scrape(tmp_path, monkeypatch, shop, "run-1")
+    append_history(pd.read_csv(tmp_path / "all.csv").assign(scraped_at="2026-04-10 06:00:00"), str(tmp_path / "history"))
+
+    shop.products["iphone-15"] = ("iPhone 15 128GB", 209000, "2026-04-11")
+    scrape(tmp_path, monkeypatch, shop, "run-2", today=date(2026, 4, 11))
+    snapshot = pd.read_csv(tmp_path / "all.csv").set_index("product")
+    assert snapshot.loc["iPad Air M2", "carried_from"] == "2026-04-10"
+    assert snapshot["carried_from"].isna()["iPhone 15 128GB"]
+
+    append_history(snapshot.reset_index().assign(scraped_at="2026-04-11 06:00:00"), str(tmp_path / "history"))
+    history = read_history(date(2026, 4, 1), date(2026, 4, 30), str(tmp_path / "history"))
+    assert sorted(zip(history["product"], history["price_LKR"])) == [
+        ("iPad Air M2", 190000), ("iPhone 15 128GB", 209000), ("iPhone 15 128GB", 215000),
+    ]